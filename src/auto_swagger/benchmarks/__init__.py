@@ -0,0 +1,6 @@
+"""
+Benchmarks module for Auto-Swagger
+
+This module contains scripts that measure generation speed and output quality
+of the different inference options on the bundled example routes.
+""" 
\ No newline at end of file
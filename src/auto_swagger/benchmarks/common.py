@@ -0,0 +1,97 @@
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from auto_swagger.config.settings import PROJECT_ROOT, SWAGGER_DOCS_DIR
+from auto_swagger.parser.parser import ApiDocParser
+from auto_swagger.swagger_generator.models import GenerationResult
+
+
+@dataclass
+class GenerationRun:
+    """Result of generating documentation for one example file."""
+    name: str
+    text: str
+    output_tokens: int
+    seconds: float
+    routes: int = 0
+    valid_routes: int = 0
+    decode_seconds: float = 0.0
+
+
+def load_example_contexts(
+    examples_dir: Path = SWAGGER_DOCS_DIR, limit: Optional[int] = None
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Parses the example Express files into route contexts, keyed by file name.
+
+    Args:
+        examples_dir: Directory containing example .js files
+        limit: Maximum number of example files to load
+
+    Returns:
+        Dict mapping file names to the route contexts extracted from them
+    """
+    contexts = {}
+    for path in sorted(Path(examples_dir).glob("*.js"), key=lambda p: p.name):
+        docs = ApiDocParser(str(path), repo_root=str(PROJECT_ROOT)).extract_api_info()
+        if docs:
+            contexts[path.name] = docs
+        if limit and len(contexts) >= limit:
+            break
+    return contexts
+
+
+def run_generation(handler, contexts: Dict[str, List[Dict[str, Any]]]) -> List[GenerationRun]:
+    """Generates one response per example file and records its size, duration and validity.
+
+    The timing covers the model call and turning the response into validated
+    JSDoc blocks, as in a normal run.
+    """
+    system_prompt = handler._get_system_prompt()
+    runs = []
+    for name, context in contexts.items():
+        start_time = time.perf_counter()
+        try:
+            max_new_tokens, timeout = handler._plan_batch(len(context))
+            result = handler.backend.generate(
+                system_prompt, handler._format_prompt(context), context, max_new_tokens, timeout
+            )
+        except Exception as e:
+            print(f"  {name}: generation failed: {e}")
+            result = GenerationResult(text="")
+        matched = handler._match_changes(result.text, context)
+        elapsed = time.perf_counter() - start_time
+        runs.append(GenerationRun(
+            name=name,
+            text=result.text,
+            output_tokens=result.output_tokens,
+            seconds=elapsed,
+            routes=len(context),
+            valid_routes=len(matched),
+            decode_seconds=result.decode_seconds,
+        ))
+        print(f"  {name}: {runs[-1].output_tokens} tokens in {elapsed:.2f}s, "
+              f"{len(matched)}/{len(context)} routes valid")
+    return runs
+
+
+def print_summary(label: str, runs: List[GenerationRun], baseline: Optional[List[GenerationRun]] = None) -> None:
+    """Prints tokens/sec and, when a baseline is given, the output-equivalence rate."""
+    total_tokens = sum(run.output_tokens for run in runs)
+    total_seconds = sum(run.seconds for run in runs)
+    tokens_per_sec = total_tokens / total_seconds if total_seconds else 0.0
+    routes = sum(run.routes for run in runs)
+    valid = sum(run.valid_routes for run in runs)
+    line = f"{label:<24} {total_tokens:>8} tokens {total_seconds:>9.2f}s {tokens_per_sec:>8.2f} tok/s"
+    if routes:
+        line += f"   valid routes: {valid}/{routes}"
+
+    if baseline is not None:
+        baseline_text = {run.name: run.text for run in baseline}
+        identical = sum(1 for run in runs if baseline_text.get(run.name) == run.text)
+        line += f"   equivalent outputs: {identical}/{len(runs)} ({identical / len(runs) * 100:.0f}%)"
+        baseline_seconds = sum(run.seconds for run in baseline)
+        if total_seconds:
+            line += f"   speedup: {baseline_seconds / total_seconds:.2f}x"
+    print(line)
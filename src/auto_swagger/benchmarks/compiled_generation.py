@@ -0,0 +1,64 @@
+import argparse
+from typing import List
+
+from auto_swagger.swagger_generator.generator_config import LLMConfig
+from auto_swagger.swagger_generator.llm_handler import LLMHandler
+from .common import GenerationRun, load_example_contexts, print_summary, run_generation
+
+
+def decode_rate(runs: List[GenerationRun]) -> float:
+    """Returns generated tokens per second of decoding, excluding prefill."""
+    decode_seconds = sum(run.decode_seconds for run in runs)
+    return sum(run.output_tokens for run in runs) / decode_seconds if decode_seconds else 0.0
+
+
+def main():
+    """Compares steady-state decode speed of the compiled static-cache path against eager generation."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark torch.compile'd generation with a static KV cache against eager generation."
+    )
+    parser.add_argument("--limit", type=int, help="Number of example files to use", default=5)
+    parser.add_argument("--repeats", type=int, help="Passes over the examples; the last one is reported", default=2)
+    parser.add_argument("--inference-profile", choices=["default", "cpu-int8"], default="default")
+    parser.add_argument("--threads", type=int, help="Number of torch intra-op threads", default=None)
+    parser.add_argument("--bucket", type=int, help="Prompt length bucket in tokens", default=256)
+    parser.add_argument("--cache-len", type=int, help="Static KV cache length in tokens", default=8192)
+    args = parser.parse_args()
+
+    contexts = load_example_contexts(limit=args.limit)
+    print(f"Loaded {len(contexts)} example files")
+
+    # Both runs share one loaded model; prompt lookup is off so only compilation differs
+    handler = LLMHandler(LLMConfig(
+        inference_profile=args.inference_profile,
+        num_threads=args.threads,
+        cache_enabled=False,
+        template_rendering=False,
+        prompt_lookup_num_tokens=None,
+        compile_prompt_bucket=args.bucket,
+        compile_max_cache_len=args.cache_len,
+    ))
+
+    eager = []
+    for repeat in range(args.repeats):
+        print(f"\nRunning eager generation (pass {repeat + 1} of {args.repeats})")
+        eager = run_generation(handler, contexts)
+
+    handler.backend.compile(warmup=False)
+    warmup_seconds = handler.backend.warmup()
+    compiled = []
+    for repeat in range(args.repeats):
+        print(f"\nRunning compiled generation (pass {repeat + 1} of {args.repeats})")
+        compiled = run_generation(handler, contexts)
+
+    print("\nResults (last pass):")
+    print_summary("eager", eager)
+    print_summary("compiled", compiled, baseline=eager)
+    eager_rate, compiled_rate = decode_rate(eager), decode_rate(compiled)
+    speedup = compiled_rate / eager_rate if eager_rate else 0.0
+    print(f"Decode speed: eager {eager_rate:.2f} tok/s, compiled {compiled_rate:.2f} tok/s ({speedup:.2f}x), "
+          f"warmup {warmup_seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
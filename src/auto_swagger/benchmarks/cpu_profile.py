@@ -0,0 +1,41 @@
+import argparse
+import gc
+
+from auto_swagger.swagger_generator.generator_config import LLMConfig
+from auto_swagger.swagger_generator.llm_handler import LLMHandler
+from .common import load_example_contexts, print_summary, run_generation
+
+
+def main():
+    """Compares the cpu-int8 inference profile against the fp32 baseline on the example routes."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the cpu-int8 inference profile against the fp32 baseline."
+    )
+    parser.add_argument("--limit", type=int, help="Number of example files to use", default=5)
+    parser.add_argument("--threads", type=int, help="Number of torch intra-op threads", default=None)
+    parser.add_argument("--interop-threads", type=int, help="Number of torch inter-op threads", default=None)
+    args = parser.parse_args()
+
+    contexts = load_example_contexts(limit=args.limit)
+    print(f"Loaded {len(contexts)} example files")
+
+    results = {}
+    for profile in ("default", "cpu-int8"):
+        print(f"\nRunning profile: {profile}")
+        handler = LLMHandler(LLMConfig(
+            inference_profile=profile,
+            num_threads=args.threads,
+            num_interop_threads=args.interop_threads,
+            cache_enabled=False,
+        ))
+        results[profile] = run_generation(handler, contexts)
+        del handler
+        gc.collect()
+
+    print("\nResults:")
+    print_summary("fp32 (default)", results["default"])
+    print_summary("cpu-int8", results["cpu-int8"], baseline=results["default"])
+
+
+if __name__ == "__main__":
+    main()
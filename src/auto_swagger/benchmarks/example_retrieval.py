@@ -0,0 +1,84 @@
+import argparse
+import json
+from typing import Any, Dict, List
+
+from auto_swagger.swagger_generator.example_index import CORPUS_PATHS, ExampleIndex
+from auto_swagger.swagger_generator.generator_config import LLMConfig
+from auto_swagger.swagger_generator.llm_handler import LLMHandler
+from .common import load_example_contexts
+
+
+def run_with_retries(handler, contexts: Dict[str, List[Dict[str, Any]]], pairs, use_examples: bool) -> Dict[str, int]:
+    """Documents every example file through the full retry loop and counts first-attempt successes and retries.
+
+    Each file is generated with an index built without that file's own
+    examples, so the prompt never contains the answer.
+    """
+    totals = {"routes": 0, "first_attempt": 0, "documented": 0, "retries": 0, "input_tokens": 0}
+    for name, context in contexts.items():
+        handler.example_index = None
+        if use_examples:
+            held_out = [pair for pair in pairs if not pair.get("filepath", "").endswith(f"/{name}")]
+            handler.example_index = ExampleIndex.build(held_out, handler.config.output_format)
+        handler.start_run()
+        handler.generate_documentation(context)
+
+        summary = handler.metrics.summary()
+        first_attempt = sum(1 for route in handler.metrics.routes if route.done and route.attempts == 1)
+        for key in ("routes", "documented", "retries", "input_tokens"):
+            totals[key] += summary[key]
+        totals["first_attempt"] += first_attempt
+        print(f"  {name}: {first_attempt}/{summary['routes']} routes on the first attempt, "
+              f"{summary['retries']} retries")
+    return totals
+
+
+def main():
+    """Measures the retries avoided by adding retrieved fine-tuning examples to the prompts."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark first-attempt success and retries with and without retrieved examples."
+    )
+    parser.add_argument("--limit", type=int, help="Number of example files to use", default=10)
+    parser.add_argument("--output-format", choices=["jsdoc", "spec"], default="jsdoc")
+    parser.add_argument("--examples-per-route", type=int, default=2)
+    parser.add_argument("--token-budget", type=int, help="Estimated prompt tokens for examples", default=1024)
+    parser.add_argument("--inference-profile", choices=["default", "cpu-int8"], default="default")
+    parser.add_argument("--threads", type=int, help="Number of torch intra-op threads", default=None)
+    args = parser.parse_args()
+
+    contexts = load_example_contexts(limit=args.limit)
+    with open(CORPUS_PATHS[args.output_format], encoding="utf-8") as corpus:
+        pairs = [json.loads(line) for line in corpus if line.strip()]
+    print(f"Loaded {len(contexts)} example files and {len(pairs)} indexed examples")
+
+    # Every route goes to the model, so retries reflect the prompt alone
+    handler = LLMHandler(LLMConfig(
+        inference_profile=args.inference_profile,
+        num_threads=args.threads,
+        output_format=args.output_format,
+        cache_enabled=False,
+        template_rendering=False,
+        dedup_routes=False,
+        metrics_enabled=False,
+        example_retrieval=False,
+        examples_per_route=args.examples_per_route,
+        example_token_budget=args.token_budget,
+    ))
+
+    results = {}
+    for label, use_examples in (("no examples", False), ("retrieved examples", True)):
+        print(f"\nRunning with {label}")
+        results[label] = run_with_retries(handler, contexts, pairs, use_examples)
+
+    print("\nResults:")
+    for label, totals in results.items():
+        routes = totals["routes"] or 1
+        print(f"{label:<20} first attempt: {totals['first_attempt']}/{totals['routes']} "
+              f"({totals['first_attempt'] / routes:.0%})   documented: {totals['documented']}/{totals['routes']}   "
+              f"retries: {totals['retries']}   prompt tokens: {totals['input_tokens']}")
+    avoided = results["no examples"]["retries"] - results["retrieved examples"]["retries"]
+    print(f"Retries avoided: {avoided}")
+
+
+if __name__ == "__main__":
+    main()
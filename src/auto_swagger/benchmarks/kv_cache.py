@@ -0,0 +1,120 @@
+import argparse
+import multiprocessing
+import os
+import threading
+from typing import Any, Dict, List
+
+from auto_swagger.swagger_generator.generator_config import LLMConfig
+from auto_swagger.swagger_generator.llm_handler import LLMHandler
+from .common import load_example_contexts
+
+
+def current_rss_mb() -> float:
+    """Returns the resident set size of this process in MB (Linux)."""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def measure_generation(handler, system_prompt: str, batch: List[Dict[str, Any]], connection) -> None:
+    """Generates one request for ``batch`` and sends back its peak RSS growth and token counts.
+
+    Runs in a forked child, so every measurement starts from the freshly
+    loaded model instead of memory the allocator kept from earlier requests.
+    """
+    baseline = peak = current_rss_mb()
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.wait(0.005):
+            peak = max(peak, current_rss_mb())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        max_new_tokens, timeout = handler._plan_batch(len(batch))
+        result = handler.backend.generate(
+            system_prompt, handler._format_prompt(batch), batch, max_new_tokens, timeout
+        )
+        done.set()
+        sampler.join()
+        connection.send({
+            "peak_mb": peak - baseline,
+            "input_tokens": result.input_tokens,
+            "output_tokens": result.output_tokens,
+            "decode_seconds": result.decode_seconds,
+            "text": result.text,
+        })
+    except Exception as e:
+        connection.send({"error": str(e)})
+
+
+def main():
+    """Compares peak memory and decode speed of the full-precision and quantized KV caches by batch size."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark peak RSS and tokens/sec of the quantized KV cache against the full-precision cache."
+    )
+    parser.add_argument("--limit", type=int, help="Number of example files to take routes from", default=16)
+    parser.add_argument(
+        "--routes",
+        type=str,
+        help="Comma-separated numbers of routes per request (batch sizes) to measure",
+        default="1,2,4,8",
+    )
+    parser.add_argument("--kv-cache", choices=["quantized", "offloaded"], default="quantized")
+    parser.add_argument("--bits", type=int, choices=[2, 4], help="Bits per quantized cache value", default=4)
+    parser.add_argument("--inference-profile", choices=["default", "cpu-int8"], default="default")
+    parser.add_argument("--threads", type=int, help="Number of torch intra-op threads", default=None)
+    args = parser.parse_args()
+
+    routes = [route for context in load_example_contexts(limit=args.limit).values() for route in context]
+    print(f"Loaded {len(routes)} example routes")
+
+    # Prompt lookup is off so both caches run plain greedy decoding
+    config = LLMConfig(
+        inference_profile=args.inference_profile,
+        num_threads=args.threads,
+        cache_enabled=False,
+        template_rendering=False,
+        prompt_lookup_num_tokens=None,
+        kv_cache_bits=args.bits,
+    )
+    handler = LLMHandler(config)
+    system_prompt = handler._get_system_prompt()
+
+    results = []
+    for batch_size in (int(n) for n in args.routes.split(",")):
+        if batch_size > len(routes):
+            print(f"  Skipping {batch_size} routes, only {len(routes)} available")
+            continue
+        batch = routes[:batch_size]
+        baseline_text = None
+        for kv_cache in ("dynamic", args.kv_cache):
+            # Forked children inherit the loaded model and this setting
+            config.kv_cache = kv_cache
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            child = multiprocessing.get_context("fork").Process(
+                target=measure_generation, args=(handler, system_prompt, batch, sender)
+            )
+            child.start()
+            run = receiver.recv()
+            child.join()
+            if "error" in run:
+                print(f"  {batch_size} routes, {kv_cache} cache: generation failed: {run['error']}")
+                continue
+
+            rate = run["output_tokens"] / run["decode_seconds"] if run["decode_seconds"] else 0.0
+            if baseline_text is None:
+                baseline_text = run["text"]
+            results.append((batch_size, kv_cache, run, rate, run["text"] == baseline_text))
+            print(f"  {batch_size} routes, {kv_cache} cache: peak +{run['peak_mb']:.0f} MB, {rate:.2f} tok/s")
+
+    print("\nResults (peak RSS growth during generation):")
+    for batch_size, kv_cache, run, rate, identical in results:
+        tokens = run["input_tokens"] + run["output_tokens"]
+        print(f"{batch_size:>3} routes {tokens:>7} tokens  {kv_cache:<10} {run['peak_mb']:>9.0f} MB "
+              f"{rate:>8.2f} tok/s   same output as dynamic: {'yes' if identical else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
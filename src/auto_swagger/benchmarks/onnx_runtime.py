@@ -0,0 +1,51 @@
+import argparse
+from pathlib import Path
+
+from auto_swagger.config.settings import ONNX_MODEL_DIR
+from auto_swagger.swagger_generator.generator_config import LLMConfig
+from auto_swagger.swagger_generator.llm_handler import LLMHandler
+from .common import load_example_contexts, print_summary, run_generation
+from .compiled_generation import decode_rate
+
+
+def main():
+    """Compares the onnxruntime backend against in-process transformers generation."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark generation with onnxruntime against the transformers backend on CPU."
+    )
+    parser.add_argument("--limit", type=int, help="Number of example files to use", default=5)
+    parser.add_argument("--onnx-model", type=str, help="ONNX export created by export-onnx", default=str(ONNX_MODEL_DIR))
+    parser.add_argument("--inference-profile", choices=["default", "cpu-int8"], default="default")
+    parser.add_argument("--threads", type=int, help="Number of intra-op threads for both runtimes", default=None)
+    args = parser.parse_args()
+
+    contexts = load_example_contexts(limit=args.limit)
+    print(f"Loaded {len(contexts)} example files")
+
+    # Prompt lookup is off so both backends run plain greedy decoding
+    settings = dict(
+        num_threads=args.threads,
+        cache_enabled=False,
+        template_rendering=False,
+        prompt_lookup_num_tokens=None,
+    )
+
+    print("\nRunning transformers backend")
+    baseline = run_generation(LLMHandler(LLMConfig(inference_profile=args.inference_profile, **settings)), contexts)
+
+    print("\nRunning onnxruntime backend")
+    onnx = run_generation(
+        LLMHandler(LLMConfig(backend="onnx", onnx_model_path=Path(args.onnx_model), **settings)),
+        contexts,
+    )
+
+    print("\nResults:")
+    print_summary("transformers", baseline)
+    print_summary("onnxruntime", onnx, baseline=baseline)
+    baseline_rate, onnx_rate = decode_rate(baseline), decode_rate(onnx)
+    speedup = onnx_rate / baseline_rate if baseline_rate else 0.0
+    print(f"Decode speed: transformers {baseline_rate:.2f} tok/s, onnxruntime {onnx_rate:.2f} tok/s ({speedup:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
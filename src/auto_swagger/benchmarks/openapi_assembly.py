@@ -0,0 +1,78 @@
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from auto_swagger.config.settings import SWAGGER_DOCS_DIR
+from auto_swagger.swagger_generator.openapi_store import OpenApiStore
+
+
+def make_repository(root: Path, copies: int) -> list[Path]:
+    """Copies the example files ``copies`` times into ``root`` with distinct route paths."""
+    files = []
+    for copy in range(copies):
+        directory = root / f"service{copy}"
+        directory.mkdir(parents=True)
+        for example in sorted(SWAGGER_DOCS_DIR.glob("*.js")):
+            code = example.read_text(encoding="utf-8")
+            # Prefix every documented path so the copies do not overwrite each other
+            code = code.replace(" * /", f" * /service{copy}/").replace("'/", f"'/service{copy}/")
+            path = directory / example.name
+            path.write_text(code, encoding="utf-8")
+            files.append(path)
+    return files
+
+
+def main():
+    """Compares a full rebuild of the consolidated OpenAPI document with an incremental update."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark incremental openapi.json updates against rebuilding from every source file."
+    )
+    parser.add_argument("--copies", type=int, help="Copies of the example files in the synthetic repository", default=30)
+    parser.add_argument("--changed-files", type=int, help="Files edited before the incremental update", default=1)
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="auto_swagger_openapi_"))
+    try:
+        files = make_repository(root / "repo", args.copies)
+        print(f"Synthetic repository with {len(files)} files")
+        fragments_path = root / "fragments.json"
+
+        start_time = time.perf_counter()
+        store = OpenApiStore(root / "repo", fragments_path=fragments_path)
+        full_stats = store.scan()
+        full_seconds = time.perf_counter() - start_time
+
+        # Reword every doc block of the changed files, as a documentation run would
+        changed = files[:args.changed_files]
+        for path in changed:
+            path.write_text(path.read_text(encoding="utf-8").replace("summary: ", "summary: Updated "), encoding="utf-8")
+
+        start_time = time.perf_counter()
+        store = OpenApiStore(root / "repo", fragments_path=fragments_path)
+        incremental_stats = store.update(changed)
+        incremental_seconds = time.perf_counter() - start_time
+        incremental = json.loads(store.output_path.read_text(encoding="utf-8"))
+
+        start_time = time.perf_counter()
+        rebuilt = OpenApiStore(root / "repo", root / "rebuilt_openapi.json", root / "rebuilt.json")
+        rebuilt.scan()
+        rebuild_seconds = time.perf_counter() - start_time
+        full = json.loads(rebuilt.output_path.read_text(encoding="utf-8"))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print("\nResults:")
+    print(f"Full build:         {full_seconds:.3f}s  ({full_stats['files']} files, "
+          f"{full_stats['blocks_parsed']} blocks parsed)")
+    print(f"Full rebuild:       {rebuild_seconds:.3f}s")
+    print(f"Incremental update: {incremental_seconds:.3f}s  ({incremental_stats['files']} files, "
+          f"{incremental_stats['blocks_parsed']} blocks parsed, {incremental_stats['changed']} fragments changed)")
+    speedup = rebuild_seconds / incremental_seconds if incremental_seconds else 0.0
+    print(f"Speedup: {speedup:.1f}x, same document as a full rebuild: {'yes' if incremental == full else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
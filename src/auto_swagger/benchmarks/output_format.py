@@ -0,0 +1,95 @@
+import argparse
+import json
+import re
+from pathlib import Path
+
+from auto_swagger.config.settings import SWAGGER_DOCS_DIR
+from auto_swagger.swagger_generator.generator_config import LLMConfig
+from auto_swagger.swagger_generator.jsdoc_renderer import operation_to_spec, parse_jsdoc_block
+from auto_swagger.swagger_generator.tokenization import load_tokenizer
+from .common import load_example_contexts, print_summary, run_generation
+
+JSDOC_PATTERN = re.compile(r"/\*\*[\s\S]*?@(?:openapi|swagger)[\s\S]*?\*/")
+
+
+def compare_token_counts(tokenizer, examples_dir: Path = SWAGGER_DOCS_DIR) -> None:
+    """Counts the tokens of every example JSDoc block as the model would emit it in each format.
+
+    Both formats are measured as the JSON value inside a change: a JSON-escaped
+    ``code`` string for "jsdoc", a minified ``spec`` object for "spec".
+    """
+    jsdoc_tokens = spec_tokens = blocks = 0
+    for path in sorted(Path(examples_dir).glob("*.js")):
+        for match in JSDOC_PATTERN.finditer(path.read_text(encoding="utf-8")):
+            jsdoc = match.group(0)
+            try:
+                paths = parse_jsdoc_block(jsdoc)
+                operation = next(iter(next(iter(paths.values())).values()))
+            except (ValueError, StopIteration, AttributeError):
+                continue
+            spec = json.dumps(operation_to_spec(operation), ensure_ascii=False, separators=(",", ":"))
+            jsdoc_tokens += len(tokenizer.encode(json.dumps(jsdoc), add_special_tokens=False))
+            spec_tokens += len(tokenizer.encode(spec, add_special_tokens=False))
+            blocks += 1
+
+    if not blocks:
+        print(f"No JSDoc blocks found in {examples_dir}")
+        return
+    print(f"\nOutput tokens over {blocks} example blocks:")
+    print(f"  jsdoc: {jsdoc_tokens:>8} ({jsdoc_tokens / blocks:.1f} per route)")
+    print(f"  spec:  {spec_tokens:>8} ({spec_tokens / blocks:.1f} per route)")
+    print(f"  reduction: {(1 - spec_tokens / jsdoc_tokens) * 100:.1f}%")
+
+
+def main():
+    """Compares output size and latency of the jsdoc and compact spec output formats."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the compact spec output format against full JSDoc output."
+    )
+    parser.add_argument("--limit", type=int, help="Number of example files to generate for", default=5)
+    parser.add_argument(
+        "--generate",
+        action="store_true",
+        help="Also run end-to-end generation in both formats (needs an adapter trained for each)",
+    )
+    parser.add_argument("--jsdoc-adapter", type=str, help="LoRA adapter for the jsdoc format", default=None)
+    parser.add_argument("--spec-adapter", type=str, help="LoRA adapter for the spec format", default=None)
+    parser.add_argument("--inference-profile", choices=["default", "cpu-int8"], default="default")
+    args = parser.parse_args()
+
+    defaults = LLMConfig()
+    compare_token_counts(load_tokenizer(defaults.model_name))
+    if not args.generate:
+        return
+
+    # Imported here so the token comparison runs without loading a model
+    from auto_swagger.swagger_generator.llm_handler import LLMHandler
+
+    contexts = load_example_contexts(limit=args.limit)
+    print(f"\nLoaded {len(contexts)} example files")
+
+    results = {}
+    for output_format, adapter in (("jsdoc", args.jsdoc_adapter), ("spec", args.spec_adapter)):
+        print(f"\nRunning {output_format} output")
+        handler = LLMHandler(LLMConfig(
+            lora_adapter_id=adapter or defaults.lora_adapter_id,
+            inference_profile=args.inference_profile,
+            output_format=output_format,
+            cache_enabled=False,
+            template_rendering=False,
+        ))
+        results[output_format] = run_generation(handler, contexts)
+        del handler
+
+    print("\nResults:")
+    print_summary("jsdoc", results["jsdoc"])
+    print_summary("spec", results["spec"])
+    # Outputs differ by design, so only compare latency rather than output equivalence
+    jsdoc_seconds = sum(run.seconds for run in results["jsdoc"])
+    spec_seconds = sum(run.seconds for run in results["spec"])
+    if spec_seconds:
+        print(f"spec speedup: {jsdoc_seconds / spec_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from auto_swagger.swagger_generator.generator_config import GitConfig, LLMConfig
+from auto_swagger.swagger_generator.prompt_encoding import encode_context
+from auto_swagger.swagger_generator.tokenization import load_tokenizer
+from .common import load_example_contexts
+
+
+def load_diff_contexts(repo_path: str, branch: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Parses the files changed on a branch into route contexts, keyed by file, as a normal run would."""
+    from auto_swagger.main import parse_files_with_context
+    from auto_swagger.swagger_generator.git_handler import GitHandler
+
+    git_handler = GitHandler(Path(repo_path), GitConfig())
+    contexts = {}
+    for file in sorted(git_handler.get_unmerged_files(branch)):
+        docs = parse_files_with_context([str(Path(repo_path) / file)], repo_path)
+        if docs:
+            contexts[file] = docs
+    return contexts
+
+
+def main():
+    """Counts prompt tokens of the verbose and compact context encodings."""
+    parser = argparse.ArgumentParser(
+        description="Measure prompt tokens saved by the compact context encoding."
+    )
+    parser.add_argument(
+        "--repo-path",
+        type=str,
+        help="Measure on the files changed in this repository instead of the example routes",
+        default=None,
+    )
+    parser.add_argument("--branch", type=str, help="Branch to diff (defaults to current branch)", default=None)
+    parser.add_argument("--limit", type=int, help="Number of example files to use", default=None)
+    args = parser.parse_args()
+
+    if args.repo_path:
+        contexts = load_diff_contexts(args.repo_path, args.branch)
+    else:
+        contexts = load_example_contexts(limit=args.limit)
+    if not contexts:
+        print("No routes found")
+        return
+
+    tokenizer = load_tokenizer(LLMConfig().model_name)
+
+    def count(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    total_verbose = total_compact = 0
+    print(f"{'file':<40} {'routes':>6} {'verbose':>8} {'compact':>8} {'saved':>7}")
+    for name, context in contexts.items():
+        verbose = count(encode_context(context, "verbose"))
+        compact = count(encode_context(context, "compact"))
+        total_verbose += verbose
+        total_compact += compact
+        print(f"{name:<40} {len(context):>6} {verbose:>8} {compact:>8} {(1 - compact / verbose) * 100:>6.1f}%")
+
+    print(f"\nTotal over {len(contexts)} prompts: {total_verbose} -> {total_compact} tokens "
+          f"({total_verbose - total_compact} saved, {(1 - total_compact / total_verbose) * 100:.1f}%, "
+          f"{(total_verbose - total_compact) / len(contexts):.0f} per prompt)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+
+from auto_swagger.swagger_generator.generator_config import LLMConfig
+from auto_swagger.swagger_generator.llm_handler import LLMHandler
+from .common import load_example_contexts, print_summary, run_generation
+
+
+def main():
+    """Compares prompt-lookup decoding against plain greedy decoding on the example routes."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark prompt-lookup (n-gram) decoding against plain greedy decoding."
+    )
+    parser.add_argument("--limit", type=int, help="Number of example files to use", default=5)
+    parser.add_argument("--num-tokens", type=int, help="Tokens drafted per step", default=10)
+    parser.add_argument("--max-ngram", type=int, help="Longest n-gram matched against the prompt", default=3)
+    parser.add_argument("--inference-profile", choices=["default", "cpu-int8"], default="default")
+    parser.add_argument("--threads", type=int, help="Number of torch intra-op threads", default=None)
+    args = parser.parse_args()
+
+    contexts = load_example_contexts(limit=args.limit)
+    print(f"Loaded {len(contexts)} example files")
+
+    # Both runs share one loaded model; only the decoding settings change
+    handler = LLMHandler(LLMConfig(
+        inference_profile=args.inference_profile,
+        num_threads=args.threads,
+        cache_enabled=False,
+        prompt_lookup_num_tokens=None,
+    ))
+
+    print("\nRunning greedy decoding")
+    baseline = run_generation(handler, contexts)
+
+    print(f"\nRunning prompt-lookup decoding ({args.num_tokens} tokens, n-gram <= {args.max_ngram})")
+    handler.config.prompt_lookup_num_tokens = args.num_tokens
+    handler.config.prompt_lookup_max_ngram = args.max_ngram
+    lookup = run_generation(handler, contexts)
+
+    print("\nResults:")
+    print_summary("greedy", baseline)
+    print_summary("prompt-lookup", lookup, baseline=baseline)
+
+
+if __name__ == "__main__":
+    main()
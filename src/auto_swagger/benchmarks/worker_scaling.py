@@ -0,0 +1,72 @@
+import argparse
+import os
+import time
+
+from auto_swagger.swagger_generator.generator_config import LLMConfig
+from auto_swagger.swagger_generator.llm_handler import LLMHandler
+from auto_swagger.swagger_generator.worker_pool import ForkedWorkerBackend
+from .common import load_example_contexts
+
+
+def main():
+    """Measures aggregate tokens/sec of the forked worker pool as the number of workers grows.
+
+    All routes go through LLMHandler.generate_documentation in one call, as
+    the streaming pipeline does for each group of parsed files, so the
+    workers share the sub-batches of the default pipeline rather than being
+    handed whole files.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark data-parallel CPU generation across forked workers."
+    )
+    parser.add_argument("--limit", type=int, help="Number of example files to use", default=16)
+    parser.add_argument(
+        "--workers",
+        type=str,
+        help="Comma-separated worker counts to measure",
+        default="1,2,4,8",
+    )
+    parser.add_argument("--inference-profile", choices=["default", "cpu-int8"], default="cpu-int8")
+    args = parser.parse_args()
+
+    contexts = load_example_contexts(limit=args.limit)
+    routes = [entry for docs in contexts.values() for entry in docs]
+    print(f"Loaded {len(routes)} routes from {len(contexts)} example files on {os.cpu_count()} cores")
+
+    # Load the model once; every pool size forks from the same parent
+    handler = LLMHandler(LLMConfig(
+        inference_profile=args.inference_profile,
+        # The parent only loads the model, so torch's thread pool is never started before forking
+        num_threads=1,
+        cache_enabled=False,
+        template_rendering=False,
+    ))
+    model_backend = handler.backend
+
+    results = []
+    for num_workers in (int(n) for n in args.workers.split(",")):
+        pool = ForkedWorkerBackend(model_backend, num_workers)
+        handler.backend = pool
+        # Start every pool size without the routes documented by the previous one
+        handler.start_run()
+        start_time = time.perf_counter()
+        handler.generate_documentation(routes)
+        elapsed = time.perf_counter() - start_time
+        pool.close()
+
+        tokens = handler.metrics.summary()["output_tokens"]
+        results.append((num_workers, pool.threads_per_worker, tokens, elapsed))
+        print(f"  {num_workers} workers: {tokens} tokens in {elapsed:.2f}s")
+    handler.backend = model_backend
+
+    print("\nResults:")
+    base_rate = results[0][2] / results[0][3] if results[0][3] else 0.0
+    for num_workers, threads, tokens, elapsed in results:
+        rate = tokens / elapsed if elapsed else 0.0
+        speedup = rate / base_rate if base_rate else 0.0
+        print(f"{num_workers:>3} workers x {threads:>3} threads {tokens:>8} tokens {elapsed:>9.2f}s "
+              f"{rate:>8.2f} tok/s   scaling: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Get the project root directory
@@ -7,6 +8,20 @@ PROJECT_ROOT = Path(__file__).parent.parent.parent.parent.resolve()
 DATA_DIR = PROJECT_ROOT / "data"
 SWAGGER_DOCS_DIR = DATA_DIR / "swagger_docs"
 FINETUNE_DATA_PATH = DATA_DIR / "jsdocs_finetune.jsonl"
+FINETUNE_SPEC_DATA_PATH = DATA_DIR / "jsdocs_finetune_spec.jsonl"
 
 # Model paths
-MODEL_OUTPUT_DIR = PROJECT_ROOT / "lora_adapters"
\ No newline at end of file
+MODEL_OUTPUT_DIR = PROJECT_ROOT / "lora_adapters"
+
+# Cache paths (override with AUTO_SWAGGER_CACHE_DIR)
+CACHE_DIR = Path(
+    os.environ.get("AUTO_SWAGGER_CACHE_DIR", Path.home() / ".cache" / "auto_swagger")
+)
+DOC_CACHE_PATH = CACHE_DIR / "generated_docs.json"
+MODEL_BUNDLE_DIR = CACHE_DIR / "model_bundle"
+ONNX_MODEL_DIR = CACHE_DIR / "onnx_model"
+DAEMON_SOCKET_PATH = CACHE_DIR / "daemon.sock"
+METRICS_PATH = CACHE_DIR / "metrics.json"
+TOKEN_STATS_PATH = CACHE_DIR / "token_stats.json"
+EXAMPLE_INDEX_DIR = CACHE_DIR / "example_index"
+OPENAPI_FRAGMENTS_DIR = CACHE_DIR / "openapi_fragments"
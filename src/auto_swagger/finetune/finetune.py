@@ -8,14 +8,16 @@ from transformers import (
     DataCollatorForLanguageModeling,
 )
 from peft import LoraConfig, get_peft_model, prepare_model_for_kbit_training
+import argparse
 import json
 from datasets import Dataset
-from auto_swagger.config.settings import MODEL_OUTPUT_DIR, FINETUNE_DATA_PATH
+from auto_swagger.config.settings import MODEL_OUTPUT_DIR, FINETUNE_DATA_PATH, FINETUNE_SPEC_DATA_PATH
 
 class FineTuner:
-    def __init__(self):
+    def __init__(self, output_format="jsdoc"):
         self.output_dir = MODEL_OUTPUT_DIR
-        self.jsonl_path = FINETUNE_DATA_PATH
+        # Train on completions matching the LLMConfig.output_format the adapter will serve
+        self.jsonl_path = FINETUNE_SPEC_DATA_PATH if output_format == "spec" else FINETUNE_DATA_PATH
         self.stop_token = "<|endofjsdoc|>"
         self.tokenizer = None
         self.model_name = "deepseek-ai/deepseek-coder-1.3b-instruct"
@@ -173,7 +175,11 @@ def load_jsonl(file_path):
 
 def main():
     """Main entry point"""
-    finetuner = FineTuner()
+    parser = argparse.ArgumentParser(description="Fine-tune the LoRA adapter.")
+    parser.add_argument("--output-format", choices=["jsdoc", "spec"], default="jsdoc")
+    args = parser.parse_args()
+
+    finetuner = FineTuner(output_format=args.output_format)
     finetuner.setup_tokenizer()
     finetuner.load_model()
     finetuner.train()
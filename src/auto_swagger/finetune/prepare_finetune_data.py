@@ -1,9 +1,107 @@
+import argparse
 import re
 import json
 from pathlib import Path
-from config.settings import PROJECT_ROOT, SWAGGER_DOCS_DIR, FINETUNE_DATA_PATH
 
-def prepare_finetune_data_jsdocs(input_dir, output_file, stop_token="<|endofjsdoc|>"):
+import yaml
+
+from config.settings import PROJECT_ROOT, SWAGGER_DOCS_DIR, FINETUNE_DATA_PATH, FINETUNE_SPEC_DATA_PATH
+from swagger_generator.jsdoc_renderer import operation_to_spec, parse_jsdoc_block
+
+
+COMPONENT_REF_PREFIX = "#/components/"
+
+
+def load_components(input_dir, components_file=None):
+    """
+    Collects the OpenAPI components defined in the corpus, for inlining the
+    $refs of spec completions.
+
+    Args:
+        input_dir (str | Path): Directory whose .js files are searched for
+            @openapi/@swagger blocks with a top-level ``components`` key.
+        components_file (str | Path | None): Optional OpenAPI YAML or JSON
+            document whose ``components`` are added as well.
+
+    Returns:
+        dict: Component sections (schemas, parameters, ...) by name.
+    """
+    components = {}
+    documents = []
+    for filepath in Path(input_dir).rglob("*.js"):
+        content = filepath.read_text(encoding='utf-8')
+        for block in re.findall(r"/\*\*[\s\S]*?\*/", content):
+            if re.search(r"@(openapi|swagger)\b", block):
+                try:
+                    documents.append(parse_jsdoc_block(block))
+                except yaml.YAMLError:
+                    continue
+    if components_file is not None:
+        documents.append(yaml.safe_load(Path(components_file).read_text(encoding='utf-8')))
+
+    for document in documents:
+        for section, entries in ((document or {}).get("components") or {}).items():
+            components.setdefault(section, {}).update(entries or {})
+    return components
+
+
+def inline_component_refs(value, components, resolving=()):
+    """
+    Replaces every ``$ref: '#/components/...'`` in value with the referenced
+    component, so the model never learns to reference components the target
+    repository may not define.
+
+    Args:
+        value: Parsed OpenAPI value.
+        components (dict): Component sections by name (see load_components).
+        resolving (tuple): References being inlined, to detect cycles.
+
+    Returns:
+        A copy of value without component references.
+
+    Raises:
+        ValueError: If a reference is not defined or refers to itself.
+    """
+    if isinstance(value, list):
+        return [inline_component_refs(item, components, resolving) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    ref = value.get("$ref")
+    if isinstance(ref, str) and ref.startswith(COMPONENT_REF_PREFIX):
+        section, _, name = ref[len(COMPONENT_REF_PREFIX):].partition("/")
+        if ref in resolving:
+            raise ValueError(f"Recursive component reference {ref}")
+        if name not in components.get(section, {}):
+            raise ValueError(f"Undefined component reference {ref}")
+        return inline_component_refs(components[section][name], components, resolving + (ref,))
+    return {key: inline_component_refs(item, components, resolving) for key, item in value.items()}
+
+
+def jsdoc_to_spec_completion(jsdoc, components=None):
+    """
+    Converts a Swagger JSDoc block into the compact spec JSON the model emits
+    in the "spec" output format, with component references inlined.
+
+    Args:
+        jsdoc (str): JSDoc block with an @openapi or @swagger tag.
+        components (dict | None): Component sections by name (see load_components).
+
+    Returns:
+        str: Minified JSON of the compact spec for the block's first operation.
+
+    Raises:
+        ValueError: If the block references a component that is not defined.
+    """
+    paths = parse_jsdoc_block(jsdoc)
+    operations = next(iter(paths.values()))
+    operation = inline_component_refs(next(iter(operations.values())), components or {})
+    return json.dumps(operation_to_spec(operation), ensure_ascii=False, separators=(",", ":"))
+
+
+def prepare_finetune_data_jsdocs(
+    input_dir, output_file, stop_token="<|endofjsdoc|>", output_format="jsdoc", components_file=None
+):
     """
     Recursively scans .js files in input_dir, extracts each @openapi JSDoc block
     and its route handler stub, and writes prompt-completion pairs to a JSONL file
@@ -13,6 +111,12 @@ def prepare_finetune_data_jsdocs(input_dir, output_file, stop_token="<|endofjsdo
         input_dir (str | Path): Directory to search for .js files.
         output_file (str | Path): Path to the output JSONL file.
         stop_token (str): Token to append at the end of each completion.
+        output_format (str): "jsdoc" for full JSDoc completions, "spec" for compact
+            spec completions matching LLMConfig.output_format. Spec completions
+            have their component references inlined; blocks referencing
+            components that are not defined are skipped.
+        components_file (str | Path | None): OpenAPI document defining further
+            components for spec completions.
     """
     # Convert input paths to absolute paths
     input_dir = Path(input_dir).resolve()
@@ -26,6 +130,8 @@ def prepare_finetune_data_jsdocs(input_dir, output_file, stop_token="<|endofjsdo
     )
 
     examples = []
+    skipped = 0
+    components = load_components(input_dir, components_file) if output_format == "spec" else {}
 
     for filepath in input_dir.rglob("*.js"):
         content = filepath.read_text(encoding='utf-8')
@@ -42,7 +148,15 @@ def prepare_finetune_data_jsdocs(input_dir, output_file, stop_token="<|endofjsdo
                 "Generate JSDoc Swagger comments for this Express route:\n"
                 f"{stub_clean}"
             )
-            completion = jsdoc.replace("\r\n", "\n") + "\n" + stop_token
+            if output_format == "spec":
+                try:
+                    completion = jsdoc_to_spec_completion(jsdoc, components) + "\n" + stop_token
+                except ValueError as e:
+                    print(f"Skipping {filepath.name}: {e}")
+                    skipped += 1
+                    continue
+            else:
+                completion = jsdoc.replace("\r\n", "\n") + "\n" + stop_token
 
             examples.append({
                 "filepath": str(filepath.relative_to(PROJECT_ROOT)),
@@ -56,7 +170,16 @@ def prepare_finetune_data_jsdocs(input_dir, output_file, stop_token="<|endofjsdo
             json.dump(ex, out_f, ensure_ascii=False)
             out_f.write("\n")
     print(f"Collected {len(examples)} examples into {output_file}")
+    if skipped:
+        print(f"Skipped {skipped} examples referencing undefined components (pass --components to define them)")
 
 
 if __name__ == "__main__":
-    prepare_finetune_data_jsdocs(SWAGGER_DOCS_DIR, FINETUNE_DATA_PATH)
+    parser = argparse.ArgumentParser(description="Build the JSDoc fine-tuning dataset.")
+    parser.add_argument("--output-format", choices=["jsdoc", "spec"], default="jsdoc")
+    parser.add_argument("--components", help="OpenAPI document defining the components referenced by the corpus")
+    args = parser.parse_args()
+    output_path = FINETUNE_SPEC_DATA_PATH if args.output_format == "spec" else FINETUNE_DATA_PATH
+    prepare_finetune_data_jsdocs(
+        SWAGGER_DOCS_DIR, output_path, output_format=args.output_format, components_file=args.components
+    )
@@ -2,11 +2,23 @@ import argparse
 from auto_swagger.parser.parser import ApiDocParser
 from pathlib import Path
 
+from auto_swagger.swagger_generator.background_loader import BackgroundLoader
 from auto_swagger.swagger_generator.generator_config import Config
+from auto_swagger.swagger_generator.daemon import DaemonClient, InferenceDaemon, generation_settings
 from auto_swagger.swagger_generator.file_handler import FileHandler
 from auto_swagger.swagger_generator.git_handler import GitHandler
 from auto_swagger.swagger_generator.llm_handler import LLMHandler
 from auto_swagger.swagger_generator.models import Change
+from auto_swagger.swagger_generator.openapi_store import OpenApiStore, update_openapi_document
+from auto_swagger.swagger_generator.streaming import StreamingPipeline
+
+
+def named_adapter(value: str) -> tuple[str, str]:
+    """Parses a NAME=ADAPTER_ID command line value."""
+    name, separator, adapter_id = value.partition("=")
+    if not separator or not name or not adapter_id:
+        raise argparse.ArgumentTypeError(f"expected NAME=ADAPTER_ID, got '{value}'")
+    return name, adapter_id
 
 
 def parse_args() -> argparse.Namespace:
@@ -26,10 +38,201 @@ def parse_args() -> argparse.Namespace:
         help="Branch to check for unmerged changes (defaults to current branch)",
         default=None,
     )
+    parser.add_argument(
+        "--model-bundle",
+        type=str,
+        help="Path to a merged model bundle created with `bundle-model` (loads offline)",
+        default=None,
+    )
+    parser.add_argument(
+        "--lora-adapter",
+        type=named_adapter,
+        action="append",
+        metavar="NAME=ADAPTER_ID",
+        help="Also load this LoRA adapter (repo ID or path) on the same base model, repeatable",
+        default=[],
+    )
+    parser.add_argument(
+        "--adapter",
+        type=str,
+        help="Named LoRA adapter to document this repository with (\"default\" is the configured adapter)",
+        default=None,
+    )
+    parser.add_argument(
+        "--inference-profile",
+        choices=["default", "cpu-int8"],
+        help="Inference profile (cpu-int8 applies dynamic int8 quantization on CPU)",
+        default="default",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        help="Number of torch intra-op threads",
+        default=None,
+    )
+    parser.add_argument(
+        "--interop-threads",
+        type=int,
+        help="Number of torch inter-op threads",
+        default=None,
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Forked CPU generation workers sharing the loaded model",
+        default=None,
+    )
+    parser.add_argument(
+        "--threads-per-worker",
+        type=int,
+        help="Torch threads per generation worker (defaults to the cores divided evenly)",
+        default=None,
+    )
+    parser.add_argument(
+        "--prompt-lookup-tokens",
+        type=int,
+        help="Tokens drafted from prompt n-grams per decoding step (0 disables prompt-lookup decoding)",
+        default=None,
+    )
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="Compile the model with a static KV cache and warm it up before generating (disables prompt lookup)",
+    )
+    parser.add_argument(
+        "--kv-cache",
+        choices=["dynamic", "quantized", "offloaded"],
+        help="KV cache for generation: full precision, quantized (needs optimum-quanto) or offloaded to CPU (CUDA only)",
+        default=None,
+    )
+    parser.add_argument(
+        "--kv-cache-bits",
+        type=int,
+        choices=[2, 4],
+        help="Bits per value of the quantized KV cache",
+        default=None,
+    )
+    parser.add_argument(
+        "--kv-cache-limit-mb",
+        type=float,
+        help="Only use the --kv-cache strategy for requests whose full-precision cache would exceed this many MB",
+        default=None,
+    )
+    parser.add_argument(
+        "--no-constrained-decoding",
+        action="store_true",
+        help="Do not constrain generation to the changes JSON schema",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["jsdoc", "spec"],
+        help="What the model emits per route: full JSDoc blocks, or a compact spec rendered to JSDoc locally",
+        default=None,
+    )
+    parser.add_argument(
+        "--keep-stale",
+        action="store_true",
+        help="Keep existing @swagger blocks that lack parameters or status codes of their route",
+    )
+    parser.add_argument(
+        "--regenerate-existing",
+        action="store_true",
+        help="Regenerate and replace existing @swagger blocks even if they match their routes",
+    )
+    parser.add_argument(
+        "--no-examples",
+        action="store_true",
+        help="Do not add similar fine-tuning examples to the prompts",
+    )
+    parser.add_argument(
+        "--verbose-prompt",
+        action="store_true",
+        help="Send route contexts as indented JSON instead of the compact encoding (for debugging)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["transformers", "onnx", "openai"],
+        help="Run the model in-process (transformers), with onnxruntime (onnx) or on an OpenAI-compatible server (openai)",
+        default=None,
+    )
+    parser.add_argument(
+        "--onnx-model",
+        type=str,
+        help="ONNX export to run with the onnx backend (created with export-onnx); selects the onnx backend",
+        default=None,
+    )
+    parser.add_argument(
+        "--api-base-url",
+        type=str,
+        help="Base URL of the OpenAI-compatible server, e.g. http://localhost:8000/v1",
+        default=None,
+    )
+    parser.add_argument(
+        "--api-model",
+        type=str,
+        help="Model name to request from the server (defaults to the configured model name)",
+        default=None,
+    )
+    parser.add_argument(
+        "--api-concurrency",
+        type=int,
+        help="Concurrent requests per route batch sent to the server",
+        default=None,
+    )
+    parser.add_argument(
+        "--no-streaming",
+        action="store_true",
+        help="Generate all documentation before applying any of it, instead of applying each route as it is generated",
+    )
+    parser.add_argument(
+        "--openapi-output",
+        type=str,
+        help="Consolidated OpenAPI document to keep up to date, implies --openapi (default: openapi.json in the repository)",
+        default=None,
+    )
+    parser.add_argument(
+        "--openapi",
+        action="store_true",
+        help="Merge the generated documentation into the consolidated OpenAPI document and commit it",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=str,
+        help="Write per-route and per-batch token and latency metrics to this JSON file",
+        default=None,
+    )
+    parser.add_argument(
+        "--prometheus-textfile",
+        type=str,
+        help="Also write run totals to this file in the Prometheus text format",
+        default=None,
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Run a resident inference daemon that serves generation requests over a Unix socket",
+    )
+    parser.add_argument(
+        "--use-daemon",
+        action="store_true",
+        help="Send generation requests to a running daemon (falls back to a local model)",
+    )
+    parser.add_argument(
+        "--daemon-socket",
+        type=str,
+        help="Unix socket path of the inference daemon",
+        default=None,
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        help="Seconds without requests before the daemon exits (0 disables)",
+        default=None,
+    )
     return parser.parse_args()
 
 
-def process_changes(changes: list[Change], git_handler: GitHandler) -> None:
+def process_changes(changes: list[Change], git_handler: GitHandler, config: Config) -> None:
     """Process and commit the generated changes."""
     if not changes:
         return
@@ -42,24 +245,63 @@ def process_changes(changes: list[Change], git_handler: GitHandler) -> None:
         print("Code:")
         print(change.code)
 
-    successful_changes = []
-    file_handler = FileHandler(str(git_handler.repo.working_dir))
+    file_handler = FileHandler(str(git_handler.repo.working_dir), config.pipeline.write_workers)
 
-    # Apply changes
+    # Apply changes, writing each file once
+    successful_changes = file_handler.apply_batch(changes)
     for change in changes:
-        print(f"\nApplying changes to: {change.filepath}")
-        print(f"Start line: {change.start_line}")
-        print(f"Description: {change.description}")
-
-        if file_handler.apply_changes(change):
-            successful_changes.append(change)
-            print("✓ Changes applied successfully")
+        if change in successful_changes:
+            print(f"✓ Applied {change.description} to {change.filepath}:{change.start_line}")
         else:
-            print("✗ Failed to apply changes")
+            print(f"✗ Failed to apply {change.description} to {change.filepath}")
 
     # Commit successful changes
     if successful_changes:
-        git_handler.commit_changes(successful_changes)
+        openapi_paths = update_openapi(config, str(git_handler.repo.working_dir), successful_changes)
+        git_handler.commit_changes(successful_changes, openapi_paths)
+
+
+def update_openapi(config: Config, repo_path: str, changes: list[Change]) -> list[str]:
+    """Merges the doc blocks of the changed files into the consolidated OpenAPI document.
+
+    Returns:
+        The document path to commit with the changes, if it is inside the repository
+    """
+    if not config.openapi.enabled or not changes:
+        return []
+    store = OpenApiStore(
+        repo_path,
+        config.openapi.output_path,
+        config.openapi.fragments_path,
+        config.openapi.title,
+        config.openapi.version,
+    )
+    try:
+        update_openapi_document(store, [change.filepath for change in changes])
+    except Exception as e:
+        print(f"Warning: Could not update {store.output_path}: {e}")
+        return []
+    try:
+        return [str(store.output_path.resolve().relative_to(store.repo_path))]
+    except ValueError:
+        return []
+
+
+def create_llm_handler(config: Config, use_daemon: bool):
+    """Returns a client for a running inference daemon if requested and available,
+    otherwise a local LLMHandler."""
+    if use_daemon:
+        client = DaemonClient(config.daemon, config.llm.adapter, generation_settings(config.llm))
+        mismatched = client.mismatched_settings() if client.is_available() else None
+        if mismatched is None:
+            print(f"\nNo inference daemon at {config.daemon.socket_path}, loading the model locally")
+        elif mismatched:
+            print(f"\nInference daemon at {config.daemon.socket_path} was started with different settings "
+                  f"({', '.join(mismatched)}), loading the model locally")
+        else:
+            print(f"\nUsing inference daemon at {config.daemon.socket_path}")
+            return client
+    return LLMHandler(config.llm)
 
 
 def parse_files_with_context(file_paths: list[str], repo_path: str) -> list:
@@ -96,10 +338,75 @@ def main():
 
         # Initialize configuration
         config = Config.create(args.repo_path)
+        if args.model_bundle:
+            config.llm.model_bundle_path = Path(args.model_bundle)
+        if args.lora_adapter:
+            config.llm.lora_adapters = dict(args.lora_adapter)
+        if args.adapter:
+            config.llm.adapter = args.adapter
+        config.llm.inference_profile = args.inference_profile
+        config.llm.num_threads = args.threads
+        config.llm.num_interop_threads = args.interop_threads
+        if args.workers:
+            config.llm.num_workers = args.workers
+            config.llm.threads_per_worker = args.threads_per_worker
+        if args.prompt_lookup_tokens is not None:
+            config.llm.prompt_lookup_num_tokens = args.prompt_lookup_tokens or None
+        if args.compile:
+            config.llm.compiled_generation = True
+        if args.kv_cache:
+            config.llm.kv_cache = args.kv_cache
+        if args.kv_cache_bits:
+            config.llm.kv_cache_bits = args.kv_cache_bits
+        if args.kv_cache_limit_mb is not None:
+            config.llm.kv_cache_memory_limit_mb = args.kv_cache_limit_mb
+        if args.no_constrained_decoding:
+            config.llm.constrained_decoding = False
+        if args.output_format:
+            config.llm.output_format = args.output_format
+        if args.keep_stale:
+            config.llm.update_stale_docs = False
+        if args.regenerate_existing:
+            config.llm.skip_documented = False
+        if args.no_examples:
+            config.llm.example_retrieval = False
+        if args.verbose_prompt:
+            config.llm.prompt_encoding = "verbose"
+        if args.backend:
+            config.llm.backend = args.backend
+        if args.onnx_model:
+            config.llm.onnx_model_path = Path(args.onnx_model)
+            if not args.backend:
+                config.llm.backend = "onnx"
+        if args.api_base_url:
+            config.llm.api_base_url = args.api_base_url
+            if not args.backend:
+                config.llm.backend = "openai"
+        if args.api_model:
+            config.llm.api_model = args.api_model
+        if args.api_concurrency:
+            config.llm.api_concurrency = args.api_concurrency
+        if args.no_streaming:
+            config.pipeline.streaming = False
+        if args.openapi or args.openapi_output:
+            config.openapi.enabled = True
+        if args.openapi_output:
+            config.openapi.output_path = Path(args.openapi_output)
+        if args.metrics_file:
+            config.llm.metrics_path = Path(args.metrics_file)
+        if args.prometheus_textfile:
+            config.llm.prometheus_textfile = Path(args.prometheus_textfile)
+        if args.daemon_socket:
+            config.daemon.socket_path = Path(args.daemon_socket)
+        if args.idle_timeout is not None:
+            config.daemon.idle_timeout = args.idle_timeout
+
+        if args.daemon:
+            InferenceDaemon(LLMHandler(config.llm), config.daemon).serve_forever()
+            return
 
         # Create handlers
         git_handler = GitHandler(config.repo_path, config.git)
-        llm_handler = LLMHandler(config.llm)
 
         # Setup git branch (only if we're using the current branch)
         if not args.branch:
@@ -124,6 +431,13 @@ def main():
             print("No files to process. Exiting.")
             return
 
+        # Start loading the model now so it overlaps with parsing. Forked workers must be
+        # created on the main thread, so with workers the model loads first.
+        forks_workers = config.llm.backend == "transformers" and config.llm.num_workers > 1
+        llm_loader = BackgroundLoader(
+            lambda: create_llm_handler(config, args.use_daemon), background=not forks_workers
+        )
+
         # Parse changed files for API documentation
         print("\nParsing files for API documentation...")
         full_paths = [str(Path(args.repo_path) / f) for f in changed_files]
@@ -131,15 +445,38 @@ def main():
         for path in full_paths:
             print(f"- {path}")
 
+        if config.pipeline.streaming:
+            # Parse, generate and apply concurrently, writing each route as soon as it is validated
+            pipeline = StreamingPipeline(
+                lambda path: parse_files_with_context([path], args.repo_path),
+                llm_loader.result,
+                FileHandler(str(git_handler.repo.working_dir), config.pipeline.write_workers),
+                config.pipeline,
+            )
+            applied = pipeline.run(full_paths)
+            if not pipeline.route_count:
+                print("No API routes to document. Exiting.")
+                llm_loader.abandon()
+                return
+            openapi_paths = update_openapi(config, str(git_handler.repo.working_dir), applied)
+            git_handler.commit_changes(applied, openapi_paths)
+            return
+
         # Use parse_files_with_context to get flattened array of routes
         api_context = parse_files_with_context(full_paths, args.repo_path)
         print(f"\nFound {len(api_context)} API routes to document")
 
+        if not api_context:
+            print("No API routes to document. Exiting.")
+            llm_loader.abandon()
+            return
+
         # Generate documentation using LLM
+        llm_handler = llm_loader.result()
         changes = llm_handler.generate_documentation(api_context)
 
         # Process and commit changes
-        process_changes(changes, git_handler)
+        process_changes(changes, git_handler, config)
 
     except Exception as e:
         print(f"\nError during execution: {e}")
@@ -178,11 +178,41 @@ class ApiDocParser:
                 'line': {
                     'beginning': start_line,
                     'end': end_line
-                }
+                },
+                'existing_doc': self._find_doc_block(m.start())
             })
 
         return routes
 
+    def _find_doc_block(self, route_start):
+        """Finds a @swagger/@openapi JSDoc block directly above a route definition.
+
+        Only whitespace may separate the block's closing ``*/`` from the route.
+
+        Returns:
+            dict: The block's first and last line and its text, or None
+        """
+        code = self.code
+        # Start of the route's line, so indentation before app./router. is allowed
+        line_start = code.rfind('\n', 0, route_start) + 1
+        if code[line_start:route_start].strip():
+            return None
+        block_end = len(code[:line_start].rstrip())
+        if not code.startswith('*/', block_end - 2):
+            return None
+        block_start = code.rfind('/**', 0, block_end - 2)
+        if block_start < 0 or '*/' in code[block_start + 3:block_end - 2]:
+            return None
+
+        text = code[block_start:block_end]
+        if not re.search(r'@(swagger|openapi)\b', text):
+            return None
+        return {
+            'beginning': code.count('\n', 0, block_start) + 1,
+            'end': code.count('\n', 0, block_end) + 1,
+            'text': text
+        }
+
     def _extract_function_body(self, pos):
         """Extracts the code block enclosed in {} starting near the given position."""
         code = self.code
@@ -1082,13 +1112,18 @@ class ApiDocParser:
             # Remove empty parameter categories (path, query, body) if no params found
             params = {k: v for k, v in params.items() if v}
 
+            code_context = {
+                "filename": self.relative_path,  # Use relative path instead of just filename
+                "functionName": func_name,
+                "line": route["line"],
+                "general_purpose": purpose
+            }
+            if route["existing_doc"]:
+                # Lines and text of the @swagger block already above the route
+                code_context["existingDoc"] = route["existing_doc"]
+
             docs.append({
-                "codeContext": {
-                    "filename": self.relative_path,  # Use relative path instead of just filename
-                    "functionName": func_name,
-                    "line": route["line"],
-                    "general_purpose": purpose
-                },
+                "codeContext": code_context,
                 "apiDetails": {
                     resource.lower() + "s": {  # Pluralize resource name
                         "endpoint": {
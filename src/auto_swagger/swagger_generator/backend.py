@@ -0,0 +1,87 @@
+from typing import Any, Dict, Generator, List, Optional
+
+from .generator_config import LLMConfig
+from .models import GenerationResult
+
+BACKENDS = ("transformers", "onnx", "openai")
+
+
+class GenerationBackend:
+    """Interface LLMHandler uses to run the model.
+
+    A backend turns a system and user prompt into the response text. When a
+    route ``context`` is given, backends that support it constrain the
+    response to the changes schema for exactly those routes.
+    """
+
+    # Number of requests the backend can usefully run at the same time
+    max_concurrency: int = 1
+
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        context: Optional[List[Dict[str, Any]]] = None,
+        max_new_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        adapter: Optional[str] = None,
+    ) -> GenerationResult:
+        """Generates a complete response.
+
+        Args:
+            system_prompt: System prompt
+            user_prompt: User prompt
+            context: Route contexts the response documents
+            max_new_tokens: Output token limit, defaults to ``config.max_new_tokens``
+            timeout: Deadline in seconds, defaults to ``config.generation_timeout``
+            adapter: Named LoRA adapter to generate with, defaults to ``config.adapter``
+
+        Raises:
+            Exception: If generation fails or times out
+        """
+        raise NotImplementedError
+
+    def stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        context: Optional[List[Dict[str, Any]]] = None,
+        max_new_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        adapter: Optional[str] = None,
+    ) -> Generator[str, None, GenerationResult]:
+        """Generates a response like generate, yielding the text as it is produced.
+
+        Returns:
+            The GenerationResult of the whole response, as the generator's return value
+        """
+        result = self.generate(system_prompt, user_prompt, context, max_new_tokens, timeout, adapter)
+        yield result.text
+        return result
+
+    def close(self) -> None:
+        """Releases connections or other resources held by the backend."""
+
+
+def create_backend(config: LLMConfig) -> GenerationBackend:
+    """Creates the backend selected by ``config.backend``.
+
+    Backends are imported on demand, so the HTTP backend works without torch
+    or transformers installed and onnxruntime is only needed for the onnx
+    backend. With ``num_workers`` above 1, the in-process model is served by
+    a pool of forked workers.
+    """
+    if config.backend == "transformers":
+        from .transformers_backend import TransformersBackend
+        backend = TransformersBackend(config)
+        if config.num_workers > 1:
+            from .worker_pool import ForkedWorkerBackend
+            return ForkedWorkerBackend(backend, config.num_workers, config.threads_per_worker)
+        return backend
+    if config.backend == "onnx":
+        from .onnx_backend import OnnxRuntimeBackend
+        return OnnxRuntimeBackend(config)
+    if config.backend == "openai":
+        from .http_backend import OpenAIBackend
+        return OpenAIBackend(config)
+    raise ValueError(f"Unknown backend '{config.backend}', expected one of {', '.join(BACKENDS)}")
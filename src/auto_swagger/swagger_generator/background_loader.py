@@ -0,0 +1,81 @@
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class BackgroundLoader:
+    """Builds an object (normally the LLM handler) on a background thread.
+
+    The model load is started once git has found files to parse, so loading
+    and parsing overlap and generation only waits for whatever is left of
+    the load. A load that
+    is never awaited, because no routes were found, is simply abandoned.
+    With ``background`` off the object is built right away on the calling
+    thread instead, for factories that must not run off the main thread.
+    """
+
+    def __init__(self, factory: Callable[[], Any], label: str = "Model", background: bool = True):
+        """
+        Initialize and start the loader.
+
+        Args:
+            factory: Callable returning the loaded object
+            label: Name used in the timing trace
+            background: Build the object on a background thread rather than before returning
+        """
+        self.factory = factory
+        self.label = label
+        self.background = background
+        self.load_seconds: Optional[float] = None
+        self.wait_seconds: Optional[float] = None
+        self._value: Any = None
+        self._error: Optional[BaseException] = None
+        self._done = threading.Event()
+        self._started_at = time.time()
+        if not background:
+            self._load()
+            return
+        # Daemon thread so an abandoned load does not keep the process alive
+        self._thread = threading.Thread(target=self._load, daemon=True)
+        self._thread.start()
+
+    def _load(self) -> None:
+        try:
+            self._value = self.factory()
+        except BaseException as e:
+            self._error = e
+        finally:
+            self.load_seconds = time.time() - self._started_at
+            self._done.set()
+
+    def done(self) -> bool:
+        """Returns True once loading has finished or failed."""
+        return self._done.is_set()
+
+    def result(self) -> Any:
+        """Waits for the load to finish and returns the loaded object.
+
+        Prints how long the caller waited and how much of the load overlapped
+        with the work done in the meantime.
+
+        Raises:
+            Exception: Whatever the factory raised
+        """
+        wait_start = time.time()
+        self._done.wait()
+        self.wait_seconds = time.time() - wait_start
+        if self._error is not None:
+            raise self._error
+
+        if not self.background:
+            print(f"\n{self.label} ready: loaded in {self.load_seconds:.2f}s before parsing")
+            return self._value
+        saved = self.load_seconds - self.wait_seconds
+        print(f"\n{self.label} ready: loaded in {self.load_seconds:.2f}s, waited {self.wait_seconds:.2f}s "
+              f"({saved:.2f}s overlapped with parsing)")
+        return self._value
+
+    def abandon(self) -> None:
+        """Reports that the loaded object is not needed."""
+        state = "finished" if self.done() else "still running"
+        print(f"\n{self.label} not needed, skipped waiting for the load ({state})")
@@ -0,0 +1,382 @@
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import torch
+from transformers import LogitsProcessor
+
+WHITESPACE = " \t\n\r"
+
+# Marker for a free-form JSON string slot in the grammar
+STRING = None
+# Marker for a free-form JSON object slot in the grammar
+OBJECT = object()
+
+# Nested JSON value state: (open containers, mode, remaining literal characters)
+NestedState = Tuple[str, str, str]
+# Recognizer state: (token index, position within the token, string escape state, nested value state)
+GrammarState = Tuple[int, int, int, Optional[NestedState]]
+
+# Highest scoring tokens checked against the grammar before sorting the whole vocabulary
+TOP_CANDIDATES = 64
+
+# SentencePiece byte-fallback tokens, e.g. <0xE2>
+_BYTE_TOKEN = re.compile(r"^<0x([0-9A-Fa-f]{2})>$")
+
+_LITERALS = {"t": "rue", "f": "alse", "n": "ull"}
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+def _string_char(ch: str, escape: int) -> Optional[Tuple[bool, int]]:
+    """Advances over one character inside a JSON string.
+
+    Returns:
+        (closed, escape) where ``closed`` is True on the closing quote, or None if invalid
+    """
+    if escape == 1:
+        # Character right after a backslash
+        if ch == "u":
+            return False, 2
+        if ch in '"\\/bfnrt':
+            return False, 0
+        return None
+    if escape >= 2:
+        # Hex digits of a \uXXXX escape
+        if ch not in "0123456789abcdefABCDEF":
+            return None
+        return False, 0 if escape == 5 else escape + 1
+    if ch == "\\":
+        return False, 1
+    if ch == '"':
+        return True, 0
+    if ord(ch) < 0x20:
+        return None
+    return False, 0
+
+
+def _nested_char(nested: NestedState, escape: int, ch: str) -> Optional[Tuple[NestedState, int, bool]]:
+    """Advances a free-form JSON object over one character.
+
+    Returns:
+        (nested, escape, done), or None if the character is invalid. ``done``
+        is set once the outermost object closes.
+    """
+    stack, mode, remaining = nested
+
+    if mode in ("string", "key_string"):
+        result = _string_char(ch, escape)
+        if result is None:
+            return None
+        closed, escape = result
+        if closed:
+            mode = "after_value" if mode == "string" else "colon"
+        return (stack, mode, ""), escape, False
+
+    if mode == "literal":
+        if ch != remaining[0]:
+            return None
+        remaining = remaining[1:]
+        return (stack, "literal" if remaining else "after_value", remaining), escape, False
+
+    if mode == "number":
+        if ch in _NUMBER_CHARS:
+            return nested, escape, False
+        # The number ended; read this character as whatever follows a value
+        mode = "after_value"
+
+    if ch in WHITESPACE:
+        return (stack, mode, remaining), escape, False
+
+    if mode in ("value", "value_or_end"):
+        if mode == "value_or_end" and ch == "]":
+            return _close(stack, escape)
+        if ch == "{":
+            return (stack + "{", "key_or_end", ""), escape, False
+        if ch == "[":
+            return (stack + "[", "value_or_end", ""), escape, False
+        if ch == '"':
+            return (stack, "string", ""), escape, False
+        if ch in "-0123456789":
+            return (stack, "number", ""), escape, False
+        if ch in _LITERALS:
+            return (stack, "literal", _LITERALS[ch]), escape, False
+        return None
+
+    if mode in ("key_or_end", "key"):
+        if mode == "key_or_end" and ch == "}":
+            return _close(stack, escape)
+        if ch == '"':
+            return (stack, "key_string", ""), escape, False
+        return None
+
+    if mode == "colon":
+        if ch == ":":
+            return (stack, "value", ""), escape, False
+        return None
+
+    # after_value
+    top = stack[-1]
+    if ch == ",":
+        return (stack, "key" if top == "{" else "value", ""), escape, False
+    if ch == ("}" if top == "{" else "]"):
+        return _close(stack, escape)
+    return None
+
+
+def _close(stack: str, escape: int) -> Tuple[NestedState, int, bool]:
+    """Closes the innermost container, finishing the slot when it was the outermost one."""
+    stack = stack[:-1]
+    return (stack, "after_value", ""), escape, not stack
+
+
+class ChangesGrammar:
+    """Character-level recognizer for the ``{"changes": [...]}`` response schema.
+
+    The grammar is compiled to a flat sequence of JSON lexical tokens: fixed
+    punctuation and keys, the expected ``filepath`` of each change, and free
+    slots for the generated value (a ``code`` string, or a ``spec`` object in
+    the compact output format) and the ``description`` string. Whitespace is
+    allowed between lexical tokens. The number of changes and their filepaths
+    are fixed by the route context, so a complete parse always lines up with it.
+    """
+
+    def __init__(self, filenames: Sequence[str], output_format: str = "jsdoc"):
+        """
+        Initialize the grammar.
+
+        Args:
+            filenames: The ``codeContext.filename`` of each route, in prompt order
+            output_format: "jsdoc" for a ``code`` string per change, "spec" for a ``spec`` object
+        """
+        value_key, value_slot = ('"spec"', OBJECT) if output_format == "spec" else ('"code"', STRING)
+        tokens: List[Any] = ["{", '"changes"', ":", "["]
+        for i, filename in enumerate(filenames):
+            if i:
+                tokens.append(",")
+            tokens += [
+                "{",
+                '"filepath"', ":", json.dumps(filename, ensure_ascii=False), ",",
+                value_key, ":", value_slot, ",",
+                '"description"', ":", STRING,
+                "}",
+            ]
+        tokens += ["]", "}"]
+        self.tokens = tokens
+        self.initial: GrammarState = (0, 0, 0, None)
+
+    def is_complete(self, state: GrammarState) -> bool:
+        """Returns True once the whole object has been generated."""
+        return state[0] == len(self.tokens)
+
+    def feed(self, state: GrammarState, text: str) -> Optional[GrammarState]:
+        """Advances the recognizer over ``text``.
+
+        Returns:
+            The new state, or None if ``text`` cannot continue a valid response
+        """
+        index, pos, escape, nested = state
+        tokens = self.tokens
+        for ch in text:
+            if index == len(tokens):
+                if ch in WHITESPACE:
+                    continue
+                return None
+
+            token = tokens[index]
+            if nested is not None:
+                result = _nested_char(nested, escape, ch)
+                if result is None:
+                    return None
+                nested, escape, done = result
+                if done:
+                    index, pos, nested = index + 1, 0, None
+                continue
+
+            if pos == 0:
+                # Between lexical tokens
+                if ch in WHITESPACE:
+                    continue
+                if token is OBJECT:
+                    if ch != "{":
+                        return None
+                    nested = ("{", "key_or_end", "")
+                    continue
+                if token is STRING:
+                    if ch != '"':
+                        return None
+                    pos = 1
+                    continue
+                if ch != token[0]:
+                    return None
+                if len(token) == 1:
+                    index += 1
+                else:
+                    pos = 1
+                continue
+
+            if token is STRING:
+                result = _string_char(ch, escape)
+                if result is None:
+                    return None
+                closed, escape = result
+                if closed:
+                    index += 1
+                    pos = 0
+                continue
+
+            if ch != token[pos]:
+                return None
+            pos += 1
+            if pos == len(token):
+                index += 1
+                pos = 0
+        return (index, pos, escape, nested)
+
+
+def _bytes_to_unicode() -> Dict[int, str]:
+    """Returns the byte to printable character mapping of byte-level BPE vocabularies (as in GPT-2)."""
+    printable = [*range(ord("!"), ord("~") + 1), *range(ord("¡"), ord("¬") + 1), *range(ord("®"), ord("ÿ") + 1)]
+    mapping = {byte: chr(byte) for byte in printable}
+    extra = 0
+    for byte in range(256):
+        if byte not in mapping:
+            mapping[byte] = chr(256 + extra)
+            extra += 1
+    return mapping
+
+
+def _byte_decoder(tokenizer) -> Optional[Dict[str, int]]:
+    """Returns the character to byte mapping of a byte-level BPE tokenizer, or None for other tokenizers."""
+    if getattr(tokenizer, "byte_decoder", None):
+        return tokenizer.byte_decoder
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None and type(backend.decoder).__name__ == "ByteLevel":
+        return {char: byte for byte, char in _bytes_to_unicode().items()}
+    return None
+
+
+def build_token_texts(tokenizer) -> List[str]:
+    """Returns the text every vocabulary entry adds to the output, for checking candidates against the grammar.
+
+    Decoding a token id on its own turns a token holding part of a UTF-8
+    character into U+FFFD. Instead, the raw bytes of every token are read
+    from the byte-level vocabulary (or SentencePiece byte-fallback tokens)
+    and decoded with ``surrogateescape``, so the bytes of a partial
+    character become lone surrogates. Those are accepted inside JSON strings
+    like any other character but never match a literal of the grammar.
+    """
+    byte_decoder = _byte_decoder(tokenizer)
+    # Added tokens are stored as their text, not byte-level encoded
+    added_ids = set(getattr(tokenizer, "added_tokens_decoder", {}))
+    texts = []
+    for token_id, token in enumerate(tokenizer.convert_ids_to_tokens(list(range(len(tokenizer))))):
+        byte_token = _BYTE_TOKEN.match(token or "")
+        if token_id in added_ids:
+            texts.append(tokenizer.decode([token_id], clean_up_tokenization_spaces=False))
+        elif byte_token:
+            texts.append(bytes([int(byte_token.group(1), 16)]).decode("utf-8", errors="surrogateescape"))
+        elif byte_decoder is not None and token and all(char in byte_decoder for char in token):
+            texts.append(bytes(byte_decoder[char] for char in token).decode("utf-8", errors="surrogateescape"))
+        else:
+            # Special and added tokens, and vocabularies that are not byte-level
+            texts.append(tokenizer.decode([token_id], clean_up_tokenization_spaces=False))
+    return texts
+
+
+class ChangesSchemaLogitsProcessor(LogitsProcessor):
+    """Restricts greedy generation to responses accepted by a ChangesGrammar.
+
+    For every sequence, the highest scoring token that keeps the output a
+    valid prefix of the grammar is the only token left unmasked, and EOS is
+    forced once the object is complete. Grammar states are derived from the
+    generated ids on every call (with a per-row cache of prefix states), so
+    the processor also works when assisted decoding verifies several
+    positions at once.
+    """
+
+    def __init__(
+        self,
+        grammar: ChangesGrammar,
+        token_texts: List[str],
+        prompt_length: int,
+        eos_token_id: int,
+        special_token_ids: Iterable[int] = (),
+    ):
+        """
+        Initialize the processor.
+
+        Args:
+            grammar: The grammar generated text must follow
+            token_texts: Decoded text of every token id (see build_token_texts)
+            prompt_length: Length of the (padded) prompt in ``input_ids``
+            eos_token_id: Token forced once the response is complete
+            special_token_ids: Token ids that are never valid inside the response
+        """
+        self.grammar = grammar
+        self.token_texts = token_texts
+        self.prompt_length = prompt_length
+        self.eos_token_id = eos_token_id
+        self.special_token_ids = set(special_token_ids)
+        self._rows: Dict[int, Tuple[List[int], List[Optional[GrammarState]]]] = {}
+
+    def _state_for(self, row: int, generated: List[int]) -> Optional[GrammarState]:
+        """Returns the grammar state after ``generated``, reusing states of the longest cached prefix."""
+        cached_ids, states = self._rows.get(row, ([], [self.grammar.initial]))
+
+        if generated[:len(cached_ids)] == cached_ids:
+            common = len(cached_ids)
+        else:
+            common = 0
+            limit = min(len(cached_ids), len(generated))
+            while common < limit and cached_ids[common] == generated[common]:
+                common += 1
+        states = states[:common + 1]
+
+        for token_id in generated[common:]:
+            state = states[-1]
+            if state is not None and not self.grammar.is_complete(state):
+                state = self.grammar.feed(state, self.token_texts[token_id])
+            states.append(state)
+
+        self._rows[row] = (list(generated), states)
+        return states[-1]
+
+    def _is_valid(self, state: GrammarState, token_id: int) -> bool:
+        """Checks whether ``token_id`` keeps the response a valid prefix of the grammar."""
+        if token_id in self.special_token_ids or token_id >= len(self.token_texts):
+            return False
+        text = self.token_texts[token_id]
+        return bool(text) and self.grammar.feed(state, text) is not None
+
+    def _best_token(self, state: Optional[GrammarState], row_scores: torch.Tensor) -> int:
+        """Returns the highest scoring token that is valid in ``state``.
+
+        The valid token is nearly always among the few highest scores, so
+        only the ``TOP_CANDIDATES`` best are ranked first; the whole
+        vocabulary is sorted only if none of them is valid.
+        """
+        if state is None or self.grammar.is_complete(state):
+            return self.eos_token_id
+
+        best = int(torch.argmax(row_scores))
+        if self._is_valid(state, best):
+            return best
+        k = min(TOP_CANDIDATES, row_scores.shape[-1])
+        top_ids = torch.topk(row_scores, k).indices.tolist()
+        for token_id in top_ids:
+            if self._is_valid(state, token_id):
+                return token_id
+        if k < row_scores.shape[-1]:
+            checked = set(top_ids)
+            for token_id in torch.argsort(row_scores, descending=True).tolist():
+                if token_id not in checked and self._is_valid(state, token_id):
+                    return token_id
+        return self.eos_token_id
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        processed = torch.full_like(scores, float("-inf"))
+        for row in range(input_ids.shape[0]):
+            generated = input_ids[row, self.prompt_length:].tolist()
+            token_id = self._best_token(self._state_for(row, generated), scores[row])
+            processed[row, token_id] = scores[row, token_id]
+        return processed
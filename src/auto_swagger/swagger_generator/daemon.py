@@ -0,0 +1,324 @@
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .generator_config import DaemonConfig, LLMConfig
+from .models import Change
+
+# LLMConfig fields that change what a generation returns. A daemon only serves
+# clients whose settings match its own; the adapter is chosen per request instead.
+GENERATION_SETTINGS = (
+    "model_name", "lora_adapter_id", "lora_adapters", "inference_profile", "backend", "api_base_url", "api_model",
+    "max_new_tokens", "max_retries", "temperature", "top_k", "top_p", "kv_cache", "kv_cache_bits",
+    "kv_cache_memory_limit_mb", "constrained_decoding", "output_format", "prompt_encoding", "skip_documented", "update_stale_docs", "template_rendering",
+    "template_confidence_threshold", "example_retrieval", "examples_per_route", "example_token_budget",
+    "example_min_similarity", "dedup_routes",
+)
+
+
+def generation_settings(config: LLMConfig) -> Dict[str, Any]:
+    """Returns the JSON-serializable GENERATION_SETTINGS of a config."""
+    settings = {}
+    for name in GENERATION_SETTINGS:
+        value = getattr(config, name)
+        settings[name] = str(value) if isinstance(value, Path) else value
+    return settings
+
+
+def mismatched_settings(daemon_settings: Dict[str, Any], settings: Dict[str, Any]) -> List[str]:
+    """Returns the names of the settings a client sent that differ from the daemon's."""
+    return sorted(name for name, value in settings.items() if daemon_settings.get(name) != value)
+
+
+class _GenerationJob:
+    """A queued generation request waiting for the resident model."""
+
+    def __init__(self, context: List[Dict[str, Any]], adapter: Optional[str] = None):
+        self.context = context
+        self.adapter = adapter
+        self.done = threading.Event()
+        self.changes: Optional[List[Change]] = None
+        self.error: Optional[str] = None
+
+
+class InferenceDaemon:
+    """Keeps an LLMHandler resident and serves generation requests over a Unix domain socket.
+
+    Every request and response is a single line of JSON. Supported commands:
+
+    - ``{"command": "generate", "context": [...], "adapter": "...", "settings": {...}}``
+      queues a generation with the named LoRA adapter (optional, defaults to
+      the daemon's ``adapter``) and replies with ``{"ok": true, "changes": [...]}``
+      once it has run. The optional ``settings`` are the client's
+      GENERATION_SETTINGS; requests whose settings differ from the daemon's
+      are rejected, so they are neither generated nor cached under the wrong
+      settings
+    - ``{"command": "health"}`` replies immediately with the daemon status and settings
+    - ``{"command": "stats"}`` replies with request and generation counters
+    - ``{"command": "shutdown"}`` stops the daemon
+
+    Generations run one at a time on a single worker thread, since the model
+    is not safe to share between concurrent ``generate`` calls. The daemon
+    exits on its own after ``idle_timeout`` seconds without requests.
+    """
+
+    def __init__(self, handler, config: DaemonConfig):
+        """
+        Initialize the daemon.
+
+        Args:
+            handler: Object exposing ``generate_documentation(context, adapter)``, ``start_run()``,
+                ``metrics`` and its LLMConfig as ``config``, normally an LLMHandler
+            config: DaemonConfig with the socket path, queue size and idle timeout
+        """
+        self.handler = handler
+        self.config = config
+        self.socket_path = Path(config.socket_path)
+        self.settings = generation_settings(handler.config)
+        self.jobs: "queue.Queue[_GenerationJob]" = queue.Queue(maxsize=config.max_queue)
+        self.started_at = time.time()
+        self.last_activity = time.time()
+        self.active_jobs = 0
+        self.stats = {
+            "requests": 0,
+            "generations": 0,
+            "failed": 0,
+            "rejected": 0,
+            "routes": 0,
+            "generation_seconds": 0.0,
+        }
+        self._lock = threading.Lock()
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    def serve_forever(self) -> None:
+        """Binds the socket and serves requests until shutdown or idle timeout."""
+        self._prepare_socket()
+        daemon = self
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline()
+                if not line:
+                    return
+                response = daemon.handle_request(line)
+                self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+
+        self._server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), RequestHandler)
+        self._server.daemon_threads = True
+
+        threading.Thread(target=self._worker, daemon=True).start()
+        if self.config.idle_timeout:
+            threading.Thread(target=self._idle_monitor, daemon=True).start()
+
+        print(f"\nInference daemon listening on {self.socket_path} (pid {os.getpid()})")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+            print("Inference daemon stopped")
+
+    def shutdown(self) -> None:
+        """Stops the server loop. Must not be called from the serving thread."""
+        if self._server is not None:
+            self._server.shutdown()
+
+    def _prepare_socket(self) -> None:
+        """Creates the socket directory and removes a stale socket left by a dead daemon."""
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.socket_path.exists():
+            return
+        if DaemonClient(DaemonConfig(socket_path=self.socket_path)).is_available():
+            raise RuntimeError(f"Another daemon is already listening on {self.socket_path}")
+        self.socket_path.unlink()
+
+    def _touch(self) -> None:
+        """Records activity so the idle monitor does not shut the daemon down."""
+        with self._lock:
+            self.last_activity = time.time()
+
+    def handle_request(self, raw: bytes) -> Dict[str, Any]:
+        """Dispatches a single JSON request line and returns the JSON-serializable reply."""
+        try:
+            request = json.loads(raw)
+        except ValueError:
+            return {"ok": False, "error": "Invalid JSON request"}
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "Request must be a JSON object"}
+
+        self._touch()
+        with self._lock:
+            self.stats["requests"] += 1
+
+        command = request.get("command")
+        if command == "health":
+            return {
+                "ok": True,
+                "status": "ready",
+                "pid": os.getpid(),
+                "uptime": time.time() - self.started_at,
+                "queued": self.jobs.qsize(),
+                "active": self.active_jobs,
+                "settings": self.settings,
+            }
+        if command == "stats":
+            with self._lock:
+                stats = dict(self.stats)
+            return {"ok": True, "stats": stats, "last_run": self.handler.metrics.summary()}
+        if command == "shutdown":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"ok": True}
+        if command == "generate":
+            return self._submit(request.get("context"), request.get("adapter"), request.get("settings"))
+        return {"ok": False, "error": f"Unknown command: {command}"}
+
+    def _submit(self, context: Any, adapter: Any = None, settings: Any = None) -> Dict[str, Any]:
+        """Queues a generation request and waits for the worker to finish it."""
+        if not isinstance(context, list):
+            return {"ok": False, "error": "'context' must be a list of route contexts"}
+        if adapter is not None and not isinstance(adapter, str):
+            return {"ok": False, "error": "'adapter' must be an adapter name"}
+        if settings is not None and not isinstance(settings, dict):
+            return {"ok": False, "error": "'settings' must be an object of generation settings"}
+        mismatched = mismatched_settings(self.settings, settings or {})
+        if mismatched:
+            with self._lock:
+                self.stats["rejected"] += 1
+            return {"ok": False, "error": f"Daemon was started with different settings: {', '.join(mismatched)}"}
+
+        job = _GenerationJob(context, adapter)
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.stats["rejected"] += 1
+            return {"ok": False, "error": f"Daemon queue is full ({self.config.max_queue} requests waiting)"}
+
+        job.done.wait()
+        self._touch()
+        if job.error is not None:
+            return {"ok": False, "error": job.error}
+        return {"ok": True, "changes": [asdict(change) for change in job.changes or []]}
+
+    def _worker(self) -> None:
+        """Runs queued generation requests one at a time on the resident handler."""
+        while True:
+            job = self.jobs.get()
+            with self._lock:
+                self.active_jobs += 1
+            start_time = time.time()
+            # Each request is its own run, in the metrics files and for route deduplication
+            self.handler.start_run()
+            try:
+                job.changes = self.handler.generate_documentation(job.context, job.adapter)
+            except Exception as e:
+                job.error = str(e)
+            finally:
+                with self._lock:
+                    self.active_jobs -= 1
+                    self.last_activity = time.time()
+                    self.stats["generations"] += 1
+                    self.stats["routes"] += len(job.context)
+                    self.stats["generation_seconds"] += time.time() - start_time
+                    if job.error is not None:
+                        self.stats["failed"] += 1
+                job.done.set()
+
+    def _idle_monitor(self) -> None:
+        """Shuts the daemon down once it has been idle for ``idle_timeout`` seconds."""
+        interval = min(5.0, self.config.idle_timeout)
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                idle_for = time.time() - self.last_activity
+                busy = self.active_jobs > 0 or not self.jobs.empty()
+            if not busy and idle_for > self.config.idle_timeout:
+                print(f"\nNo requests for {idle_for:.0f} seconds, shutting down")
+                self.shutdown()
+                return
+
+
+class DaemonClient:
+    """Client for a running InferenceDaemon, usable in place of an LLMHandler."""
+
+    def __init__(self, config: DaemonConfig, adapter: Optional[str] = None, settings: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the client.
+
+        Args:
+            config: DaemonConfig with the socket path and request timeout
+            adapter: Named LoRA adapter requested for generations, defaults to the daemon's
+            settings: generation_settings() of the client's LLMConfig, sent with every generation
+        """
+        self.config = config
+        self.adapter = adapter
+        self.settings = settings
+        self.socket_path = Path(config.socket_path)
+
+    def _request(self, payload: Dict[str, Any], timeout: float = 5.0) -> Dict[str, Any]:
+        """Sends one request line and returns the daemon's reply.
+
+        Raises:
+            OSError: If the daemon cannot be reached
+            RuntimeError: If the daemon replies with an error
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(self.socket_path))
+            sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+
+        if not line:
+            raise RuntimeError("Daemon closed the connection without a response")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise RuntimeError(f"Daemon error: {response.get('error', 'unknown error')}")
+        return response
+
+    def is_available(self) -> bool:
+        """Returns True if a daemon is listening on the configured socket."""
+        if not self.socket_path.exists():
+            return False
+        try:
+            self.health()
+            return True
+        except (OSError, RuntimeError, ValueError):
+            return False
+
+    def health(self) -> Dict[str, Any]:
+        """Returns the daemon's health status."""
+        return self._request({"command": "health"})
+
+    def mismatched_settings(self) -> List[str]:
+        """Returns the names of the client's settings the daemon does not share."""
+        return mismatched_settings(self.health().get("settings") or {}, self.settings or {})
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the daemon's request and generation counters."""
+        return self._request({"command": "stats"})["stats"]
+
+    def shutdown(self) -> None:
+        """Asks the daemon to stop."""
+        self._request({"command": "shutdown"})
+
+    def generate_documentation(
+        self, context: List[Dict[str, Any]], adapter: Optional[str] = None
+    ) -> Optional[List[Change]]:
+        """Generates swagger documentation on the daemon's resident model."""
+        payload: Dict[str, Any] = {"command": "generate", "context": context}
+        if adapter or self.adapter:
+            payload["adapter"] = adapter or self.adapter
+        if self.settings is not None:
+            payload["settings"] = self.settings
+        response = self._request(payload, timeout=self.config.request_timeout)
+        changes = [Change(**change) for change in response["changes"]]
+        return changes or None
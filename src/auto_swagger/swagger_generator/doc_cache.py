@@ -0,0 +1,115 @@
+import copy
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from .existing_docs import EXISTING_DOC
+
+
+class DocCache:
+    """Persistent, size-bounded cache of generated Swagger blocks.
+
+    Entries are keyed by a hash of the normalized route context together with
+    the model identity and generation settings, so a route is only sent to the
+    model again when something that influences its documentation has changed.
+    The least recently used entries are evicted once ``max_entries`` is exceeded.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Union[str, Path], max_entries: int = 2048):
+        """
+        Initialize the cache, loading any entries already persisted at ``path``.
+
+        Args:
+            path: Location of the JSON cache file
+            max_entries: Maximum number of entries kept after eviction
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Whether entries were added or their last use refreshed since the last save
+        self.changed = False
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Loads cache entries from disk, discarding unreadable or outdated files."""
+        if not self.path.exists():
+            return {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") != self.VERSION:
+                return {}
+            return data.get("entries", {})
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable documentation cache {self.path}: {e}")
+            return {}
+
+    @staticmethod
+    def normalize_context(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns a copy of a route context without fields that do not affect its docs.
+
+        Line numbers shift on every rebase or unrelated edit above the route,
+        so they are dropped before hashing, as is the doc block the route
+        already has.
+        """
+        normalized = copy.deepcopy(entry)
+        normalized.get("codeContext", {}).pop("line", None)
+        normalized.get("codeContext", {}).pop(EXISTING_DOC, None)
+        return normalized
+
+    @classmethod
+    def make_key(cls, entry: Dict[str, Any], identity: Dict[str, Any]) -> str:
+        """Builds the cache key for a route context and model/generation identity."""
+        payload = json.dumps(
+            {"context": cls.normalize_context(entry), "identity": identity},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        """Returns the cached change data for ``key``, or None on a miss."""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry["last_used"] = time.time()
+        self.changed = True
+        return dict(entry["value"])
+
+    def put(self, key: str, value: Dict[str, str]) -> None:
+        """Stores the generated change data for ``key``."""
+        self.entries[key] = {"value": dict(value), "last_used": time.time()}
+        self.changed = True
+
+    def save(self) -> None:
+        """Evicts least recently used entries and atomically writes the cache to disk."""
+        if len(self.entries) > self.max_entries:
+            keep = sorted(
+                self.entries.items(), key=lambda item: item[1]["last_used"], reverse=True
+            )[: self.max_entries]
+            self.entries = dict(keep)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(
+            json.dumps({"version": self.VERSION, "entries": self.entries}),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.path)
+        self.changed = False
+
+    def print_stats(self) -> None:
+        """Prints hit/miss statistics for this run."""
+        lookups = self.hits + self.misses
+        rate = (self.hits / lookups * 100) if lookups else 0.0
+        print(
+            f"\nDocumentation cache: {self.hits} hits, {self.misses} misses "
+            f"({rate:.0f}% hit rate), {len(self.entries)} entries in {self.path}"
+        )
@@ -0,0 +1,310 @@
+import argparse
+import hashlib
+import json
+import math
+import re
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from auto_swagger.config.settings import EXAMPLE_INDEX_DIR, FINETUNE_DATA_PATH, FINETUNE_SPEC_DATA_PATH
+
+INDEX_VERSION = 1
+MANIFEST_FILE = "index.json"
+VECTORS_FILE = "vectors.npy"
+IDF_FILE = "idf.npy"
+
+# Fine-tuning corpus each output format's examples are taken from
+CORPUS_PATHS = {"jsdoc": FINETUNE_DATA_PATH, "spec": FINETUNE_SPEC_DATA_PATH}
+
+# Conservative characters per token for YAML and JSON, used to keep examples within the token budget
+CHARS_PER_TOKEN = 3
+
+_ROUTE_STUB = re.compile(r"app\.(\w+)\s*\(\s*['\"`]([^'\"`]+)['\"`]")
+_WORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_TRAILING_SPECIAL_TOKEN = re.compile(r"\s*<\|\w+\|>\s*$")
+_JSDOC_INDENT = re.compile(r"^[ \t]+\*", re.MULTILINE)
+
+
+def route_features(method: str, path: str) -> List[str]:
+    """Returns the method and path segment features of a route; path parameters share one feature."""
+    features = [f"method:{method.lower()}"]
+    for segment in path.strip("/").split("/"):
+        if segment.startswith((":", "{")):
+            features.append("segment:param")
+        elif segment:
+            features.append(f"segment:{segment.lower()}")
+    return features
+
+
+def text_features(text: str) -> List[str]:
+    """Splits text into lowercase words, including the parts of camelCase identifiers."""
+    return [word.lower() for word in _WORD.findall(text)]
+
+
+def context_features(entry: Dict[str, Any]) -> List[str]:
+    """Returns the features of a route context: its method and path, names, purpose and parameters."""
+    features: List[str] = []
+    code_context = entry.get("codeContext", {})
+    for details in entry.get("apiDetails", {}).values():
+        endpoint = details.get("endpoint", {})
+        for method in endpoint.get("methods", []):
+            features.extend(route_features(method, endpoint.get("path", "")))
+        features.extend(text_features(endpoint.get("resourceType") or ""))
+        for params in (details.get("parameters") or {}).values():
+            if isinstance(params, dict):
+                for name in params:
+                    features.extend(text_features(name))
+    features.extend(text_features(code_context.get("functionName") or ""))
+    features.extend(text_features(code_context.get("general_purpose") or ""))
+    return features
+
+
+class ExampleIndex:
+    """Finds the fine-tuning examples most similar to a route context.
+
+    Every prompt/completion pair of the corpus is a hashed TF-IDF vector
+    over the route's method and path segments and the words of the route
+    stub and documentation. The L2-normalized vectors are stored as one
+    ``.npy`` matrix that is memory-mapped when the index is loaded, so
+    looking up a route is a single matrix-vector product over pages the OS
+    shares between processes.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        idf: np.ndarray,
+        examples: List[Dict[str, Any]],
+        output_format: str,
+        fingerprint: str,
+    ):
+        """
+        Initialize the index.
+
+        Args:
+            vectors: Normalized example vectors, one row per example
+            idf: Inverse document frequency of every hash bucket
+            examples: Route, completion and estimated tokens of every example
+            output_format: Output format the completions are written in
+            fingerprint: Hash of the indexed examples, part of the cache identity
+        """
+        self.vectors = vectors
+        self.idf = idf
+        self.examples = examples
+        self.output_format = output_format
+        self.fingerprint = fingerprint
+
+    @property
+    def dim(self) -> int:
+        return self.idf.shape[0]
+
+    @staticmethod
+    def _counts(features: List[str], dim: int) -> Dict[int, int]:
+        """Counts the features per hash bucket."""
+        counts: Dict[int, int] = {}
+        for feature in features:
+            bucket = zlib.crc32(feature.encode("utf-8")) % dim
+            counts[bucket] = counts.get(bucket, 0) + 1
+        return counts
+
+    @staticmethod
+    def _vector(counts: Dict[int, int], idf: np.ndarray) -> np.ndarray:
+        """Builds the normalized TF-IDF vector with sublinear term frequencies."""
+        vector = np.zeros(idf.shape[0], dtype=np.float32)
+        for bucket, count in counts.items():
+            vector[bucket] = (1.0 + math.log(count)) * idf[bucket]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @classmethod
+    def build(cls, pairs: List[Dict[str, str]], output_format: str, dim: int = 4096) -> "ExampleIndex":
+        """Builds an index from fine-tuning prompt/completion pairs.
+
+        Args:
+            pairs: Dicts with the ``prompt`` (an Express route stub) and ``completion``
+            output_format: Output format the completions are written in
+            dim: Number of hash buckets
+        """
+        examples = []
+        documents = []
+        for pair in pairs:
+            completion = _TRAILING_SPECIAL_TOKEN.sub("", pair["completion"]).strip()
+            if output_format == "jsdoc":
+                # The corpus uses @openapi and keeps the source indentation, generated blocks do neither
+                completion = _JSDOC_INDENT.sub(" *", completion.replace("@openapi", "@swagger"))
+            stub = _ROUTE_STUB.search(pair["prompt"])
+            route = f"{stub.group(1).upper()} {stub.group(2)}" if stub else ""
+            features = route_features(stub.group(1), stub.group(2)) if stub else []
+            features += text_features(pair["prompt"]) + text_features(completion)
+            documents.append(cls._counts(features, dim))
+            examples.append({
+                "route": route,
+                "filepath": pair.get("filepath", ""),
+                "completion": completion,
+                "tokens": math.ceil((len(route) + len(completion)) / CHARS_PER_TOKEN),
+            })
+
+        document_frequency = np.zeros(dim, dtype=np.float32)
+        for counts in documents:
+            document_frequency[list(counts)] += 1
+        idf = (np.log((1 + len(documents)) / (1 + document_frequency)) + 1).astype(np.float32)
+        vectors = np.stack([cls._vector(counts, idf) for counts in documents]) if documents \
+            else np.zeros((0, dim), dtype=np.float32)
+
+        fingerprint = hashlib.sha256(
+            json.dumps([output_format, dim, examples], sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        return cls(vectors, idf, examples, output_format, fingerprint)
+
+    def save(self, directory: Union[str, Path]) -> Path:
+        """Writes the vectors, IDF weights and examples to ``directory``."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / VECTORS_FILE, self.vectors)
+        np.save(directory / IDF_FILE, self.idf)
+        (directory / MANIFEST_FILE).write_text(json.dumps({
+            "version": INDEX_VERSION,
+            "output_format": self.output_format,
+            "fingerprint": self.fingerprint,
+            "examples": self.examples,
+        }, ensure_ascii=False), encoding="utf-8")
+        return directory
+
+    @classmethod
+    def load(cls, directory: Union[str, Path]) -> "ExampleIndex":
+        """Loads an index written by ``save``, memory-mapping the vectors.
+
+        Raises:
+            ValueError: If the index was written by an incompatible version
+        """
+        directory = Path(directory)
+        manifest = json.loads((directory / MANIFEST_FILE).read_text(encoding="utf-8"))
+        if manifest.get("version") != INDEX_VERSION:
+            raise ValueError(f"Example index {directory} has version {manifest.get('version')}, "
+                             f"expected {INDEX_VERSION}; rebuild it with build-example-index")
+        return cls(
+            np.load(directory / VECTORS_FILE, mmap_mode="r"),
+            np.load(directory / IDF_FILE),
+            manifest["examples"],
+            manifest["output_format"],
+            manifest["fingerprint"],
+        )
+
+    def search(self, entry: Dict[str, Any], k: int, min_similarity: float = 0.0) -> List[Tuple[int, float]]:
+        """Returns up to ``k`` (example index, cosine similarity) pairs for a route context, most similar first."""
+        if not len(self.examples):
+            return []
+        query = self._vector(self._counts(context_features(entry), self.dim), self.idf)
+        similarities = self.vectors @ query
+        top = np.argsort(-similarities)[:k]
+        return [(int(i), float(similarities[i])) for i in top if similarities[i] > min_similarity]
+
+    def select(
+        self,
+        context: List[Dict[str, Any]],
+        k: int,
+        token_budget: int,
+        min_similarity: float = 0.0,
+    ) -> List[Dict[str, Any]]:
+        """Picks the examples for a batch of routes within a token budget.
+
+        Every route's best match is taken before any route's second best, so
+        the budget is spread over the batch. An example matched by several
+        routes is included once.
+
+        Args:
+            context: Route contexts of the batch
+            k: Maximum examples considered per route
+            token_budget: Maximum estimated tokens of all selected examples
+            min_similarity: Examples at or below this cosine similarity are not used
+        """
+        matches = [self.search(entry, k, min_similarity) for entry in context]
+        selected: List[int] = []
+        tokens = 0
+        for rank in range(k):
+            for route_matches in matches:
+                if rank >= len(route_matches):
+                    continue
+                index = route_matches[rank][0]
+                if index in selected or tokens + self.examples[index]["tokens"] > token_budget:
+                    continue
+                selected.append(index)
+                tokens += self.examples[index]["tokens"]
+        return [self.examples[i] for i in selected]
+
+
+def load_example_index(path: Optional[Union[str, Path]], output_format: str) -> Optional[ExampleIndex]:
+    """Loads the example index for the configured output format.
+
+    Without an explicit ``path``, an index missing from EXAMPLE_INDEX_DIR is
+    built from the fine-tuning corpus if the corpus is available.
+
+    Returns:
+        The index, or None if there is none for ``output_format``
+    """
+    directory = Path(path) if path else EXAMPLE_INDEX_DIR / output_format
+    if not (directory / MANIFEST_FILE).exists():
+        corpus = CORPUS_PATHS.get(output_format)
+        if path or corpus is None or not corpus.exists():
+            print(f"No example index at {directory}, generating without retrieved examples")
+            return None
+        build_example_index(corpus, directory, output_format)
+
+    try:
+        index = ExampleIndex.load(directory)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Warning: Could not load example index {directory}: {e}")
+        return None
+    if index.output_format != output_format:
+        print(f"Warning: Example index {directory} holds {index.output_format} examples, "
+              f"not {output_format}; generating without retrieved examples")
+        return None
+    return index
+
+
+def build_example_index(
+    corpus_path: Union[str, Path], output_dir: Union[str, Path], output_format: str, dim: int = 4096
+) -> ExampleIndex:
+    """Builds the example index from a fine-tuning JSONL file and saves it.
+
+    Args:
+        corpus_path: JSONL file of prompt/completion pairs from prepare_finetune_data
+        output_dir: Directory the index is written to
+        output_format: Output format the completions are written in
+        dim: Number of hash buckets
+    """
+    start_time = time.time()
+    with open(corpus_path, encoding="utf-8") as corpus:
+        pairs = [json.loads(line) for line in corpus if line.strip()]
+    index = ExampleIndex.build(pairs, output_format, dim)
+    index.save(output_dir)
+    print(f"Indexed {len(pairs)} examples from {corpus_path} into {output_dir} "
+          f"in {time.time() - start_time:.2f} seconds")
+    return index
+
+
+def main():
+    """Command line entry point for building the example index."""
+    parser = argparse.ArgumentParser(
+        description="Build the retrieval index of fine-tuning examples injected into generation prompts."
+    )
+    parser.add_argument("--output-format", choices=["jsdoc", "spec"], default="jsdoc")
+    parser.add_argument("--corpus", type=str, help="Fine-tuning JSONL file, defaults to the format's corpus")
+    parser.add_argument("--output-dir", type=str, help="Index directory, defaults to EXAMPLE_INDEX_DIR/<format>")
+    parser.add_argument("--dim", type=int, help="Number of hash buckets", default=4096)
+    args = parser.parse_args()
+
+    build_example_index(
+        args.corpus or CORPUS_PATHS[args.output_format],
+        args.output_dir or EXAMPLE_INDEX_DIR / args.output_format,
+        args.output_format,
+        args.dim,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from .jsdoc_renderer import parse_jsdoc_block
+
+# Key of the existing doc block span that ApiDocParser records in a route's codeContext
+EXISTING_DOC = "existingDoc"
+
+DOC_MISSING = "missing"
+DOC_CURRENT = "current"
+DOC_STALE = "stale"
+DOC_UNMATCHED = "unmatched"
+
+_PATH_PARAM = re.compile(r"\{[^}/]*\}")
+
+
+def route_requirements(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns the parts of a route context its documentation has to declare.
+
+    These are the method and Swagger path, the query parameter names, the
+    request body fields and the status codes the handler returns. Path
+    parameters are part of the path itself. Descriptions and schemas are
+    left out, so rewording a block by hand does not make it stale.
+    """
+    details = next(iter(entry.get("apiDetails", {}).values()), {})
+    endpoint = details.get("endpoint", {})
+    parameters = details.get("parameters") or {}
+    responses = details.get("responses") or {}
+    statuses = [str(success.get("statusCode")) for success in (responses.get("success") or {}).values()]
+    statuses += [str(status) for status in responses.get("error") or {}]
+    return {
+        "method": (endpoint.get("methods") or [""])[0].lower(),
+        "path": re.sub(r":(\w+)", r"{\1}", endpoint.get("path", "")),
+        "query_params": sorted(parameters.get("query") or {}),
+        "body": sorted(parameters.get("body") or {}),
+        "statuses": sorted(set(statuses)),
+    }
+
+
+def find_operation(paths: Any, path: str, method: str) -> Optional[Dict[str, Any]]:
+    """Finds the operation documenting a route in a parsed doc block.
+
+    Besides the exact path, a block path matches if it only differs in the
+    names of its path parameters or adds a prefix the route was mounted
+    under (e.g. ``/api/v1/users/{userId}`` for ``/users/{id}``), as long as
+    exactly one path of the block matches.
+    """
+    if not isinstance(paths, dict):
+        return None
+    exact = paths.get(path)
+    if isinstance(exact, dict) and isinstance(exact.get(method), dict):
+        return exact[method]
+
+    shape = _PATH_PARAM.sub("{}", path).rstrip("/")
+    candidates = [
+        operations[method] for key, operations in paths.items()
+        if isinstance(operations, dict) and isinstance(operations.get(method), dict)
+        and _PATH_PARAM.sub("{}", str(key)).rstrip("/").endswith(shape)
+        and (shape or str(key).rstrip("/") == "")
+    ]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def missing_fields(
+    operation: Dict[str, Any], entry: Dict[str, Any], components: Optional[Dict[str, Any]] = None
+) -> List[str]:
+    """Lists what the route has that an existing operation does not declare.
+
+    Anything the operation declares beyond the route context (extra query
+    parameters, body fields or status codes the parser did not see) is
+    fine, and a ``security`` requirement stands for 401 and 403. Parameters
+    and request bodies given by ``$ref`` are resolved against the block's
+    own ``components`` when possible; otherwise they are taken to declare
+    what the route needs, since they cannot be checked.
+    """
+    required = route_requirements(entry)
+    components = components or {}
+    missing: List[str] = []
+
+    query_params = set()
+    unresolved_ref = False
+    for param in operation.get("parameters") or []:
+        if isinstance(param, dict) and "$ref" in param:
+            param = _resolve_ref(param["$ref"], components)
+            unresolved_ref = unresolved_ref or param is None
+        if isinstance(param, dict) and param.get("in") == "query":
+            query_params.add(str(param.get("name", "")))
+    if not unresolved_ref:
+        missing += [f"query parameter {name}" for name in required["query_params"] if name not in query_params]
+
+    if required["body"]:
+        request_body = operation.get("requestBody")
+        if not isinstance(request_body, dict):
+            missing.append("request body")
+        else:
+            schema = _body_schema(request_body, components)
+            if schema is not None and isinstance(schema.get("properties"), dict):
+                missing += [f"body field {name}" for name in required["body"] if name not in schema["properties"]]
+
+    documented = {str(status) for status in operation.get("responses") or {}}
+    if operation.get("security"):
+        # Authentication and authorization failures are covered by the security requirement
+        documented |= {"401", "403"}
+    missing += [f"status {status}" for status in required["statuses"] if status not in documented]
+    return missing
+
+
+def _body_schema(request_body: Dict[str, Any], components: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Returns the request body schema, or None if it is a ``$ref`` that cannot be resolved."""
+    if "$ref" in request_body:
+        request_body = _resolve_ref(request_body["$ref"], components)
+        if request_body is None:
+            return None
+    content = request_body.get("content")
+    schema = next(iter(content.values()), {}).get("schema") if isinstance(content, dict) and content else None
+    if isinstance(schema, dict) and "$ref" in schema:
+        return _resolve_ref(schema["$ref"], components)
+    return schema if isinstance(schema, dict) else {}
+
+
+def _resolve_ref(ref: Any, components: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Resolves a ``#/components/<section>/<name>`` reference within a block, or returns None."""
+    parts = str(ref).split("/")
+    if len(parts) != 4 or parts[:2] != ["#", "components"]:
+        return None
+    section = components.get(parts[2])
+    resolved = section.get(parts[3]) if isinstance(section, dict) else None
+    return resolved if isinstance(resolved, dict) else None
+
+
+def block_operation(entry: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Returns the operation documenting the route in its existing doc block and the block's components.
+
+    Returns:
+        (operation, components), or None if the route has no block or the
+        block does not document the route's path and method
+    """
+    existing = entry.get("codeContext", {}).get(EXISTING_DOC)
+    if not existing:
+        return None
+    required = route_requirements(entry)
+    try:
+        paths = parse_jsdoc_block(existing["text"])
+    except (yaml.YAMLError, ValueError):
+        return None
+    operation = find_operation(paths, required["path"], required["method"])
+    if operation is None:
+        return None
+    components = paths.get("components")
+    return operation, components if isinstance(components, dict) else {}
+
+
+def existing_doc_status(entry: Dict[str, Any]) -> str:
+    """Compares the doc block above a route with the route's current context.
+
+    Returns:
+        DOC_MISSING if the route has no block, DOC_UNMATCHED if the block
+        does not document the route's path and method (it is never
+        replaced), DOC_STALE if the block lacks something the route has,
+        otherwise DOC_CURRENT
+    """
+    if not entry.get("codeContext", {}).get(EXISTING_DOC):
+        return DOC_MISSING
+    documented = block_operation(entry)
+    if documented is None:
+        return DOC_UNMATCHED
+    operation, components = documented
+    return DOC_STALE if missing_fields(operation, entry, components) else DOC_CURRENT
+
+
+def change_span(entry: Dict[str, Any]) -> Tuple[int, Optional[int]]:
+    """Returns the (start_line, end_line) of a route's change.
+
+    Routes whose doc block documents them get the block's lines replaced;
+    other routes get the documentation inserted above the route definition,
+    leaving a block that documents something else untouched.
+    """
+    code_context = entry["codeContext"]
+    existing = code_context.get(EXISTING_DOC)
+    if existing and block_operation(entry) is not None:
+        return existing["beginning"] - 1, existing["end"]
+    return code_context["line"]["beginning"] - 1, None
@@ -1,69 +1,133 @@
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Union
+from typing import Dict, List, Union
 from .models import Change
 
 class FileHandler:
     """Handles all file operations for the swagger documentation updates."""
-    
-    def __init__(self, repo_path: Union[str, Path]):
+
+    def __init__(self, repo_path: Union[str, Path], max_workers: int = 4):
         """
         Initialize the FileHandler with the repository base path.
-        
+
         Args:
             repo_path: The absolute path to the repository root
+            max_workers: Number of files written in parallel by apply_batch
         """
         self.repo_path = Path(repo_path).resolve()
         if not self.repo_path.exists():
             raise ValueError(f"Repository path does not exist: {self.repo_path}")
-    
+        self.max_workers = max(1, max_workers)
+
     def apply_changes(self, change: Change) -> bool:
         """
         Applies changes to a file at specific line numbers while preserving spacing and context.
         Handles both absolute and relative paths.
-        
+
         Args:
             change: Change object containing the file modifications
-            
+
         Returns:
             bool: True if successful, False otherwise
         """
+        return bool(self.apply_batch([change]))
+
+    def apply_batch(self, changes: List[Change]) -> List[Change]:
+        """
+        Applies many changes, reading and writing each file once.
+
+        The start line of every change refers to the file as it is before
+        any of the batch is inserted, so the changes need no offsets for the
+        blocks inserted above them. Changes with an end line replace the
+        lines in between (a stale doc block) instead of inserting. Each file
+        is written to a temporary file and renamed over the original, so a
+        failed or interrupted write never leaves a partly documented file.
+        Different files are written in parallel.
+
+        Args:
+            changes: Change objects, in any order and for any number of files
+
+        Returns:
+            List[Change]: The changes that were applied, in their original order
+        """
+        by_file: Dict[str, List[Change]] = {}
+        for change in changes:
+            by_file.setdefault(change.filepath, []).append(change)
+        if not by_file:
+            return []
+
+        if self.max_workers == 1 or len(by_file) == 1:
+            results = [self._apply_file(filepath, file_changes) for filepath, file_changes in by_file.items()]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(by_file))) as pool:
+                results = list(pool.map(lambda item: self._apply_file(*item), by_file.items()))
+
+        applied_files = {filepath for filepath, ok in zip(by_file, results) if ok}
+        return [change for change in changes if change.filepath in applied_files]
+
+    def _resolve(self, filepath: str) -> Path:
+        """Returns the absolute path of a repository file, relative paths being relative to the repository."""
+        # Convert the filepath to a Path object if it's a string
+        change_path = Path(filepath)
+
+        # If the path is relative, make it absolute using the repo path
+        if not change_path.is_absolute():
+            resolved = (self.repo_path / change_path).resolve()
+        else:
+            resolved = change_path.resolve()
+
+        # Verify the file exists and is within the repository
+        if not resolved.exists():
+            raise FileNotFoundError(
+                f"The file specified does not exist: {resolved}"
+            )
+
+        if not str(resolved).startswith(str(self.repo_path)):
+            raise ValueError(
+                f"File path {resolved} is outside the repository: {self.repo_path}"
+            )
+        return resolved
+
+    def _apply_file(self, filepath: str, changes: List[Change]) -> bool:
+        """Inserts all changes for one file in a single pass and writes it atomically."""
         try:
-            # Convert the filepath to a Path object if it's a string
-            change_path = Path(change.filepath)
-            
-            # If the path is relative, make it absolute using the repo path
-            if not change_path.is_absolute():
-                filepath = (self.repo_path / change_path).resolve()
-            else:
-                filepath = change_path.resolve()
-            
-            # Verify the file exists and is within the repository
-            if not filepath.exists():
-                raise FileNotFoundError(
-                    f"The file specified does not exist: {filepath}"
-                )
-                
-            if not str(filepath).startswith(str(self.repo_path)):
-                raise ValueError(
-                    f"File path {filepath} is outside the repository: {self.repo_path}"
-                )
-            
+            path = self._resolve(filepath)
+
             # Read existing content
-            lines = filepath.read_text().splitlines(keepends=True)
-            
-            # Process the new code lines
-            new_code_lines = [
-                f"{line}\n" if line.strip() else "\n"
-                for line in change.code.split('\n')
-            ]
-            
-            # Insert the new lines at the correct position
-            lines = lines[:change.start_line] + new_code_lines + lines[change.start_line:]
-            
-            # Write back to file
-            filepath.write_text("".join(lines))
+            lines = path.read_text().splitlines(keepends=True)
+
+            # Insert bottom-up so every start line still refers to the original file;
+            # reversing the stable sort keeps changes at the same line in their given order
+            for change in reversed(sorted(changes, key=lambda c: c.start_line)):
+                # Process the new code lines
+                new_code_lines = [
+                    f"{line}\n" if line.strip() else "\n"
+                    for line in change.code.split('\n')
+                ]
+                end_line = change.start_line if change.end_line is None else change.end_line
+                lines[change.start_line:end_line] = new_code_lines
+
+            # Write to a temporary file next to the original and rename it into place
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            try:
+                tmp_path.write_text("".join(lines))
+                os.chmod(tmp_path, stat.S_IMODE(path.stat().st_mode))
+                os.replace(tmp_path, path)
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
             return True
-            
+
         except Exception as e:
-            print(f"Error applying changes to {change.filepath}: {e}")
-            return False 
\ No newline at end of file
+            print(f"Error applying changes to {filepath}: {e}")
+            return False
+
+
+def write_atomic(path: Path, text: str) -> None:
+    """Writes a file via a temporary file and rename so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
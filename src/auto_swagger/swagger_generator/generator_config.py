@@ -1,26 +1,105 @@
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
+
+from auto_swagger.config.settings import DAEMON_SOCKET_PATH
+
+# Name the lora_adapter_id adapter is registered under
+DEFAULT_ADAPTER = "default"
 
 @dataclass
 class LLMConfig:
     model_name: str = "deepseek-ai/deepseek-coder-1.3b-instruct"
     lora_adapter_id: str = "paulopasso/auto-swagger"  # Hugging Face repo ID
-    max_new_tokens: int = 8192
+    lora_adapters: Dict[str, str] = field(default_factory=dict)  # extra adapters (name -> repo ID or path) sharing the base model
+    adapter: str = DEFAULT_ADAPTER  # adapter to generate with, "default" or a lora_adapters name
+    max_new_tokens: int = 8192  # upper bound of the per-batch output token budget
     temperature: float = 0.2
     top_k: int = 50
     top_p: float = 0.95
     max_retries: int = 3
+    generation_timeout: float = 2000.0  # upper bound of the per-batch generation deadline in seconds
+    adaptive_budget: bool = True  # size max_new_tokens and the deadline per batch from past runs
+    token_stats_path: Optional[Path] = None  # Defaults to TOKEN_STATS_PATH
+    cache_enabled: bool = True
+    cache_path: Optional[Path] = None  # Defaults to DOC_CACHE_PATH
+    cache_max_entries: int = 2048
+    model_bundle_path: Optional[Path] = None  # Defaults to MODEL_BUNDLE_DIR if it holds a matching bundle
+    inference_profile: str = "default"  # "default" or "cpu-int8" (dynamic int8 quantization on CPU)
+    num_threads: Optional[int] = None  # torch intra-op threads, None keeps the torch default
+    num_interop_threads: Optional[int] = None  # torch inter-op threads, None keeps the torch default
+    num_workers: int = 1  # forked CPU workers sharing the loaded model, 1 generates in-process
+    threads_per_worker: Optional[int] = None  # torch threads per worker, None divides the cores evenly
+    prompt_lookup_num_tokens: Optional[int] = 10  # tokens drafted from prompt n-grams per step, None disables
+    prompt_lookup_max_ngram: int = 3  # longest n-gram matched against the prompt when drafting
+    compiled_generation: bool = False  # torch.compile the forward pass with a static KV cache (no prompt lookup)
+    compile_prompt_bucket: int = 256  # prompts are left-padded to a multiple of this many tokens
+    compile_max_cache_len: int = 8192  # static KV cache length in tokens (prompt plus output)
+    compile_warmup_buckets: int = 4  # prompt buckets compiled at startup, from the shortest
+    kv_cache: str = "dynamic"  # "dynamic" (full precision), "quantized" (optimum-quanto) or "offloaded" (CUDA only)
+    kv_cache_bits: int = 4  # bits per value of the quantized KV cache, 2 or 4
+    kv_cache_memory_limit_mb: Optional[float] = None  # only requests whose full-precision cache exceeds this use kv_cache
+    constrained_decoding: bool = True  # restrict output to the changes JSON schema and known filepaths
+    skip_documented: bool = True  # leave routes that already have a @swagger block untouched
+    update_stale_docs: bool = True  # replace blocks that lack parameters or status codes of their route
+    template_rendering: bool = True  # render well-understood routes locally instead of calling the model
+    template_confidence_threshold: float = 0.8  # minimum renderer confidence for skipping the model
+    example_retrieval: bool = True  # add the most similar fine-tuning examples to each prompt
+    example_index_path: Optional[Path] = None  # defaults to EXAMPLE_INDEX_DIR/<output_format>, built from the corpus
+    examples_per_route: int = 2  # most similar examples considered per route
+    example_token_budget: int = 1024  # estimated prompt tokens spent on examples per request
+    example_min_similarity: float = 0.2  # examples at or below this cosine similarity are not used
+    dedup_routes: bool = True  # generate once per group of routes that only differ in path and filename
+    output_format: str = "jsdoc"  # "jsdoc" (model writes the block) or "spec" (compact spec rendered locally)
+    backend: str = "transformers"  # "transformers" (in-process model), "onnx" (onnxruntime) or "openai" (server)
+    onnx_model_path: Optional[Path] = None  # ONNX export for the onnx backend, defaults to ONNX_MODEL_DIR
+    api_base_url: Optional[str] = None  # e.g. http://localhost:8000/v1 for the openai backend
+    api_model: Optional[str] = None  # model name sent to the server, defaults to model_name
+    api_key: Optional[str] = None  # defaults to the OPENAI_API_KEY environment variable
+    api_concurrency: int = 4  # in-flight requests per route batch (also the connection pool size)
+    api_timeout: float = 600.0  # seconds to wait for the server to respond
+    api_connect_timeout: float = 10.0  # seconds to wait for a connection
+    api_max_retries: int = 3  # retries for connection errors, timeouts and 408/429/5xx responses
+    api_retry_backoff: float = 1.0  # seconds before the first retry, doubled on each retry
+    metrics_enabled: bool = True  # write per-route and per-batch token and latency metrics after each run
+    metrics_path: Optional[Path] = None  # JSON metrics file, defaults to METRICS_PATH
+    prometheus_textfile: Optional[Path] = None  # also write run totals here in the Prometheus text format
+    prompt_encoding: str = "compact"  # "compact" (minified, shared blocks hoisted) or "verbose" (indented, for debugging)
 
 @dataclass
 class GitConfig:
     branch_name: str = "swagger-docs-update"
     commit_message: str = "Add Swagger documentation"
 
+@dataclass
+class DaemonConfig:
+    socket_path: Path = DAEMON_SOCKET_PATH
+    idle_timeout: float = 1800.0  # seconds without requests before the daemon exits, 0 disables
+    max_queue: int = 16  # generation requests waiting for the model before new ones are rejected
+    request_timeout: float = 3600.0  # seconds a client waits for a generation response
+
+@dataclass
+class PipelineConfig:
+    streaming: bool = True  # apply each route's docs as soon as they are generated instead of all at the end
+    queue_size: int = 8  # parsed files and validated changes buffered between stages
+    write_workers: int = 4  # files written to disk in parallel
+    group_routes: int = 64  # routes of already parsed files generated together, so batches and workers span files
+
+@dataclass
+class OpenApiConfig:
+    enabled: bool = False  # merge the applied doc blocks into a consolidated OpenAPI document after each run
+    output_path: Optional[Path] = None  # defaults to openapi.json in the repository root
+    fragments_path: Optional[Path] = None  # per-route fragment store, defaults to OPENAPI_FRAGMENTS_DIR/<repo hash>.json
+    title: str = "API"  # info.title of a new document
+    version: str = "1.0.0"  # info.version of a new document
+
 @dataclass
 class Config:
     llm: LLMConfig = field(default_factory=LLMConfig)
     git: GitConfig = field(default_factory=GitConfig)
+    daemon: DaemonConfig = field(default_factory=DaemonConfig)
+    pipeline: PipelineConfig = field(default_factory=PipelineConfig)
+    openapi: OpenApiConfig = field(default_factory=OpenApiConfig)
     repo_path: Optional[Path] = None
 
     @classmethod
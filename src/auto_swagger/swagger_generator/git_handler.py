@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List, Set
+from typing import List, Optional, Set
 
 from git import Repo
 
@@ -81,12 +81,12 @@ class GitHandler:
 
         return changed_files
 
-    def commit_changes(self, successful_changes: List[Change]) -> None:
-        """Commits the successful changes to the repository."""
+    def commit_changes(self, successful_changes: List[Change], extra_paths: Optional[List[str]] = None) -> None:
+        """Commits the successful changes to the repository, along with ``extra_paths`` (e.g. openapi.json)."""
         if not successful_changes:
             return
 
-        self.repo.index.add([change.filepath for change in successful_changes])
+        self.repo.index.add([change.filepath for change in successful_changes] + list(extra_paths or []))
         commit_message = f"{self.config.commit_message}\n\n" + "\n".join(
             f"- {change.description}" for change in successful_changes
         )
@@ -0,0 +1,244 @@
+import json
+import os
+import time
+from typing import Any, Dict, Generator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .backend import GenerationBackend
+from .generator_config import DEFAULT_ADAPTER, LLMConfig
+from .models import GenerationResult
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+def changes_json_schema(filenames: List[str], output_format: str = "jsdoc") -> Dict[str, Any]:
+    """Builds the JSON schema of the changes response for the given routes.
+
+    Mirrors ChangesGrammar: exactly one change per route, in order, with its
+    ``filepath`` fixed to the route's file.
+    """
+    value_key, value_schema = ("spec", {"type": "object"}) if output_format == "spec" else ("code", {"type": "string"})
+    items = [
+        {
+            "type": "object",
+            "properties": {
+                "filepath": {"const": filename},
+                value_key: value_schema,
+                "description": {"type": "string"},
+            },
+            "required": ["filepath", value_key, "description"],
+            "additionalProperties": False,
+        }
+        for filename in filenames
+    ]
+    return {
+        "type": "object",
+        "properties": {
+            "changes": {
+                "type": "array",
+                "prefixItems": items,
+                "items": False,
+                "minItems": len(items),
+                "maxItems": len(items),
+            },
+        },
+        "required": ["changes"],
+        "additionalProperties": False,
+    }
+
+
+class OpenAIBackend(GenerationBackend):
+    """Sends generation requests to an OpenAI-compatible chat completions server (vLLM, llama.cpp, ...).
+
+    Requests share one keep-alive connection pool sized for ``api_concurrency``
+    in-flight requests. Connection errors, timeouts and transient HTTP errors
+    are retried with exponential backoff. With constrained decoding enabled,
+    the changes JSON schema is passed as ``response_format`` for servers that
+    support structured output.
+    """
+
+    def __init__(self, config: LLMConfig):
+        """
+        Initialize the client.
+
+        Args:
+            config: LLMConfig with the ``api_*`` server settings
+        """
+        if not config.api_base_url:
+            raise ValueError("The openai backend needs api_base_url (--api-base-url)")
+        self.config = config
+        self.url = config.api_base_url.rstrip("/") + "/chat/completions"
+        self.model = config.api_model or config.model_name
+        self.max_concurrency = max(1, config.api_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        api_key = config.api_key or os.environ.get("OPENAI_API_KEY")
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+        print(f"Using OpenAI-compatible server at {config.api_base_url} (model {self.model}, "
+              f"{self.max_concurrency} concurrent requests)")
+
+    def _payload(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        context: Optional[List[Dict[str, Any]]],
+        max_new_tokens: Optional[int],
+        stream: bool,
+        adapter: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        adapter = adapter or self.config.adapter
+        payload: Dict[str, Any] = {
+            # Servers with LoRA support (e.g. vLLM's --lora-modules) serve each adapter under its own model name
+            "model": self.model if adapter == DEFAULT_ADAPTER else adapter,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            "max_tokens": max_new_tokens or self.config.max_new_tokens,
+            "temperature": 0,
+            "stream": stream,
+        }
+        if stream:
+            # Ask for token usage in the final chunk
+            payload["stream_options"] = {"include_usage": True}
+        if context is not None and self.config.constrained_decoding:
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "changes",
+                    "schema": changes_json_schema(
+                        [entry['codeContext']['filename'] for entry in context],
+                        self.config.output_format,
+                    ),
+                },
+            }
+        return payload
+
+    def _post(self, payload: Dict[str, Any], read_timeout: Optional[float] = None) -> requests.Response:
+        """Posts a request, retrying connection errors, timeouts and transient HTTP errors.
+
+        Args:
+            payload: Request body
+            read_timeout: Seconds to wait for the server, at most ``api_timeout``
+
+        Raises:
+            TimeoutError: If the server did not respond within the read timeout on the last try
+            requests.RequestException: Once all retries failed otherwise
+        """
+        timeout = (self.config.api_connect_timeout, min(read_timeout or self.config.api_timeout, self.config.api_timeout))
+        for attempt in range(self.config.api_max_retries + 1):
+            last_attempt = attempt == self.config.api_max_retries
+            try:
+                response = self.session.post(self.url, json=payload, timeout=timeout, stream=payload["stream"])
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt and isinstance(e, requests.ReadTimeout):
+                    # Passing the deadline is reported like the local backends do
+                    raise TimeoutError(f"No response within {timeout[1]:.0f} seconds") from e
+                if last_attempt:
+                    raise
+                print(f"Request failed ({e}), retrying")
+            else:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    response.raise_for_status()
+                    return response
+                print(f"Server returned {response.status_code}, retrying")
+                response.close()
+            time.sleep(self.config.api_retry_backoff * 2 ** attempt)
+
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        context: Optional[List[Dict[str, Any]]] = None,
+        max_new_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        adapter: Optional[str] = None,
+    ) -> GenerationResult:
+        """Requests a complete chat completion.
+
+        The server does not report prefill time separately, so the whole
+        request counts as decode time.
+        """
+        start_time = time.time()
+        payload = self._payload(system_prompt, user_prompt, context, max_new_tokens, stream=False, adapter=adapter)
+        body = self._post(payload, timeout).json()
+        usage = body.get("usage") or {}
+        choice = body["choices"][0]
+        seconds = time.time() - start_time
+        return GenerationResult(
+            text=choice["message"]["content"] or "",
+            input_tokens=usage.get("prompt_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+            seconds=seconds,
+            decode_seconds=seconds,
+            truncated=choice.get("finish_reason") == "length",
+        )
+
+    def stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        context: Optional[List[Dict[str, Any]]] = None,
+        max_new_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        adapter: Optional[str] = None,
+    ) -> Generator[str, None, GenerationResult]:
+        """Requests a streamed chat completion and yields the content deltas (server-sent events).
+
+        Returns:
+            The GenerationResult of the whole response, as the generator's return value.
+            Prefill time is measured as the time to the first content delta.
+
+        Raises:
+            TimeoutError: If the response is not finished within ``timeout``
+        """
+        timeout = timeout or self.config.generation_timeout
+        start_time = time.time()
+        first_token_time = None
+        finish_reason = None
+        chunks: List[str] = []
+        usage: Dict[str, Any] = {}
+        payload = self._payload(system_prompt, user_prompt, context, max_new_tokens, stream=True, adapter=adapter)
+        with self._post(payload, timeout) as response:
+            # Event streams are UTF-8, but without a charset requests would decode them as ISO-8859-1
+            for raw_line in response.iter_lines():
+                line = raw_line.decode("utf-8")
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                usage = event.get("usage") or usage
+                choices = event.get("choices") or [{}]
+                finish_reason = choices[0].get("finish_reason") or finish_reason
+                content = (choices[0].get("delta") or {}).get("content")
+                if content:
+                    if first_token_time is None:
+                        first_token_time = time.time()
+                    chunks.append(content)
+                    yield content
+                if time.time() - start_time > timeout:
+                    raise TimeoutError(f"Generation timed out after {timeout:.0f} seconds")
+
+        end_time = time.time()
+        first_token_time = first_token_time or end_time
+        return GenerationResult(
+            text="".join(chunks),
+            input_tokens=usage.get("prompt_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+            seconds=end_time - start_time,
+            prefill_seconds=first_token_time - start_time,
+            decode_seconds=end_time - first_token_time,
+            truncated=finish_reason == "length",
+        )
+
+    def close(self) -> None:
+        self.session.close()
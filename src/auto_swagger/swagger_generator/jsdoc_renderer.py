@@ -0,0 +1,206 @@
+import json
+import re
+from typing import Any, Dict, List
+
+import yaml
+
+# Plain scalars that YAML would read as something other than a string
+_RESERVED_SCALARS = {"", "~", "null", "true", "false", "yes", "no", "on", "off", "y", "n"}
+_NUMBER_PATTERN = re.compile(r"^[-+]?(\d[\d_]*)?(\.\d+)?([eE][-+]?\d+)?$")
+
+
+def render_jsdoc(path: str, method: str, operation: Dict[str, Any]) -> str:
+    """Renders a single operation as a ``@swagger`` JSDoc comment block.
+
+    Args:
+        path: Swagger-style route path (e.g. /users/{id})
+        method: HTTP method
+        operation: OpenAPI operation object (summary, parameters, responses, ...)
+
+    Returns:
+        str: The JSDoc block, one ``*``-prefixed YAML line per line
+    """
+    lines = [f"{path}:", f"  {method.lower()}:"]
+    lines += yaml_lines(operation, indent=4)
+    return "\n".join(["/**", " * @swagger"] + [f" * {line}" for line in lines] + [" */"])
+
+
+def yaml_lines(value: Any, indent: int = 0) -> List[str]:
+    """Emits a JSON-like value as block-style YAML lines."""
+    pad = " " * indent
+    lines: List[str] = []
+    if isinstance(value, dict):
+        for key, item in value.items():
+            key_text = yaml_scalar(str(key)) if not isinstance(key, int) else str(key)
+            if isinstance(item, (dict, list)) and item:
+                lines.append(f"{pad}{key_text}:")
+                lines += yaml_lines(item, indent + 2)
+            else:
+                lines.append(f"{pad}{key_text}: {_inline(item)}")
+    elif isinstance(value, list):
+        for item in value:
+            if isinstance(item, (dict, list)) and item:
+                nested = yaml_lines(item, indent + 2)
+                lines.append(f"{pad}- {nested[0].lstrip()}")
+                lines += nested[1:]
+            else:
+                lines.append(f"{pad}- {_inline(item)}")
+    else:
+        lines.append(f"{pad}{_inline(value)}")
+    return lines
+
+
+def _inline(value: Any) -> str:
+    """Renders a scalar or empty collection on a single line."""
+    if isinstance(value, dict):
+        return "{}"
+    if isinstance(value, list):
+        return "[]"
+    return yaml_scalar(value)
+
+
+def yaml_scalar(value: Any) -> str:
+    """Renders a scalar, quoting strings that YAML would otherwise misread."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+
+    text = str(value)
+    if "\n" in text or "\t" in text:
+        return json.dumps(text)
+    needs_quotes = (
+        text.lower() in _RESERVED_SCALARS
+        or _NUMBER_PATTERN.match(text) is not None
+        or text != text.strip()
+        or text[0] in "-?:,[]{}#&*!|>'\"%@`"
+        or ": " in text
+        or " #" in text
+        or text.endswith(":")
+    )
+    if needs_quotes:
+        return "'" + text.replace("'", "''") + "'"
+    return text
+
+
+def spec_to_operation(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Expands a compact route spec emitted by the model into an OpenAPI operation.
+
+    The compact spec flattens parameter schemas into the parameter itself,
+    gives the JSON request body schema directly under ``body`` and lets each
+    response be either a description string or ``{"description", "schema"}``.
+    """
+    operation: Dict[str, Any] = {}
+    for key in ("summary", "description", "tags"):
+        if spec.get(key):
+            operation[key] = spec[key]
+
+    parameters = []
+    for param in spec.get("parameters") or []:
+        location = param.get("in", "query")
+        schema: Dict[str, Any] = {"type": param.get("type", "string")}
+        for key in ("format", "default", "enum"):
+            if key in param:
+                schema[key] = param[key]
+        expanded: Dict[str, Any] = {
+            "in": location,
+            "name": param["name"],
+            "required": bool(param.get("required", location == "path")),
+        }
+        if param.get("description"):
+            expanded["description"] = param["description"]
+        expanded["schema"] = schema
+        parameters.append(expanded)
+    if parameters:
+        operation["parameters"] = parameters
+
+    if spec.get("body"):
+        operation["requestBody"] = {
+            "required": True,
+            "content": {"application/json": {"schema": spec["body"]}},
+        }
+
+    responses: Dict[Any, Any] = {}
+    for status, response in (spec.get("responses") or {}).items():
+        key = int(status) if str(status).isdigit() else status
+        if isinstance(response, dict):
+            expanded = {"description": response.get("description", "")}
+            if response.get("schema"):
+                expanded["content"] = {"application/json": {"schema": response["schema"]}}
+            responses[key] = expanded
+        else:
+            responses[key] = {"description": str(response)}
+    operation["responses"] = responses or {200: {"description": "Successful operation."}}
+    return operation
+
+
+def operation_to_spec(operation: Dict[str, Any]) -> Dict[str, Any]:
+    """Compacts an OpenAPI operation into the spec format the model emits.
+
+    This is the inverse of spec_to_operation and is used to build fine-tuning
+    completions in the compact output format.
+    """
+    spec: Dict[str, Any] = {}
+    for key in ("summary", "description", "tags"):
+        if operation.get(key):
+            spec[key] = operation[key]
+
+    parameters = []
+    for param in operation.get("parameters") or []:
+        if "$ref" in param:
+            continue
+        compact: Dict[str, Any] = {"in": param.get("in", "query"), "name": param.get("name", "")}
+        if param.get("required"):
+            compact["required"] = True
+        schema = param.get("schema") or {}
+        compact["type"] = schema.get("type", "string")
+        for key in ("format", "default", "enum"):
+            if key in schema:
+                compact[key] = schema[key]
+        if param.get("description"):
+            compact["description"] = param["description"]
+        parameters.append(compact)
+    if parameters:
+        spec["parameters"] = parameters
+
+    content = (operation.get("requestBody") or {}).get("content") or {}
+    body = next(iter(content.values()), {}).get("schema") if content else None
+    if body:
+        spec["body"] = body
+
+    responses = {}
+    for status, response in (operation.get("responses") or {}).items():
+        response = response or {}
+        content = response.get("content") or {}
+        schema = next(iter(content.values()), {}).get("schema") if content else None
+        if schema:
+            responses[str(status)] = {"description": response.get("description", ""), "schema": schema}
+        else:
+            responses[str(status)] = response.get("description", "")
+    if responses:
+        spec["responses"] = responses
+    return spec
+
+
+def render_spec(path: str, method: str, spec: Dict[str, Any]) -> str:
+    """Renders a compact route spec as a ``@swagger`` JSDoc comment block."""
+    return render_jsdoc(path, method, spec_to_operation(spec))
+
+
+def parse_jsdoc_block(block: str) -> Dict[str, Any]:
+    """Parses the YAML after the ``@swagger``/``@openapi`` tag of a JSDoc block.
+
+    Returns:
+        Dict mapping route paths to their operations by method
+    """
+    text = re.sub(r"^\s*/\*\*", "", block.strip())
+    text = re.sub(r"\*/\s*$", "", text)
+    lines = [re.sub(r"^\s*\*( |$)", "", line) for line in text.splitlines()]
+    text = "\n".join(lines)
+
+    tag = re.search(r"@(swagger|openapi)\b", text)
+    if tag is None:
+        raise ValueError("No @swagger or @openapi tag found in JSDoc block")
+    return yaml.safe_load(text[tag.end():]) or {}
@@ -1,210 +1,25 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
-from peft import PeftModel
-from typing import List, Optional, Dict, Any
-from .models import Change
-from .generator_config import LLMConfig
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Dict, Any, Iterator, Tuple
+from .models import Change, RouteProgress
+from .generator_config import DEFAULT_ADAPTER, LLMConfig
+from .backend import create_backend
+from .doc_cache import DocCache
+from .example_index import load_example_index
+from .existing_docs import DOC_CURRENT, DOC_STALE, DOC_UNMATCHED, change_span, existing_doc_status
+from .jsdoc_renderer import render_spec
+from .metrics import RunMetrics
+from .prompt_encoding import PROMPT_ENCODINGS, SHARED_REF_NOTE, encode_context
+from .route_dedup import canonical_route_key, group_duplicate_routes
+from .streaming import IncrementalChangesParser
+from .template_renderer import TemplateRenderer
+from .token_budget import TokenBudget, budget_key
+from auto_swagger.config.settings import DOC_CACHE_PATH, METRICS_PATH, TOKEN_STATS_PATH
 import json
-import threading
+import re
 import time
-    
-STOP_TOKEN = "<|endofjsdoc|>"
 
-class LLMHandler:
-    """Handles all LLM operations for generating swagger documentation."""
-
-    def __init__(self, config: LLMConfig):
-        self.config = config
-        self.device = torch.device("mps" if torch.backends.mps.is_available() else 
-                            ("cuda" if torch.cuda.is_available() else "cpu"))
-
-        self.tokenizer = AutoTokenizer.from_pretrained(
-            config.model_name,
-            trust_remote_code=True
-        )
-        
-        # Add special tokens
-        special_tokens_dict = {'additional_special_tokens': [STOP_TOKEN]}
-        self.tokenizer.add_special_tokens(special_tokens_dict)
-        self.tokenizer.pad_token = "[PAD]"
-        self.tokenizer.padding_side = "left"
-        
-        
-        # Determine appropriate dtype
-        dtype = torch.float16 if self.device.type in ["cuda", "mps"] else torch.float32
-        
-        # Load the base causal LM with memory optimizations
-        base_model = AutoModelForCausalLM.from_pretrained(
-            config.model_name,
-            trust_remote_code=True,
-            torch_dtype=dtype,
-            device_map="auto",         # Let the system decide on device mapping
-            low_cpu_mem_usage=True     # Optimize for low CPU memory
-        )
-        
-        # Resize embeddings to handle new tokens
-        base_model.resize_token_embeddings(len(self.tokenizer))
-        base_model.config.pad_token_id = self.tokenizer.pad_token_id
-        
-        # Apply the LoRA adapter with proper device mapping
-        self.model = PeftModel.from_pretrained(
-            base_model,
-            config.lora_adapter_id,
-            torch_dtype=dtype,
-            device_map="auto",  # Let the system decide device mapping
-        )
-        
-        # Enable gradient checkpointing to save memory
-        if hasattr(self.model, "enable_gradient_checkpointing"):
-            self.model.enable_gradient_checkpointing()
-    
-    def _get_device(self) -> torch.device:
-        """Returns the device for model execution."""
-        return self.device
-        
-    def generate_documentation(self, context: List[Dict[str, Any]]) -> Optional[List[Change]]:
-        """Generates swagger documentation for the given API contexts."""
-        system_prompt = self._get_system_prompt()
-        user_prompt = self._format_prompt(context)
-        
-        for attempt in range(self.config.max_retries):
-            print(f"\nAttempt {attempt + 1} of {self.config.max_retries}")
-            
-            try:
-                response = self._generate_response(system_prompt, user_prompt)
-                changes = self._convert_to_changes(response, context)
-                
-                if changes is None:
-                    print(f"\nInvalid changes format in attempt {attempt + 1} - conversion failed")
-                elif len(changes) == 0:
-                    print(f"\nInvalid changes format in attempt {attempt + 1} - empty list")
-                    changes = None
-                else:
-                    print(f"\nSuccessfully generated and validated response on attempt {attempt + 1}")
-                    return changes
-                    
-            except Exception as e:
-                print(f"\nError in attempt {attempt + 1}: {e}")
-                if attempt == self.config.max_retries - 1:
-                    raise Exception(f"Failed to generate valid response after {self.config.max_retries} attempts")
-                
-        return None
-        
-    def _generate_response(self, system_prompt: str, user_prompt: str) -> List[Dict[str, str]]:
-        """Generates a response from the model with timeout support."""
-        messages = [
-            {'role': 'system', 'content': system_prompt},
-            {'role': 'user', 'content': user_prompt}
-        ]
-        
-        # Apply chat template with proper attention mask
-        inputs = self.tokenizer.apply_chat_template(
-            messages,
-            add_generation_prompt=True,
-            return_tensors="pt"
-        ).to(self._get_device())
-        
-        # Create proper attention mask
-        attention_mask = torch.ones_like(inputs).to(self._get_device())
-        
-        # Create a result container and done flag for the thread
-        result_container = {"outputs": None, "error": None}
-        done_flag = threading.Event()
-        timeout_seconds = 2000  # 3 minutes timeout
-        
-        def generate_with_timeout():
-            try:
-                print("Attempting generation with reduced parameters...")
-                # Reduce max_new_tokens to avoid excessively long generation
-                reduced_tokens = min(self.config.max_new_tokens, 2048)
-                print(f"Using max_new_tokens={reduced_tokens} (reduced from {self.config.max_new_tokens})")
-                
-                # Start a progress indicator
-                start_time = time.time()
-                
-                # First try with deterministic generation (no sampling) and reduced tokens
-                result_container["outputs"] = self.model.generate(
-                    inputs,
-                    attention_mask=attention_mask,
-                    max_new_tokens=reduced_tokens,
-                    do_sample=False,  # Deterministic generation
-                    num_return_sequences=1,
-                    pad_token_id=self.tokenizer.pad_token_id,
-                    eos_token_id=self.tokenizer.eos_token_id,
-                    use_cache=True,
-                )
-                
-                print(f"Generation completed in {time.time() - start_time:.2f} seconds")
-                
-            except Exception as e:
-                result_container["error"] = e
-                print(f"Generation failed with error: {e}")
-            finally:
-                done_flag.set()
-        
-        # Start generation in a separate thread
-        print("Starting generation in background thread...")
-        generation_thread = threading.Thread(target=generate_with_timeout)
-        generation_thread.daemon = True
-        generation_thread.start()
-        
-        # Monitor progress and check for timeout
-        start_time = time.time()
-        progress_interval = 10  # seconds
-        next_progress = start_time + progress_interval
-        
-        while not done_flag.is_set():
-            time.sleep(1)
-            current_time = time.time()
-            
-            # Print progress updates
-            if current_time >= next_progress:
-                elapsed = current_time - start_time
-                print(f"Still generating... ({elapsed:.0f} seconds elapsed)")
-                next_progress = current_time + progress_interval
-            
-            # Check for timeout
-            if current_time - start_time > timeout_seconds:
-                print(f"Generation timed out after {timeout_seconds} seconds")
-                # We can't actually stop the thread, but we can proceed with a fallback
-                break
-        
-        # Check results
-        if not done_flag.is_set() or result_container["error"] is not None:
-            # Either timed out or had an error
-            error_msg = str(result_container["error"]) if result_container["error"] else "Generation timed out"
-            print(f"Using fallback response due to: {error_msg}")
-            
-            # Create a simple fallback response
-            return [{"generated_text": f"""```json
-{{
-  "changes": [
-    {{
-      "filepath": "Unable to generate documentation",
-      "code": "/**\\n * @swagger\\n * /api/error:\\n *   get:\\n *     description: Error during generation - {error_msg[:100]}\\n */",
-      "description": "Generation failed or timed out"
-    }}
-  ]
-}}```"""
-            }]
-        
-        # Process successful generation
-        outputs = result_container["outputs"]
-        
-        try:
-            generated_text = self.tokenizer.decode(
-                outputs[0][len(inputs[0]):],
-                skip_special_tokens=True
-            )
-            return [{"generated_text": generated_text}]
-        except Exception as e:
-            print(f"Error decoding generated text: {e}")
-            return [{"generated_text": "Error decoding model output"}]
-        
-    @staticmethod
-    def _get_system_prompt() -> str:
-        """Returns the system prompt for the model."""
-        return """You are an expert in API documentation specializing in JSDoc Swagger comments. Your ONLY task is to GENERATE Swagger documentation, NOT create scripts or tools.
+JSDOC_SYSTEM_PROMPT = """You are an expert in API documentation specializing in JSDoc Swagger comments. Your ONLY task is to GENERATE Swagger documentation, NOT create scripts or tools.
 
 IMPORTANT: 
 - DO NOT generate any JavaScript code or scripts
@@ -229,10 +44,570 @@ Your output MUST be a single JSON object containing Swagger documentation commen
 ```
 }"""
 
+SPEC_SYSTEM_PROMPT = """You are an expert in API documentation. Your ONLY task is to DESCRIBE the provided API routes as compact OpenAPI operation specs, NOT create scripts or tools.
+
+IMPORTANT:
+- DO NOT generate any JavaScript code, scripts or JSDoc comments
+- ONLY generate the specs in the specified JSON format, one change per route, in the order of the API context
+- DO NOT repeat the route path or HTTP method, they are taken from the API context
+- "parameters" lists the path and query parameters with their OpenAPI type
+- "body" is the JSON schema of the request body, omit it when there is none
+- "responses" maps each status code to its description, or to {"description": ..., "schema": ...} when the response has a JSON body
+
+Your output MUST be a single JSON object like this:
+
+```json
+{"changes":[{"filepath":"<FILEPATH>","spec":{"summary":"Create user","tags":["Users"],"parameters":[{"in":"path","name":"teamId","required":true,"type":"string"}],"body":{"type":"object","required":["name"],"properties":{"name":{"type":"string"}}},"responses":{"201":"Created","400":"Bad request: Invalid input"}},"description":"Documentation for create user endpoint"}]}
+```"""
+
+OUTPUT_FORMATS = ("jsdoc", "spec")
+
+class LLMHandler:
+    """Handles all LLM operations for generating swagger documentation."""
+
+    def __init__(self, config: LLMConfig):
+        self.config = config
+        self.cache = (
+            DocCache(config.cache_path or DOC_CACHE_PATH, config.cache_max_entries)
+            if config.cache_enabled else None
+        )
+
+        if config.output_format not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"Unknown output format '{config.output_format}', "
+                f"expected one of {', '.join(OUTPUT_FORMATS)}"
+            )
+        if config.prompt_encoding not in PROMPT_ENCODINGS:
+            raise ValueError(
+                f"Unknown prompt encoding '{config.prompt_encoding}', "
+                f"expected one of {', '.join(PROMPT_ENCODINGS)}"
+            )
+        self.template_renderer = TemplateRenderer()
+        self.example_index = (
+            load_example_index(config.example_index_path, config.output_format)
+            if config.example_retrieval else None
+        )
+        self.metrics = RunMetrics()
+        self.token_budget = TokenBudget(
+            config.token_stats_path or TOKEN_STATS_PATH,
+            config.output_format,
+            config.max_new_tokens,
+            config.generation_timeout,
+            key=budget_key(
+                config.backend,
+                (config.api_model or config.model_name) if config.backend == "openai" else config.model_name,
+                config.inference_profile,
+                config.output_format,
+            ),
+        ) if config.adaptive_budget else None
+        # (adapter, canonical route key) -> (context, change data, progress) of routes documented
+        # in this run, for deduplication; cleared by start_run
+        self.documented_routes: Dict[Tuple[str, str], Tuple[Dict[str, Any], Dict[str, str], RouteProgress]] = {}
+        self.backend = create_backend(config)
+
+    def start_run(self) -> None:
+        """Starts a new run on a resident handler (e.g. one daemon request).
+
+        Metrics start from zero, and routes documented in earlier runs, which
+        may belong to another repository, are no longer reused.
+        """
+        self.metrics = RunMetrics()
+        self.documented_routes.clear()
+
+    def generate_documentation(
+        self, context: List[Dict[str, Any]], adapter: Optional[str] = None
+    ) -> Optional[List[Change]]:
+        """Generates swagger documentation for the given API contexts.
+
+        Args:
+            context: Route contexts to document
+            adapter: Named LoRA adapter to generate with, defaults to ``config.adapter``
+
+        Returns:
+            List of changes with insertion lines, or None if no route was documented
+        """
+        accepted = dict(self.iter_documentation(context, adapter))
+        if not accepted:
+            return None
+        return self._convert_to_changes(accepted, context)
+
+    def iter_documentation(
+        self, context: List[Dict[str, Any]], adapter: Optional[str] = None
+    ) -> Iterator[Tuple[int, Dict[str, str]]]:
+        """Generates swagger documentation, yielding each route as soon as it is accepted.
+
+        Routes that already have a ``@swagger`` block are skipped. Blocks
+        missing parameters or status codes of their route are regenerated and
+        replaced in place unless ``update_stale_docs`` is off.
+        Routes the template renderer is confident about, and routes found in
+        the documentation cache, are not sent to the model. Routes whose
+        contexts only differ in path and filename are generated once and the
+        result is re-targeted to the other routes of the group.
+        Model responses are streamed and every change is validated as soon as
+        its JSON object closes; only the routes that were missing or invalid
+        in a response are sent back to the model on the next attempt.
+
+        Args:
+            context: Route contexts to document
+            adapter: Named LoRA adapter to generate with, defaults to ``config.adapter``
+
+        Yields:
+            (context index, change data) pairs in the order routes are accepted
+        """
+        adapter = adapter or self.config.adapter
+        system_prompt = self._get_system_prompt()
+        progress = [RouteProgress(label=self._route_label(entry)) for entry in context]
+        self.metrics.routes.extend(progress)
+        accepted: Dict[int, Dict[str, str]] = {}
+
+        up_to_date = set()
+        if self.config.skip_documented:
+            statuses = [existing_doc_status(entry) for entry in context]
+            # Blocks for another path or method are never replaced, stale ones unless opted out
+            kept = {DOC_CURRENT, DOC_UNMATCHED}
+            if not self.config.update_stale_docs:
+                kept.add(DOC_STALE)
+            up_to_date = {i for i, status in enumerate(statuses) if status in kept}
+            for i in up_to_date:
+                progress[i].done = True
+                progress[i].source = "existing"
+            stale = statuses.count(DOC_STALE)
+            if up_to_date:
+                print(f"\nSkipping {len(up_to_date)} already documented routes")
+            if stale:
+                action = "replacing" if self.config.update_stale_docs else "keeping"
+                print(f"{stale} existing blocks lack parameters or status codes of their route, {action} them")
+
+        if self.config.template_rendering:
+            rendered_count = 0
+            for i, entry in enumerate(context):
+                if i in up_to_date:
+                    continue
+                rendered = self.template_renderer.render(entry)
+                if rendered is not None and rendered.confidence >= self.config.template_confidence_threshold:
+                    accepted[i] = {
+                        "filepath": entry['codeContext']['filename'],
+                        "code": rendered.code,
+                        "description": rendered.description,
+                    }
+                    progress[i].done = True
+                    progress[i].source = "template"
+                    rendered_count += 1
+                    yield i, accepted[i]
+            print(f"\nRendered {rendered_count} of {len(context)} routes from templates")
+
+        identity = self._generation_identity(adapter)
+        cache_keys = [DocCache.make_key(entry, identity) for entry in context]
+        if self.cache is not None:
+            for i, entry in enumerate(context):
+                if i in accepted or i in up_to_date:
+                    continue
+                cached = self.cache.get(cache_keys[i])
+                if cached is not None:
+                    accepted[i] = {**cached, "filepath": entry['codeContext']['filename']}
+                    progress[i].done = True
+                    progress[i].source = "cache"
+                    yield i, accepted[i]
+
+        pending = [i for i in range(len(context)) if i not in accepted and i not in up_to_date]
+        # Raised after truncated responses so retried routes get a larger token budget
+        budget_scale = 1.0
+        # Raised after timed out requests so retried routes get more time in smaller requests
+        timeout_scale = 1.0
+
+        route_keys: List[str] = []
+        duplicates: Dict[int, List[int]] = {}
+        if self.config.dedup_routes:
+            route_keys = [canonical_route_key(entry) for entry in context]
+            for i in accepted:
+                self.documented_routes.setdefault((adapter, route_keys[i]), (context[i], accepted[i], progress[i]))
+
+            # Reuse routes documented earlier in this run (e.g. in another file)
+            for i in pending:
+                known = self.documented_routes.get((adapter, route_keys[i]))
+                change_data = known and self._retarget_change(known[1], known[0], context[i])
+                if change_data:
+                    accepted[i] = change_data
+                    self._mark_duplicate(progress[i], known[2])
+                    if self.cache is not None:
+                        self.cache.put(cache_keys[i], change_data)
+                    yield i, change_data
+
+            remaining = [i for i in pending if i not in accepted]
+            duplicates = group_duplicate_routes(route_keys, remaining)
+            deduplicated = len(pending) - len(duplicates)
+            if deduplicated:
+                print(f"\nDeduplicated {deduplicated} of {len(pending)} routes "
+                      f"({deduplicated / len(pending):.0%}), generating {len(duplicates)}")
+            pending = list(duplicates)
+
+        for attempt in range(self.config.max_retries):
+            if not pending:
+                break
+            print(f"\nAttempt {attempt + 1} of {self.config.max_retries} "
+                  f"({len(pending)} of {len(context)} routes pending)")
+
+            batch = [context[i] for i in pending]
+            matched: Dict[int, Dict[str, str]] = {}
+            unshared: List[int] = []
+            first_batch = len(self.metrics.batches)
+            start_time = time.time()
+            try:
+                batch_progress = [progress[i] for i in pending]
+                for batch_index, change_data in self._generate_batch(
+                    system_prompt, batch, batch_progress, attempt + 1, budget_scale, adapter, timeout_scale
+                ):
+                    route_index = pending[batch_index]
+                    matched[batch_index] = change_data
+                    accepted[route_index] = change_data
+                    progress[route_index].done = True
+                    if self.cache is not None:
+                        self.cache.put(cache_keys[route_index], change_data)
+                    yield route_index, change_data
+                    if not self.config.dedup_routes:
+                        continue
+
+                    self.documented_routes.setdefault(
+                        (adapter, route_keys[route_index]), (context[route_index], change_data, progress[route_index])
+                    )
+                    for member in duplicates.get(route_index, []):
+                        member_data = self._retarget_change(change_data, context[route_index], context[member])
+                        if member_data is None:
+                            # Generate it on its own in the next attempt instead
+                            unshared.append(member)
+                            continue
+                        accepted[member] = member_data
+                        self._mark_duplicate(progress[member], progress[route_index])
+                        if self.cache is not None:
+                            self.cache.put(cache_keys[member], member_data)
+                        yield member, member_data
+            except Exception as e:
+                print(f"\nError in attempt {attempt + 1}: {e}")
+
+            # Split the cost of this attempt evenly across the routes it covered
+            elapsed = time.time() - start_time
+            for i in pending:
+                progress[i].attempts += 1
+                progress[i].seconds += elapsed / len(pending)
+
+            # Persist after every attempt so a later failure does not lose finished routes
+            if self.cache is not None and self.cache.changed:
+                self.cache.save()
+            if self.token_budget is not None:
+                self.token_budget.save()
+            if any(batch.truncated for batch in self.metrics.batches[first_batch:]):
+                budget_scale *= 2
+            if any(batch.timed_out for batch in self.metrics.batches[first_batch:]):
+                timeout_scale *= 2
+
+            pending = sorted([i for i in pending if i not in accepted] + unshared)
+            print(f"\nAttempt {attempt + 1}: {len(matched)} routes validated, {len(pending)} remaining")
+
+        # Group members were accepted before their representative's tokens were recorded
+        for representative, members in duplicates.items():
+            for member in members:
+                if progress[member].source == "dedup":
+                    self._mark_duplicate(progress[member], progress[representative])
+
+        self._print_progress(progress)
+        if self.cache is not None:
+            # Hits refresh the entries' last use, which the LRU eviction depends on
+            if self.cache.changed:
+                self.cache.save()
+            self.cache.print_stats()
+        self._write_metrics()
+
+    @staticmethod
+    def _mark_duplicate(route: RouteProgress, original: RouteProgress) -> None:
+        """Marks a route as documented from the structurally identical route ``original``.
+
+        The route would have cost about as much as the original, so the
+        original's tokens are counted as saved.
+        """
+        route.done = True
+        route.source = "dedup"
+        route.duplicate_of = original.label
+        route.tokens_saved = original.input_tokens + original.output_tokens
+
+    def _retarget_change(
+        self, change_data: Dict[str, str], source: Dict[str, Any], target: Dict[str, Any]
+    ) -> Optional[Dict[str, str]]:
+        """Re-targets the documentation generated for one route to a structurally identical route.
+
+        The generated block's route path key is replaced by the target's path
+        and the change is moved to the target's file.
+
+        Returns:
+            The change data for ``target``, or None if the block does not declare the source path
+        """
+        source_path = self._route_endpoint(source).get("path", "")
+        target_path = self._route_endpoint(target).get("path", "")
+        code = change_data["code"]
+        if source_path != target_path:
+            pattern = r"((?:^|\s)['\"]?)" + re.escape(self._swagger_path(source_path)) + r"(['\"]?\s*:)"
+            code, replaced = re.subn(
+                pattern, lambda m: m.group(1) + self._swagger_path(target_path) + m.group(2), code, count=1
+            )
+            if not replaced:
+                return None
+        return {**change_data, "filepath": target['codeContext']['filename'], "code": code}
+
+    def _write_metrics(self) -> None:
+        """Writes the metrics accumulated by this handler to the JSON and Prometheus files."""
+        if not self.config.metrics_enabled:
+            return
+        self.metrics.print_summary()
+        try:
+            self.metrics.write_json(self.config.metrics_path or METRICS_PATH)
+            if self.config.prometheus_textfile is not None:
+                self.metrics.write_prometheus(self.config.prometheus_textfile)
+        except OSError as e:
+            print(f"Warning: Could not write metrics: {e}")
+
+    def _generate_batch(
+        self,
+        system_prompt: str,
+        batch: List[Dict[str, Any]],
+        routes: List[RouteProgress],
+        attempt: int,
+        budget_scale: float = 1.0,
+        adapter: Optional[str] = None,
+        timeout_scale: float = 1.0,
+    ) -> Iterator[Tuple[int, Dict[str, str]]]:
+        """Generates documentation for a batch of routes, yielding each valid change as it is ready.
+
+        With a single request in flight the response is streamed and every
+        change is validated as soon as its JSON object closes. Backends that
+        serve several requests at once get the batch split into that many
+        contiguous sub-batches, each sent as its own concurrent request.
+        Each request gets a token budget and deadline sized for its number of
+        routes, and batches whose predicted output exceeds ``max_new_tokens``
+        are split further. After timeouts (``timeout_scale`` above 1) requests
+        hold proportionally fewer routes and get proportionally longer
+        deadlines. A timed out request does not stop the other requests of
+        the batch. The cost of every request is recorded in the run metrics.
+
+        Args:
+            system_prompt: System prompt for the configured output format
+            batch: Route contexts to document
+            routes: Progress entries of the routes in ``batch``
+            attempt: 1-based attempt number
+            budget_scale: Factor applied to the predicted token budget
+            adapter: Named LoRA adapter to generate with
+            timeout_scale: Factor applied to the deadline and divided into the routes per request
+
+        Yields:
+            (batch index, change data) pairs
+        """
+        concurrency = min(self.backend.max_concurrency, len(batch))
+        size = math.ceil(len(batch) / concurrency)
+        if self.token_budget is not None:
+            # Split batches whose predicted output would not fit into max_new_tokens
+            size = min(size, self.token_budget.max_routes(budget_scale))
+        size = max(1, math.ceil(size / timeout_scale))
+        groups = [list(range(start, min(start + size, len(batch)))) for start in range(0, len(batch), size)]
+
+        if concurrency <= 1:
+            for group in groups:
+                try:
+                    for sub_index, change_data in self._stream_sub_batch(
+                        system_prompt,
+                        [batch[i] for i in group],
+                        [routes[i] for i in group],
+                        attempt,
+                        budget_scale,
+                        adapter,
+                        timeout_scale,
+                    ):
+                        yield group[sub_index], change_data
+                except TimeoutError as e:
+                    print(f"\nRoutes {group[0] + 1}-{group[-1] + 1} of the batch timed out: {e}")
+            return
+
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(groups))) as pool:
+            futures = {}
+            for group in groups:
+                sub_batch = [batch[i] for i in group]
+                max_new_tokens, timeout = self._plan_batch(len(sub_batch), budget_scale, timeout_scale)
+                futures[pool.submit(
+                    self.backend.generate,
+                    system_prompt,
+                    self._format_prompt(sub_batch),
+                    sub_batch,
+                    max_new_tokens,
+                    timeout,
+                    adapter,
+                )] = (group, timeout)
+            for future in as_completed(futures):
+                group, timeout = futures[future]
+                group_routes = [routes[i] for i in group]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"\nError generating routes {group[0] + 1}-{group[-1] + 1} of the batch: {e}")
+                    timed_out = isinstance(e, TimeoutError)
+                    self.metrics.record_batch(attempt, group_routes, None, timed_out=timed_out)
+                    if timed_out:
+                        self._observe_timeout(len(group), timeout)
+                    continue
+                sub_batch = [batch[i] for i in group]
+                sub_matched = self._match_changes(result.text, sub_batch)
+                self.metrics.record_batch(attempt, group_routes, result, len(sub_matched))
+                if self.token_budget is not None:
+                    self.token_budget.observe(len(sub_batch), result)
+                for sub_index, change_data in sub_matched.items():
+                    yield group[sub_index], change_data
+
+    def _stream_sub_batch(
+        self,
+        system_prompt: str,
+        batch: List[Dict[str, Any]],
+        routes: List[RouteProgress],
+        attempt: int,
+        budget_scale: float,
+        adapter: Optional[str] = None,
+        timeout_scale: float = 1.0,
+    ) -> Iterator[Tuple[int, Dict[str, str]]]:
+        """Streams one request for ``batch``, yielding (batch index, change data) as each change closes."""
+        matched: Dict[int, Dict[str, str]] = {}
+        parser = IncrementalChangesParser()
+        max_new_tokens, timeout = self._plan_batch(len(batch), budget_scale, timeout_scale)
+        stream = self.backend.stream(
+            system_prompt, self._format_prompt(batch), batch, max_new_tokens, timeout, adapter
+        )
+        while True:
+            try:
+                chunk = next(stream)
+            except StopIteration as stop:
+                # The stream returns the GenerationResult once the response is complete
+                self.metrics.record_batch(attempt, routes, stop.value, len(matched))
+                if self.token_budget is not None:
+                    self.token_budget.observe(len(batch), stop.value)
+                break
+            except Exception as e:
+                timed_out = isinstance(e, TimeoutError)
+                self.metrics.record_batch(attempt, routes, None, len(matched), timed_out=timed_out)
+                if timed_out:
+                    self._observe_timeout(len(batch), timeout)
+                raise
+            for position, change_data in parser.feed(chunk):
+                match = self._match_change(position, change_data, batch, matched)
+                if match is not None:
+                    matched[match[0]] = match[1]
+                    yield match
+        if parser.changes_seen != len(batch):
+            print(f"\nWarning: Number of changes ({parser.changes_seen}) does not match context length ({len(batch)})")
+
+    def _plan_batch(
+        self, routes: int, scale: float = 1.0, timeout_scale: float = 1.0
+    ) -> Tuple[Optional[int], Optional[float]]:
+        """Returns the (max_new_tokens, timeout) for a request, or (None, None) for the backend defaults."""
+        if self.token_budget is None:
+            return None, None
+        return self.token_budget.plan(routes, scale, timeout_scale)
+
+    def _observe_timeout(self, routes: int, timeout: Optional[float]) -> None:
+        """Records a timed out request so later deadlines leave more time."""
+        if self.token_budget is not None:
+            self.token_budget.observe_timeout(routes, timeout or self.config.generation_timeout)
+
+    def _generation_identity(self, adapter: str = DEFAULT_ADAPTER) -> Dict[str, Any]:
+        """Returns the model and generation settings that determine the generated output."""
+        # Adapters served by an inference server may only be known by name
+        adapter_id = (
+            self.config.lora_adapter_id if adapter == DEFAULT_ADAPTER
+            else self.config.lora_adapters.get(adapter, adapter)
+        )
+        identity = {
+            "model_name": self.config.model_name,
+            "lora_adapter_id": adapter_id,
+            "inference_profile": self.config.inference_profile,
+            "constrained_decoding": self.config.constrained_decoding,
+            "output_format": self.config.output_format,
+            "prompt_encoding": self.config.prompt_encoding,
+            "max_new_tokens": self.config.max_new_tokens,
+            "temperature": self.config.temperature,
+            "top_k": self.config.top_k,
+            "top_p": self.config.top_p,
+        }
+        if self.example_index is not None:
+            identity["examples"] = (f"{self.example_index.fingerprint}:{self.config.examples_per_route}:"
+                                    f"{self.config.example_token_budget}:{self.config.example_min_similarity}")
+        if self.config.kv_cache == "quantized":
+            # A quantized cache can change the output, the other caches are exact
+            identity["kv_cache"] = f"quantized-{self.config.kv_cache_bits}bit"
+        return identity
 
     @staticmethod
-    def _format_prompt(context: List[Dict[str, Any]]) -> str:
-        """Formats the user prompt with the given context."""
+    def _route_label(entry: Dict[str, Any]) -> str:
+        """Returns a short human readable label for a route context entry."""
+        endpoint = LLMHandler._route_endpoint(entry)
+        methods = "/".join(endpoint.get("methods", []))
+        return f"{methods} {endpoint.get('path', '?')} ({entry['codeContext']['filename']})"
+
+    @staticmethod
+    def _route_endpoint(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns the endpoint description (path, methods, resourceType) of a context entry."""
+        for details in entry.get("apiDetails", {}).values():
+            if "endpoint" in details:
+                return details["endpoint"]
+        return {}
+
+    @staticmethod
+    def _swagger_path(express_path: str) -> str:
+        """Converts an Express path (/users/:id) to its Swagger form (/users/{id})."""
+        return re.sub(r":(\w+)", r"{\1}", express_path)
+
+    @staticmethod
+    def _documents_path(code: str, express_path: str) -> bool:
+        """Checks whether generated Swagger code declares the given route path as a YAML key."""
+        if not express_path:
+            return False
+        pattern = r"(?:^|\s)['\"]?" + re.escape(LLMHandler._swagger_path(express_path)) + r"['\"]?\s*:"
+        return re.search(pattern, code) is not None
+
+    @staticmethod
+    def _print_progress(progress: List[RouteProgress]) -> None:
+        """Prints the per-route attempt, time and token summary."""
+        print("\nPer-route generation summary:")
+        for route in progress:
+            status = "✓" if route.done else "✗"
+            if route.source == "model":
+                source = (f"{route.attempts} attempt(s), {route.seconds:.2f}s, "
+                          f"{route.input_tokens} in / {route.output_tokens} out tokens")
+            elif route.source == "dedup":
+                source = f"same as {route.duplicate_of}"
+            else:
+                source = route.source
+            print(f"{status} {route.label}: {source}")
+
+    def _get_system_prompt(self) -> str:
+        """Returns the system prompt for the configured output format."""
+        if self.config.output_format == "spec":
+            return SPEC_SYSTEM_PROMPT
+        return JSDOC_SYSTEM_PROMPT
+
+    def _format_examples(self, context: List[Dict[str, Any]]) -> str:
+        """Returns the prompt section with the fine-tuning examples most similar to the routes, if any."""
+        if self.example_index is None:
+            return ""
+        examples = self.example_index.select(
+            context,
+            self.config.examples_per_route,
+            self.config.example_token_budget,
+            self.config.example_min_similarity,
+        )
+        if not examples:
+            return ""
+        blocks = "\n\n".join(f"Route: {example['route']}\n{example['completion']}" for example in examples)
+        return ("Reference documentation written for similar routes (match its style and level of detail, "
+                f"but only document the routes in the API context):\n{blocks}\n\n")
+
+    def _format_prompt(self, context: List[Dict[str, Any]]) -> str:
+        """Formats the user prompt with the given context in the configured prompt encoding."""
+        encoded = encode_context(context, self.config.prompt_encoding)
+        ref_note = f"\n{SHARED_REF_NOTE}" if encoded.startswith('{"shared":') else ""
+        examples = self._format_examples(context)
         return f"""TASK: Generate Swagger documentation comments for the provided API routes.
 
 DO NOT:
@@ -245,90 +620,153 @@ DO:
 ✅ Follow the exact format shown below
 ✅ Include all required Swagger elements (path, method, tags, etc.)
 
-API Context:
-{json.dumps(context, indent=2)}"""
+{examples}API Context:{ref_note}
+{encoded}"""
 
-    def _convert_to_changes(self, response: List[Dict[str, str]], context: List[Dict[str, Any]]) -> Optional[List[Change]]:
-        """Converts the model response to a list of changes."""
-        try:
-            text = response[0]['generated_text']
-            
-            print("\nDebug - Full response text:")
-            print(text)
-            
-            # Find the JSON between markdown code blocks
-            start_marker = "```json"
-            if start_marker not in text:
-                start_marker = "```"  # Fallback if json tag is not specified
-                
-            json_start = text.find(start_marker)
+    def _extract_changes_data(self, text: str) -> List[Any]:
+        """Extracts the raw list of changes from the model response text."""
+
+        print("\nDebug - Full response text:")
+        print(text)
+
+        # Find the JSON between markdown code blocks
+        start_marker = "```json"
+        if start_marker not in text:
+            start_marker = "```"  # Fallback if json tag is not specified
+
+        json_start = text.find(start_marker)
+        if json_start == -1:
+            # Fallback to looking for just a JSON object if no code blocks found
+            json_start = text.find('{')
             if json_start == -1:
-                # Fallback to looking for just a JSON object if no code blocks found
-                json_start = text.find('{')
-                if json_start == -1:
-                    raise ValueError("No JSON found in response")
-                json_text = text[json_start:]
-            else:
-                # Extract text between ``` markers
-                json_start = text.find('{', json_start)
-                json_end = text.find('```', json_start)
-                json_text = text[json_start:json_end].strip() if json_end != -1 else text[json_start:].strip()
-            
-            print("\nDebug - Extracted JSON text:")
-            print(json_text)
-            
-            # Parse JSON
-            json_data = json.loads(json_text)
-            
-            # Validate that we have the expected number of changes
-            if len(json_data['changes']) != len(context):
-                print(f"\nWarning: Number of changes ({len(json_data['changes'])}) does not match context length ({len(context)})")
-                return None
-            
-            # Keep track of line offsets for each file
-            file_offsets = {}  # "filepath (str): offset (int)"
-            
-            # Process each change to add line numbers
-            processed_changes = []
-            for i, change_data in enumerate(json_data['changes']):
-                # Get matching context entry directly using the same index
-                matching_context = context[i]
-                
-                if matching_context['codeContext']['filename'] == change_data['filepath']:
-                    filepath = change_data['filepath']
-                    
-                    # Get current offset for this file
-                    current_offset = file_offsets.get(filepath, 0)
-                    
-                    # Get the original line where we want to insert
-                    original_line = matching_context['codeContext']['line']['beginning']
-                    
-                    # Calculate start_line with current offset
-                    start_line = original_line + current_offset - 1
-                    
-                    # Calculate number of lines in the new code
-                    code_lines = change_data['code'].count('\n') + 1
-                    
-                    # Create Change object
-                    change = Change(
-                        start_line=start_line,
-                        filepath=filepath,
-                        code=change_data['code'],
-                        description=change_data['description']
-                    )
-                    processed_changes.append(change)
-                    
-                    # Update the offset for this file
-                    file_offsets[filepath] = current_offset + code_lines
-                else:
-                    print(f"\nWarning: Context mismatch for file {change_data['filepath']}")
-                    raise ValueError("Context mismatch: LLM generated documentation for wrong file order")
-            
-            return processed_changes
-            
+                raise ValueError("No JSON found in response")
+            json_text = text[json_start:]
+        else:
+            # Extract text between ``` markers
+            json_start = text.find('{', json_start)
+            json_end = text.find('```', json_start)
+            json_text = text[json_start:json_end].strip() if json_end != -1 else text[json_start:].strip()
+
+        print("\nDebug - Extracted JSON text:")
+        print(json_text)
+
+        json_data = json.loads(json_text)
+        if not isinstance(json_data, dict) or not isinstance(json_data.get('changes'), list):
+            raise ValueError("Response JSON has no 'changes' list")
+        return json_data['changes']
+
+    def _match_changes(self, text: str, context: List[Dict[str, Any]]) -> Dict[int, Dict[str, str]]:
+        """Validates each change of a complete response and matches it to its context entry.
+
+        Returns:
+            Dict mapping context indices to the change data generated for them
+        """
+        try:
+            changes_data = self._extract_changes_data(text)
         except Exception as e:
             print(f"\nError extracting JSON from response: {e}")
-            if 'text' in locals():
-                print("\nRaw text that caused the error:")
-                print(text)
-            return None
\ No newline at end of file
+            return {}
+
+        if len(changes_data) != len(context):
+            print(f"\nWarning: Number of changes ({len(changes_data)}) does not match context length ({len(context)})")
+
+        matched: Dict[int, Dict[str, str]] = {}
+        for position, change_data in enumerate(changes_data):
+            match = self._match_change(position, change_data, context, matched)
+            if match is not None:
+                matched[match[0]] = match[1]
+        return matched
+
+    def _match_change(
+        self,
+        position: int,
+        change_data: Any,
+        context: List[Dict[str, Any]],
+        matched: Dict[int, Dict[str, str]],
+    ) -> Optional[Tuple[int, Dict[str, str]]]:
+        """Validates one generated change and matches it to its context entry.
+
+        A change is matched to the unmatched context entry with the same
+        filename whose route path appears in the generated code, preferring the
+        entry at the same position. In the compact spec output format, matching
+        is by filename and position and the matched spec is rendered into its
+        JSDoc block here.
+
+        Args:
+            position: Index of the change in the response
+            change_data: The decoded change object
+            context: Route contexts the response was generated for
+            matched: Context indices already matched in this response
+
+        Returns:
+            (context index, change data), or None if the change is invalid or unmatched
+        """
+        spec_format = self.config.output_format == "spec"
+        if not (
+            isinstance(change_data, dict)
+            and all(isinstance(change_data.get(key), str) for key in ("filepath", "description"))
+            and (
+                isinstance(change_data.get("spec"), dict) if spec_format
+                else isinstance(change_data.get("code"), str) and change_data["code"].strip()
+            )
+        ):
+            print(f"\nWarning: Skipping malformed change at position {position}")
+            return None
+
+        candidates = [
+            i for i, entry in enumerate(context)
+            if i not in matched and entry['codeContext']['filename'] == change_data['filepath']
+        ]
+        by_path = [] if spec_format else [
+            i for i in candidates
+            if self._documents_path(change_data['code'], self._route_endpoint(context[i]).get("path", ""))
+        ]
+
+        if position in by_path:
+            index = position
+        elif by_path:
+            index = by_path[0]
+        elif position in candidates:
+            index = position
+        else:
+            print(f"\nWarning: Context mismatch for file {change_data['filepath']} at position {position}")
+            return None
+
+        if spec_format:
+            endpoint = self._route_endpoint(context[index])
+            try:
+                code = render_spec(
+                    self._swagger_path(endpoint["path"]), endpoint["methods"][0], change_data["spec"]
+                )
+            except (KeyError, IndexError, TypeError, ValueError, AttributeError) as e:
+                print(f"\nWarning: Could not render spec at position {position}: {e}")
+                return None
+            change_data = {
+                "filepath": change_data["filepath"],
+                "code": code,
+                "description": change_data["description"],
+            }
+        return index, change_data
+
+    def _convert_to_changes(self, accepted: Dict[int, Dict[str, str]], context: List[Dict[str, Any]]) -> List[Change]:
+        """Converts the accepted change data to a list of changes at their routes' original line numbers.
+
+        Routes with an existing doc block replace the block's lines.
+        """
+        # Process changes in file order so each file's changes are listed top to bottom
+        ordered = sorted(
+            accepted,
+            key=lambda i: (context[i]['codeContext']['filename'], context[i]['codeContext']['line']['beginning'])
+        )
+
+        processed_changes = []
+        for i in ordered:
+            start_line, end_line = change_span(context[i])
+            processed_changes.append(Change(
+                start_line=start_line,
+                filepath=accepted[i]['filepath'],
+                code=accepted[i]['code'],
+                description=accepted[i]['description'],
+                end_line=end_line
+            ))
+        return processed_changes
@@ -0,0 +1,169 @@
+import json
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from .file_handler import write_atomic
+from .models import GenerationResult, RouteProgress
+
+
+@dataclass
+class BatchMetrics:
+    """Cost of a single model request covering one or more routes."""
+    attempt: int
+    routes: int
+    valid_routes: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    prefill_seconds: float = 0.0
+    decode_seconds: float = 0.0
+    seconds: float = 0.0
+    failed: bool = False
+    truncated: bool = False
+    timed_out: bool = False
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.output_tokens / self.decode_seconds if self.decode_seconds else 0.0
+
+
+class RunMetrics:
+    """Per-route and per-batch token, latency, retry and cache counters for a run.
+
+    Batch costs come from the backend's GenerationResult; each route is
+    charged an even share of the batches it was part of.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.routes: List[RouteProgress] = []
+        self.batches: List[BatchMetrics] = []
+
+    def record_batch(self, attempt: int, routes: List[RouteProgress], result: Optional[GenerationResult],
+                     valid_routes: int = 0, timed_out: bool = False) -> BatchMetrics:
+        """Records one model request and charges its cost to the routes it covered.
+
+        Args:
+            attempt: 1-based attempt number the request belonged to
+            routes: Progress entries of the routes sent in the request
+            result: The backend's result, or None if the request failed
+            valid_routes: Number of routes the response documented validly
+            timed_out: Whether the request failed because it passed its deadline
+        """
+        batch = BatchMetrics(
+            attempt=attempt, routes=len(routes), valid_routes=valid_routes, failed=result is None, timed_out=timed_out
+        )
+        if result is not None:
+            batch.input_tokens = result.input_tokens
+            batch.output_tokens = result.output_tokens
+            batch.prefill_seconds = result.prefill_seconds
+            batch.decode_seconds = result.decode_seconds
+            batch.seconds = result.seconds
+            batch.truncated = result.truncated
+            share = 1 / len(routes) if routes else 0.0
+            for route in routes:
+                route.input_tokens += round(result.input_tokens * share)
+                route.output_tokens += round(result.output_tokens * share)
+                route.prefill_seconds += result.prefill_seconds * share
+                route.decode_seconds += result.decode_seconds * share
+        self.batches.append(batch)
+        return batch
+
+    def summary(self) -> Dict[str, Any]:
+        """Returns the run totals."""
+        output_tokens = sum(batch.output_tokens for batch in self.batches)
+        decode_seconds = sum(batch.decode_seconds for batch in self.batches)
+        return {
+            "routes": len(self.routes),
+            "documented": sum(1 for route in self.routes if route.done),
+            "model_routes": sum(1 for route in self.routes if route.source == "model"),
+            "template_routes": sum(1 for route in self.routes if route.source == "template"),
+            "cache_hits": sum(1 for route in self.routes if route.source == "cache"),
+            "dedup_routes": sum(1 for route in self.routes if route.source == "dedup"),
+            "existing_routes": sum(1 for route in self.routes if route.source == "existing"),
+            "dedup_ratio": self._dedup_ratio(),
+            "dedup_tokens_saved": sum(route.tokens_saved for route in self.routes),
+            "retries": sum(max(0, route.attempts - 1) for route in self.routes),
+            "batches": len(self.batches),
+            "failed_batches": sum(1 for batch in self.batches if batch.failed),
+            "truncated_batches": sum(1 for batch in self.batches if batch.truncated),
+            "timed_out_batches": sum(1 for batch in self.batches if batch.timed_out),
+            "input_tokens": sum(batch.input_tokens for batch in self.batches),
+            "output_tokens": output_tokens,
+            "prefill_seconds": sum(batch.prefill_seconds for batch in self.batches),
+            "decode_seconds": decode_seconds,
+            "generation_seconds": sum(batch.seconds for batch in self.batches),
+            "tokens_per_second": output_tokens / decode_seconds if decode_seconds else 0.0,
+        }
+
+    def _dedup_ratio(self) -> float:
+        """Share of the routes that needed the model which were documented from an identical route."""
+        needing_model = sum(1 for route in self.routes if route.source in ("model", "dedup"))
+        deduplicated = sum(1 for route in self.routes if route.source == "dedup")
+        return deduplicated / needing_model if needing_model else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        routes = []
+        for route in self.routes:
+            entry = asdict(route)
+            entry["retries"] = max(0, route.attempts - 1)
+            entry["cache_hit"] = route.source == "cache"
+            routes.append(entry)
+        batches = [{**asdict(batch), "tokens_per_second": batch.tokens_per_second} for batch in self.batches]
+        return {
+            "started_at": self.started_at,
+            "finished_at": time.time(),
+            "summary": self.summary(),
+            "routes": routes,
+            "batches": batches,
+        }
+
+    def write_json(self, path: Union[str, Path]) -> None:
+        """Writes the metrics as JSON."""
+        write_atomic(Path(path), json.dumps(self.to_dict(), indent=2))
+
+    def write_prometheus(self, path: Union[str, Path]) -> None:
+        """Writes the run totals in the Prometheus text format, for the node_exporter textfile collector."""
+        summary = self.summary()
+        lines = [
+            "# HELP auto_swagger_routes Routes in the last run by how they were documented",
+            "# TYPE auto_swagger_routes gauge",
+        ]
+        for source, key in (
+            ("model", "model_routes"), ("template", "template_routes"), ("cache", "cache_hits"), ("dedup", "dedup_routes"),
+            ("existing", "existing_routes"),
+        ):
+            lines.append(f'auto_swagger_routes{{source="{source}"}} {summary[key]}')
+
+        gauges = [
+            ("auto_swagger_routes_documented", "Routes documented in the last run", summary["documented"]),
+            ("auto_swagger_dedup_ratio", "Share of model routes documented from an identical route", summary["dedup_ratio"]),
+            ("auto_swagger_dedup_tokens_saved", "Estimated tokens saved by route deduplication", summary["dedup_tokens_saved"]),
+            ("auto_swagger_route_retries", "Route retries in the last run", summary["retries"]),
+            ("auto_swagger_batches", "Model requests in the last run", summary["batches"]),
+            ("auto_swagger_failed_batches", "Failed model requests in the last run", summary["failed_batches"]),
+            ("auto_swagger_truncated_batches", "Model requests cut off at max_new_tokens in the last run",
+             summary["truncated_batches"]),
+            ("auto_swagger_timed_out_batches", "Model requests that passed their deadline in the last run",
+             summary["timed_out_batches"]),
+            ("auto_swagger_input_tokens", "Prompt tokens in the last run", summary["input_tokens"]),
+            ("auto_swagger_output_tokens", "Generated tokens in the last run", summary["output_tokens"]),
+            ("auto_swagger_prefill_seconds", "Prompt processing time in the last run", summary["prefill_seconds"]),
+            ("auto_swagger_decode_seconds", "Decoding time in the last run", summary["decode_seconds"]),
+            ("auto_swagger_tokens_per_second", "Decode throughput in the last run", summary["tokens_per_second"]),
+            ("auto_swagger_last_run_timestamp_seconds", "Time the last run finished", time.time()),
+        ]
+        for name, help_text, value in gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+        write_atomic(Path(path), "\n".join(lines) + "\n")
+
+    def print_summary(self) -> None:
+        summary = self.summary()
+        print(f"\nRun metrics: {summary['input_tokens']} input / {summary['output_tokens']} output tokens "
+              f"in {summary['batches']} batches, prefill {summary['prefill_seconds']:.2f}s, "
+              f"decode {summary['decode_seconds']:.2f}s ({summary['tokens_per_second']:.2f} tok/s), "
+              f"{summary['retries']} retries, {summary['cache_hits']} cache hits")
+        if summary["dedup_routes"]:
+            print(f"Deduplicated {summary['dedup_routes']} routes ({summary['dedup_ratio']:.0%} of model routes), "
+                  f"saving ~{summary['dedup_tokens_saved']} tokens")
@@ -0,0 +1,152 @@
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+import torch
+from transformers import AutoModelForCausalLM
+from peft import PeftModel
+
+from auto_swagger.config.settings import MODEL_BUNDLE_DIR
+from .generator_config import LLMConfig
+from .tokenization import load_tokenizer
+
+MANIFEST_NAME = "auto_swagger_bundle.json"
+
+DTYPES = {
+    "float32": torch.float32,
+    "float16": torch.float16,
+    "bfloat16": torch.bfloat16,
+}
+
+
+def bundle_model(config: LLMConfig, output_dir: Union[str, Path], dtype: str = "float32") -> Path:
+    """Merges the LoRA adapter into the base model and saves a self-contained bundle.
+
+    The bundle holds the tokenizer (with the stop token already registered) and
+    the merged weights as safetensors, so LLMHandler can load it offline with
+    memory-mapped weights and without PEFT.
+
+    The adapter is merged in ``dtype`` and the dtype is recorded in the
+    manifest. Loading casts the weights to the dtype the hub path uses on
+    the device (float16 on CUDA and MPS, float32 on CPU), so a bundle
+    generates like the unmerged model wherever it is loaded.
+
+    Args:
+        config: LLMConfig naming the base model and LoRA adapter to merge
+        output_dir: Directory the bundle is written to
+        dtype: Weight dtype to store (float32 keeps full merge precision and loads zero-copy on CPU)
+
+    Returns:
+        Path: The bundle directory
+    """
+    output_dir = Path(output_dir).resolve()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    start_time = time.time()
+
+    tokenizer = load_tokenizer(config.model_name)
+
+    print(f"Loading base model {config.model_name}...")
+    base_model = AutoModelForCausalLM.from_pretrained(
+        config.model_name,
+        trust_remote_code=True,
+        torch_dtype=DTYPES[dtype],
+        low_cpu_mem_usage=True,
+    )
+    base_model.resize_token_embeddings(len(tokenizer))
+    base_model.config.pad_token_id = tokenizer.pad_token_id
+
+    print(f"Merging LoRA adapter {config.lora_adapter_id}...")
+    model = PeftModel.from_pretrained(base_model, config.lora_adapter_id)
+    model = model.merge_and_unload()
+
+    print(f"Saving bundle to {output_dir}...")
+    model.save_pretrained(str(output_dir), safe_serialization=True)
+    tokenizer.save_pretrained(str(output_dir))
+    (output_dir / MANIFEST_NAME).write_text(json.dumps({
+        "model_name": config.model_name,
+        "lora_adapter_id": config.lora_adapter_id,
+        "dtype": dtype,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }, indent=2))
+
+    print(f"Bundle created in {time.time() - start_time:.2f} seconds")
+    return output_dir
+
+
+def bundle_dtype(bundle_path: Union[str, Path]) -> Optional[torch.dtype]:
+    """Returns the weight dtype recorded in a bundle's manifest, or None if it is unknown."""
+    try:
+        manifest = json.loads((Path(bundle_path) / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return None
+    return DTYPES.get(manifest.get("dtype"))
+
+
+def find_bundle(config: LLMConfig) -> Optional[Path]:
+    """Returns the bundle directory to load for this config, if one is available.
+
+    An explicitly configured ``model_bundle_path`` is always used. Otherwise the
+    default MODEL_BUNDLE_DIR is used only when its manifest matches the
+    configured model and adapter.
+    """
+    if config.model_bundle_path is not None:
+        path = Path(config.model_bundle_path)
+        if not (path / MANIFEST_NAME).exists():
+            raise FileNotFoundError(f"No model bundle found at {path}")
+        return path
+
+    manifest_path = MODEL_BUNDLE_DIR / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except ValueError:
+        return None
+    if (
+        manifest.get("model_name") == config.model_name
+        and manifest.get("lora_adapter_id") == config.lora_adapter_id
+    ):
+        return MODEL_BUNDLE_DIR
+    return None
+
+
+def main():
+    """Command line entry point for creating a merged model bundle."""
+    defaults = LLMConfig()
+    parser = argparse.ArgumentParser(
+        description="Merge the LoRA adapter into the base model and save an offline bundle."
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        help="Directory to write the bundle to",
+        default=str(MODEL_BUNDLE_DIR),
+    )
+    parser.add_argument(
+        "--model-name",
+        type=str,
+        help="Base model name or path",
+        default=defaults.model_name,
+    )
+    parser.add_argument(
+        "--lora-adapter-id",
+        type=str,
+        help="LoRA adapter repo ID or path",
+        default=defaults.lora_adapter_id,
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=sorted(DTYPES),
+        help="Weight dtype stored in the bundle",
+        default="float32",
+    )
+    args = parser.parse_args()
+
+    config = LLMConfig(model_name=args.model_name, lora_adapter_id=args.lora_adapter_id)
+    bundle_model(config, args.output_dir, args.dtype)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass
 class Change:
@@ -6,4 +7,31 @@ class Change:
     start_line: int
     filepath: str
     code: str
-    description: str
\ No newline at end of file
+    description: str
+    end_line: Optional[int] = None  # replace lines start_line..end_line instead of inserting at start_line
+
+@dataclass
+class RouteProgress:
+    """Tracks generation progress and cost for a single API route."""
+    label: str
+    attempts: int = 0
+    seconds: float = 0.0
+    done: bool = False
+    source: str = "model"  # "model", "cache", "template", "dedup" or "existing"
+    input_tokens: int = 0
+    output_tokens: int = 0
+    prefill_seconds: float = 0.0
+    decode_seconds: float = 0.0
+    duplicate_of: Optional[str] = None  # label of the route a "dedup" route was documented from
+    tokens_saved: int = 0  # tokens the original route cost, for "dedup" routes
+
+@dataclass
+class GenerationResult:
+    """A complete model response and what it cost."""
+    text: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    seconds: float = 0.0
+    prefill_seconds: float = 0.0  # prompt processing, until the first new token
+    decode_seconds: float = 0.0  # generating the remaining tokens
+    truncated: bool = False  # stopped at the max_new_tokens limit
@@ -0,0 +1,245 @@
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Generator, Iterator, List, Optional
+
+import numpy as np
+import onnxruntime as ort
+import torch
+from transformers import LogitsProcessorList
+
+from auto_swagger.config.settings import ONNX_MODEL_DIR
+from .backend import GenerationBackend
+from .constrained_decoding import ChangesGrammar, ChangesSchemaLogitsProcessor, build_token_texts
+from .generator_config import DEFAULT_ADAPTER, LLMConfig
+from .models import GenerationResult
+from .onnx_export import ONNX_MODEL_FILE
+from .tokenization import load_tokenizer
+
+ONNX_DTYPES = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+}
+
+
+class OnnxRuntimeBackend(GenerationBackend):
+    """Runs greedy decoding on an ONNX export of the merged model with onnxruntime.
+
+    The model exported by ``export-onnx`` takes the key/value cache as
+    inputs and returns the updated cache. Every decoding step binds the
+    previous step's cache outputs directly as the next step's inputs with
+    IO binding, so the cache stays in onnxruntime-owned memory instead of
+    being copied through numpy. Constrained decoding runs the same logits
+    processor as the transformers backend.
+    """
+
+    def __init__(self, config: LLMConfig):
+        """
+        Load the tokenizer and create the inference session.
+
+        Args:
+            config: LLMConfig with ``onnx_model_path`` and the thread settings
+        """
+        self.config = config
+        self.model_dir = Path(config.onnx_model_path or ONNX_MODEL_DIR)
+        model_path = self.model_dir / ONNX_MODEL_FILE
+        if not model_path.exists():
+            raise FileNotFoundError(f"No ONNX model found at {model_path}, create one with export-onnx")
+
+        start_time = time.time()
+        self.tokenizer = load_tokenizer(self.model_dir, local_files_only=True)
+        self._token_texts: Optional[List[str]] = None
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if config.num_threads:
+            options.intra_op_num_threads = config.num_threads
+        if config.num_interop_threads:
+            options.inter_op_num_threads = config.num_interop_threads
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.output_names = [node.name for node in self.session.get_outputs()]
+        self.empty_cache = self._empty_cache(json.loads((self.model_dir / "config.json").read_text()))
+        print(f"ONNX model loaded in {time.time() - start_time:.2f} seconds "
+              f"({len(self.empty_cache) // 2} layers, {self.session.get_providers()[0]})")
+
+    def _empty_cache(self, model_config: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Builds the zero-length key/value cache inputs fed to the first (prefill) step."""
+        num_heads = model_config["num_attention_heads"]
+        num_kv_heads = model_config.get("num_key_value_heads", num_heads)
+        head_dim = model_config.get("head_dim") or model_config["hidden_size"] // num_heads
+        cache = {}
+        for node in self.session.get_inputs():
+            if node.name.startswith("past_key_values."):
+                dtype = ONNX_DTYPES.get(node.type, np.float32)
+                cache[node.name] = np.zeros((1, num_kv_heads, 0, head_dim), dtype=dtype)
+        return cache
+
+    def token_texts(self) -> List[str]:
+        """Returns the decoded text of every token id, building it on first use."""
+        if self._token_texts is None:
+            self._token_texts = build_token_texts(self.tokenizer)
+        return self._token_texts
+
+    def _prompt_ids(self, system_prompt: str, user_prompt: str) -> List[int]:
+        messages = [
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': user_prompt}
+        ]
+        return list(self.tokenizer.apply_chat_template(messages, add_generation_prompt=True))
+
+    def _logits_processors(self, context: Optional[List[Dict[str, Any]]], prompt_length: int) -> LogitsProcessorList:
+        if context is None or not self.config.constrained_decoding:
+            return LogitsProcessorList()
+        grammar = ChangesGrammar(
+            [entry['codeContext']['filename'] for entry in context],
+            self.config.output_format,
+        )
+        return LogitsProcessorList([ChangesSchemaLogitsProcessor(
+            grammar,
+            self.token_texts(),
+            prompt_length,
+            self.tokenizer.eos_token_id,
+            special_token_ids=self.tokenizer.all_special_ids,
+        )])
+
+    def _decode_tokens(
+        self,
+        prompt_ids: List[int],
+        context: Optional[List[Dict[str, Any]]],
+        max_new_tokens: int,
+        timeout: float,
+    ) -> Iterator[int]:
+        """Greedily decodes new token ids until EOS or ``max_new_tokens``.
+
+        Raises:
+            TimeoutError: If decoding takes longer than ``timeout`` seconds
+        """
+        deadline = time.time() + timeout
+        processors = self._logits_processors(context, len(prompt_ids))
+        sequence = list(prompt_ids)
+        step_ids = np.array([prompt_ids], dtype=np.int64)
+        cache: Dict[str, Any] = dict(self.empty_cache)
+        logits_index = self.output_names.index("logits")
+
+        for _ in range(max_new_tokens):
+            past_length = len(sequence) - step_ids.shape[1]
+            binding = self.session.io_binding()
+            binding.bind_cpu_input("input_ids", step_ids)
+            binding.bind_cpu_input("attention_mask", np.ones((1, len(sequence)), dtype=np.int64))
+            if "position_ids" in self.input_names:
+                positions = np.arange(past_length, len(sequence), dtype=np.int64)[None, :]
+                binding.bind_cpu_input("position_ids", positions)
+            for name, value in cache.items():
+                if isinstance(value, np.ndarray):
+                    binding.bind_cpu_input(name, value)
+                else:
+                    binding.bind_ortvalue_input(name, value)
+            for name in self.output_names:
+                binding.bind_output(name, "cpu")
+            self.session.run_with_iobinding(binding)
+            outputs = binding.get_outputs()
+
+            # Keep the cache as onnxruntime values for the next step
+            cache = {
+                name.replace("present", "past_key_values", 1): value
+                for name, value in zip(self.output_names, outputs)
+                if name.startswith("present")
+            }
+            scores = torch.from_numpy(outputs[logits_index].numpy()[:, -1, :].astype(np.float32))
+            if processors:
+                scores = processors(torch.tensor([sequence], dtype=torch.long), scores)
+            token_id = int(torch.argmax(scores, dim=-1))
+            if token_id == self.tokenizer.eos_token_id:
+                return
+            yield token_id
+
+            if time.time() > deadline:
+                raise TimeoutError(f"Generation timed out after {timeout:.0f} seconds")
+            sequence.append(token_id)
+            step_ids = np.array([[token_id]], dtype=np.int64)
+
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        context: Optional[List[Dict[str, Any]]] = None,
+        max_new_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        adapter: Optional[str] = None,
+    ) -> GenerationResult:
+        """Generates a complete response.
+
+        Raises:
+            TimeoutError: If the response is not finished within the timeout
+        """
+        stream = self.stream(system_prompt, user_prompt, context, max_new_tokens, timeout, adapter)
+        while True:
+            try:
+                next(stream)
+            except StopIteration as stop:
+                return stop.value
+
+    def stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        context: Optional[List[Dict[str, Any]]] = None,
+        max_new_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        adapter: Optional[str] = None,
+    ) -> Generator[str, None, GenerationResult]:
+        """Generates a response, yielding decoded text as it is produced.
+
+        Text is held back while it ends in an incomplete character and
+        decoded per line, like transformers' TextIteratorStreamer.
+
+        Returns:
+            The GenerationResult of the whole response, as the generator's return value
+
+        Raises:
+            ValueError: If another adapter than the exported one is requested
+            TimeoutError: If the response is not finished within the timeout
+        """
+        adapter = adapter or self.config.adapter
+        if adapter != DEFAULT_ADAPTER:
+            # The export has lora_adapter_id merged into its weights
+            raise ValueError(f"The onnx backend only runs the exported adapter, not '{adapter}'")
+        max_new_tokens = max_new_tokens or self.config.max_new_tokens
+        timeout = timeout or self.config.generation_timeout
+        prompt_ids = self._prompt_ids(system_prompt, user_prompt)
+
+        start_time = time.time()
+        first_token_time = None
+        output_tokens = 0
+        chunks: List[str] = []
+        line_ids: List[int] = []
+        printed = 0
+        for token_id in self._decode_tokens(prompt_ids, context, max_new_tokens, timeout):
+            if first_token_time is None:
+                first_token_time = time.time()
+            output_tokens += 1
+            line_ids.append(token_id)
+            text = self.tokenizer.decode(line_ids, skip_special_tokens=True)
+            if text.endswith("�"):
+                continue
+            if text[printed:]:
+                chunks.append(text[printed:])
+                yield text[printed:]
+            printed = len(text)
+            if text.endswith("\n"):
+                line_ids, printed = [], 0
+
+        end_time = time.time()
+        first_token_time = first_token_time or end_time
+        print(f"Generation completed in {end_time - start_time:.2f} seconds")
+        return GenerationResult(
+            text="".join(chunks),
+            input_tokens=len(prompt_ids),
+            output_tokens=output_tokens,
+            seconds=end_time - start_time,
+            prefill_seconds=first_token_time - start_time,
+            decode_seconds=end_time - first_token_time,
+            truncated=output_tokens >= max_new_tokens,
+        )
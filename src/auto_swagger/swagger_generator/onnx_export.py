@@ -0,0 +1,103 @@
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+from auto_swagger.config.settings import MODEL_BUNDLE_DIR, ONNX_MODEL_DIR
+from .generator_config import LLMConfig
+from .model_bundle import bundle_model, find_bundle
+
+ONNX_MANIFEST_NAME = "auto_swagger_onnx.json"
+ONNX_MODEL_FILE = "model.onnx"
+
+
+def export_onnx(config: LLMConfig, output_dir: Union[str, Path], opset: Optional[int] = None) -> Path:
+    """Exports the merged model to ONNX with key/value cache inputs and outputs.
+
+    The LoRA adapter is merged by exporting the model bundle (created first
+    if no matching bundle exists), so the ONNX graph is a plain decoder. The
+    export is done by ``optimum`` with the ``text-generation-with-past`` task
+    and the tokenizer is saved next to it.
+
+    Args:
+        config: LLMConfig naming the base model and LoRA adapter (or a bundle)
+        output_dir: Directory the ONNX model is written to
+        opset: ONNX opset to export with, defaults to optimum's choice
+
+    Returns:
+        Path: The output directory
+    """
+    try:
+        from optimum.exporters.onnx import main_export
+    except ImportError as e:
+        raise ImportError("Exporting to ONNX needs optimum: pip install 'auto-swagger[onnx]'") from e
+
+    output_dir = Path(output_dir).resolve()
+    start_time = time.time()
+
+    bundle_path = find_bundle(config)
+    if bundle_path is None:
+        bundle_path = bundle_model(config, MODEL_BUNDLE_DIR)
+
+    print(f"Exporting {bundle_path} to ONNX in {output_dir}...")
+    main_export(
+        str(bundle_path),
+        output=str(output_dir),
+        task="text-generation-with-past",
+        opset=opset,
+        device="cpu",
+    )
+    (output_dir / ONNX_MANIFEST_NAME).write_text(json.dumps({
+        "model_name": config.model_name,
+        "lora_adapter_id": config.lora_adapter_id,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }, indent=2))
+
+    print(f"ONNX export completed in {time.time() - start_time:.2f} seconds")
+    return output_dir
+
+
+def main():
+    """Command line entry point for exporting the merged model to ONNX."""
+    defaults = LLMConfig()
+    parser = argparse.ArgumentParser(
+        description="Merge the LoRA adapter into the base model and export it to ONNX for onnxruntime."
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        help="Directory to write the ONNX model to",
+        default=str(ONNX_MODEL_DIR),
+    )
+    parser.add_argument(
+        "--model-name",
+        type=str,
+        help="Base model name or path",
+        default=defaults.model_name,
+    )
+    parser.add_argument(
+        "--lora-adapter-id",
+        type=str,
+        help="LoRA adapter repo ID or path",
+        default=defaults.lora_adapter_id,
+    )
+    parser.add_argument(
+        "--model-bundle",
+        type=str,
+        help="Export this merged model bundle instead of merging the adapter",
+        default=None,
+    )
+    parser.add_argument("--opset", type=int, help="ONNX opset version", default=None)
+    args = parser.parse_args()
+
+    config = LLMConfig(
+        model_name=args.model_name,
+        lora_adapter_id=args.lora_adapter_id,
+        model_bundle_path=Path(args.model_bundle) if args.model_bundle else None,
+    )
+    export_onnx(config, args.output_dir, args.opset)
+
+
+if __name__ == "__main__":
+    main()
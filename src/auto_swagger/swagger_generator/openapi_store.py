@@ -0,0 +1,359 @@
+import argparse
+import copy
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import yaml
+
+from auto_swagger.config.settings import OPENAPI_FRAGMENTS_DIR
+from .file_handler import write_atomic
+from .jsdoc_renderer import parse_jsdoc_block
+
+SOURCE_SUFFIXES = (".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx")
+SKIP_DIRS = {".git", "node_modules", "dist", "build", "coverage"}
+
+# A JSDoc block containing a @swagger or @openapi tag, without running into the next block
+_DOC_BLOCK = re.compile(r"/\*\*(?:(?!\*/).)*?@(?:swagger|openapi)\b(?:(?!\*/).)*\*/", re.DOTALL)
+
+# A fragment is the location of one value in the document and the value, e.g.
+# (["paths", "/users/{id}", "get"], {...}) or (["components", "schemas", "User"], {...})
+Fragment = Tuple[List[str], Any]
+
+
+def block_fragments(block: str) -> List[Fragment]:
+    """Splits a ``@swagger``/``@openapi`` block into per-operation and per-component fragments.
+
+    Raises:
+        ValueError: If the block has no tag or its YAML is invalid
+    """
+    try:
+        parsed = parse_jsdoc_block(block)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML in doc block: {e}") from e
+    if not isinstance(parsed, dict):
+        raise ValueError("Doc block does not contain a YAML mapping")
+
+    fragments: List[Fragment] = []
+    for key, value in parsed.items():
+        key = str(key)
+        if key.startswith("/") and isinstance(value, dict):
+            fragments += [(["paths", key, str(method)], operation) for method, operation in value.items()]
+        elif key == "components" and isinstance(value, dict):
+            for section, entries in value.items():
+                if isinstance(entries, dict):
+                    fragments += [(["components", str(section), str(name)], item) for name, item in entries.items()]
+    return fragments
+
+
+class OpenApiStore:
+    """Keeps a consolidated ``openapi.json`` in sync with the doc blocks in a repository.
+
+    Every ``@swagger``/``@openapi`` block is split into fragments (one per
+    operation or component) stored per file and block hash. Updating a set
+    of files only parses the YAML of blocks whose hash is new, and only the
+    fragments that appeared, changed or disappeared are merged into the
+    persisted document, so a run costs time proportional to what it changed
+    rather than to the size of the repository. Fragments are merged into the
+    document on disk, so everything they do not own (``info``, ``servers``,
+    security schemes, hand-written paths) is kept. That remainder is also
+    stored as the base of the document, so a deleted ``openapi.json`` is
+    reassembled without reading any source file.
+    """
+
+    VERSION = 2
+
+    def __init__(
+        self,
+        repo_path: Union[str, Path],
+        output_path: Optional[Union[str, Path]] = None,
+        fragments_path: Optional[Union[str, Path]] = None,
+        title: str = "API",
+        version: str = "1.0.0",
+    ):
+        """
+        Initialize the store and load the fragments of earlier runs.
+
+        Args:
+            repo_path: Repository root; fragments are keyed by paths relative to it
+            output_path: Consolidated document, defaults to openapi.json in the repository root
+            fragments_path: Fragment store, defaults to OPENAPI_FRAGMENTS_DIR/<repository hash>.json
+            title: info.title of a newly created document
+            version: info.version of a newly created document
+        """
+        self.repo_path = Path(repo_path).resolve()
+        self.output_path = Path(output_path) if output_path else self.repo_path / "openapi.json"
+        repo_hash = hashlib.sha256(str(self.repo_path).encode("utf-8")).hexdigest()[:16]
+        self.fragments_path = Path(fragments_path) if fragments_path else OPENAPI_FRAGMENTS_DIR / f"{repo_hash}.json"
+        self.title = title
+        self.version = version
+        # relative file path -> block hash -> fragments of the block
+        self.files: Dict[str, Dict[str, List[Fragment]]] = {}
+        # The last written document without the fragments, i.e. what was written by hand
+        self.base: Optional[Dict[str, Any]] = None
+        self.blocks_parsed = 0
+        self.loaded = self._load()
+
+    def _load(self) -> bool:
+        """Loads the fragment store; returns False if there was none to load."""
+        try:
+            data = json.loads(self.fragments_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != self.VERSION:
+            return False
+        self.files = {
+            path: {digest: [(list(location), value) for location, value in fragments]
+                   for digest, fragments in blocks.items()}
+            for path, blocks in data.get("files", {}).items()
+        }
+        self.base = data.get("base")
+        return True
+
+    def scan(self) -> Dict[str, int]:
+        """Indexes every source file of the repository, for the first run or a full rebuild.
+
+        An existing document is merged into rather than replaced: every
+        fragment is written over its location and the locations no source
+        file documents anymore are removed, the rest of the document is kept.
+        """
+        files = []
+        for root, dirs, names in os.walk(self.repo_path):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            files += [Path(root) / name for name in names if name.endswith(SOURCE_SUFFIXES)]
+        removed: Dict[str, List[str]] = {}
+        # Files deleted since the last scan are indexed as empty
+        stats = self._index(files + list(self.files), removed=removed)
+
+        document = self._load_document()
+        if document is None:
+            document = self.assemble()
+        else:
+            every_fragment = {self._location_key(location): (location, value)
+                              for blocks in self.files.values()
+                              for fragments in blocks.values() for location, value in fragments}
+            self._merge(document, every_fragment, removed)
+        self.write_document(document)
+        return stats
+
+    def update(self, files: Iterable[Union[str, Path]]) -> Dict[str, int]:
+        """Re-reads the doc blocks of ``files`` and merges the changed fragments into the document.
+
+        Args:
+            files: Changed files, absolute or relative to the repository
+
+        Returns:
+            Dict with the numbers of files read, blocks parsed and fragments changed and removed
+        """
+        changed: Dict[str, Fragment] = {}
+        removed: Dict[str, List[str]] = {}
+        stats = self._index(files, changed, removed)
+
+        document = self._load_document()
+        if document is None:
+            # Missing or unreadable: reassemble from the base and the fragments
+            document = self.assemble()
+        else:
+            self._merge(document, changed, removed)
+        self.write_document(document)
+        return stats
+
+    def _index(
+        self,
+        files: Iterable[Union[str, Path]],
+        changed: Optional[Dict[str, Fragment]] = None,
+        removed: Optional[Dict[str, List[str]]] = None,
+    ) -> Dict[str, int]:
+        """Re-reads the doc blocks of ``files`` into the store, collecting the fragments that changed."""
+        changed = {} if changed is None else changed
+        removed = {} if removed is None else removed
+        self.blocks_parsed = 0
+        relative_paths = sorted({self._relative(path) for path in files})
+        for relative in relative_paths:
+            old = {self._location_key(location): (location, value)
+                   for fragments in self.files.get(relative, {}).values() for location, value in fragments}
+            blocks = self._read_blocks(relative)
+            if blocks:
+                self.files[relative] = blocks
+            else:
+                self.files.pop(relative, None)
+            new = {self._location_key(location): (location, value)
+                   for fragments in blocks.values() for location, value in fragments}
+
+            for key, (location, value) in new.items():
+                if key not in old or old[key][1] != value:
+                    changed[key] = (location, value)
+            for key, (location, _) in old.items():
+                if key not in new:
+                    removed[key] = location
+
+        return {
+            "files": len(relative_paths),
+            "blocks_parsed": self.blocks_parsed,
+            "changed": len(changed),
+            "removed": len([key for key in removed if key not in changed]),
+        }
+
+    def _read_blocks(self, relative: str) -> Dict[str, List[Fragment]]:
+        """Returns the fragments of every doc block in a file, reusing those of unchanged blocks."""
+        path = self.repo_path / relative
+        try:
+            code = path.read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            return {}
+
+        previous = self.files.get(relative, {})
+        blocks: Dict[str, List[Fragment]] = {}
+        for match in _DOC_BLOCK.finditer(code):
+            block = match.group(0)
+            digest = hashlib.sha256(block.encode("utf-8")).hexdigest()
+            if digest in blocks:
+                continue
+            if digest in previous:
+                blocks[digest] = previous[digest]
+                continue
+            self.blocks_parsed += 1
+            try:
+                blocks[digest] = block_fragments(block)
+            except ValueError as e:
+                line = code.count("\n", 0, match.start()) + 1
+                print(f"Warning: Skipping doc block at {relative}:{line}: {e}")
+        return blocks
+
+    def _merge(self, document: Dict[str, Any], changed: Dict[str, Fragment], removed: Dict[str, List[str]]) -> None:
+        """Applies the changed and removed fragments to the document in place."""
+        for location, value in changed.values():
+            self._set(document, location, value)
+
+        removed = {key: location for key, location in removed.items() if key not in changed}
+        if not removed:
+            return
+        # Another file may still document a removed location (e.g. a route moved between files)
+        remaining = {}
+        for blocks in self.files.values():
+            for fragments in blocks.values():
+                for location, value in fragments:
+                    key = self._location_key(location)
+                    if key in removed:
+                        remaining[key] = value
+        for key, location in removed.items():
+            if key in remaining:
+                self._set(document, location, remaining[key])
+            else:
+                self._delete(document, location)
+
+    def assemble(self) -> Dict[str, Any]:
+        """Builds the whole document from the stored base and fragments."""
+        document = copy.deepcopy(self.base) if self.base else self._empty_document()
+        for relative in sorted(self.files):
+            for fragments in self.files[relative].values():
+                for location, value in fragments:
+                    self._set(document, location, value)
+        return document
+
+    def _empty_document(self) -> Dict[str, Any]:
+        return {
+            "openapi": "3.0.0",
+            "info": {"title": self.title, "version": self.version},
+            "paths": {},
+        }
+
+    def _load_document(self) -> Optional[Dict[str, Any]]:
+        """Returns the persisted document, including any edits made by hand, or None if there is none."""
+        try:
+            document = json.loads(self.output_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(document, dict):
+            return None
+        document.setdefault("paths", {})
+        return document
+
+    def write_document(self, document: Dict[str, Any]) -> None:
+        """Writes the document and the fragment store via temporary files and rename."""
+        document["paths"] = dict(sorted(document.get("paths", {}).items()))
+        self.base = self._without_fragments(document)
+        write_atomic(self.output_path, json.dumps(document, indent=2, ensure_ascii=False) + "\n")
+        write_atomic(self.fragments_path, json.dumps({
+            "version": self.VERSION,
+            "base": self.base,
+            "files": self.files,
+        }, ensure_ascii=False))
+
+    def _without_fragments(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns a copy of the document without the locations owned by fragments."""
+        base = copy.deepcopy(document)
+        for blocks in self.files.values():
+            for fragments in blocks.values():
+                for location, _ in fragments:
+                    self._delete(base, location)
+        return base
+
+    def _relative(self, path: Union[str, Path]) -> str:
+        path = Path(path)
+        if path.is_absolute():
+            path = path.resolve().relative_to(self.repo_path)
+        return path.as_posix()
+
+    @staticmethod
+    def _location_key(location: List[str]) -> str:
+        return json.dumps(location)
+
+    @staticmethod
+    def _set(document: Dict[str, Any], location: List[str], value: Any) -> None:
+        node = document
+        for key in location[:-1]:
+            node = node.setdefault(key, {})
+        node[location[-1]] = value
+
+    @staticmethod
+    def _delete(document: Dict[str, Any], location: List[str]) -> None:
+        """Removes a value and the containers it leaves empty, except ``paths``."""
+        parents = [document]
+        for key in location[:-1]:
+            child = parents[-1].get(key)
+            if not isinstance(child, dict):
+                return
+            parents.append(child)
+        parents[-1].pop(location[-1], None)
+        for depth in range(len(location) - 1, 0, -1):
+            if parents[depth] or location[:depth] == ["paths"]:
+                break
+            parents[depth - 1].pop(location[depth - 1], None)
+
+
+def update_openapi_document(store: OpenApiStore, files: Iterable[Union[str, Path]], full: bool = False) -> None:
+    """Merges the doc blocks of the changed files into the document, indexing the repository on first use."""
+    start_time = time.time()
+    if full or not store.loaded:
+        stats = store.scan()
+        store.loaded = True
+        action = "Indexed repository into"
+    else:
+        stats = store.update(files)
+        action = "Updated"
+    print(f"\n{action} {store.output_path}: {stats['files']} files, {stats['blocks_parsed']} blocks parsed, "
+          f"{stats['changed']} fragments changed, {stats['removed']} removed "
+          f"in {time.time() - start_time:.2f} seconds")
+
+
+def main():
+    """Command line entry point for (re)building the consolidated OpenAPI document."""
+    parser = argparse.ArgumentParser(
+        description="Build or update the consolidated openapi.json from the @swagger blocks of a repository."
+    )
+    parser.add_argument("--repo-path", type=str, help="Repository root", default=".")
+    parser.add_argument("--output", type=str, help="Document path, defaults to openapi.json in the repository")
+    parser.add_argument("--full", action="store_true", help="Re-read every source file instead of only FILES")
+    parser.add_argument("files", nargs="*", help="Changed files to merge into the document")
+    args = parser.parse_args()
+
+    update_openapi_document(OpenApiStore(args.repo_path, args.output), args.files, args.full)
+
+
+if __name__ == "__main__":
+    main()
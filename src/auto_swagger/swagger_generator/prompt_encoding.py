@@ -0,0 +1,129 @@
+import json
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .existing_docs import EXISTING_DOC
+
+PROMPT_ENCODINGS = ("compact", "verbose")
+
+SHARED_REF_PREFIX = "#/shared/"
+
+# Prompt note explaining shared references, added when the compact encoding hoisted anything
+SHARED_REF_NOTE = (
+    'Values of the form {"$ref":"#/shared/<name>"} stand for the entry <name> '
+    'of the "shared" section.'
+)
+
+
+def encode_context(context: List[Dict[str, Any]], encoding: str = "compact") -> str:
+    """Serializes route contexts for the prompt.
+
+    Args:
+        context: Route contexts from ApiDocParser
+        encoding: "verbose" for the indented contexts as parsed, "compact" for
+            minified contexts with empty fields dropped and repeated blocks
+            hoisted into a shared section
+
+    Returns:
+        str: The JSON text inserted into the prompt
+    """
+    if encoding == "verbose":
+        return json.dumps([_without_existing_doc(entry) for entry in context], indent=2)
+    if encoding != "compact":
+        raise ValueError(f"Unknown prompt encoding '{encoding}', expected one of {', '.join(PROMPT_ENCODINGS)}")
+    return json.dumps(compact_context(context), ensure_ascii=False, separators=(",", ":"))
+
+
+def compact_context(context: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Builds the compact form of route contexts.
+
+    Line numbers and existing doc blocks are dropped (they do not change the
+    documentation and are kept on the original context for placing the
+    blocks), as are empty fields and error ``conditions`` that only repeat
+    the description. Error blocks, request bodies and response schemas that
+    appear in more than one route are stored once under ``shared`` and
+    replaced by a ``$ref``.
+
+    Returns:
+        Dict with the ``routes`` in context order and, if anything was
+        hoisted, the ``shared`` blocks they reference
+    """
+    routes = [_strip(_without_line(entry)) for entry in context]
+
+    counts: Counter = Counter()
+    for container, key, _ in _shared_slots(routes):
+        counts[_canonical(container[key])] += 1
+
+    shared: Dict[str, Any] = {}
+    names: Dict[str, str] = {}
+    kind_counts: Counter = Counter()
+    for container, key, kind in _shared_slots(routes):
+        canonical = _canonical(container[key])
+        if counts[canonical] < 2:
+            continue
+        if canonical not in names:
+            kind_counts[kind] += 1
+            name = f"{kind}{kind_counts[kind]}"
+            ref = json.dumps({"$ref": SHARED_REF_PREFIX + name}, separators=(",", ":"))
+            # Only hoist blocks that are longer than the reference replacing them
+            if len(canonical) <= len(ref):
+                kind_counts[kind] -= 1
+                continue
+            names[canonical] = name
+            shared[name] = container[key]
+        container[key] = {"$ref": SHARED_REF_PREFIX + names[canonical]}
+
+    if not shared:
+        return {"routes": routes}
+    return {"shared": shared, "routes": routes}
+
+
+def _without_line(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns a copy of a context entry without its source line numbers and existing doc block."""
+    code_context = {k: v for k, v in entry.get("codeContext", {}).items() if k not in ("line", EXISTING_DOC)}
+    return {**entry, "codeContext": code_context}
+
+
+def _without_existing_doc(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns a context entry without the doc block it replaces, which must not steer generation."""
+    if EXISTING_DOC not in entry.get("codeContext", {}):
+        return entry
+    code_context = {k: v for k, v in entry["codeContext"].items() if k != EXISTING_DOC}
+    return {**entry, "codeContext": code_context}
+
+
+def _strip(value: Any) -> Any:
+    """Recursively drops empty values and error conditions that duplicate the description."""
+    if isinstance(value, dict):
+        stripped = {}
+        for key, item in value.items():
+            if key == "conditions" and item == [value.get("description")]:
+                continue
+            item = _strip(item)
+            if item is None or item == "" or item == {} or item == []:
+                continue
+            stripped[key] = item
+        return stripped
+    if isinstance(value, list):
+        return [_strip(item) for item in value]
+    return value
+
+
+def _shared_slots(routes: List[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], str, str]]:
+    """Yields (container, key, kind) for every block that may be hoisted into the shared section."""
+    for route in routes:
+        for details in route.get("apiDetails", {}).values():
+            parameters = details.get("parameters", {})
+            if "body" in parameters:
+                yield parameters, "body", "body"
+            responses = details.get("responses", {})
+            for response in responses.get("success", {}).values():
+                if isinstance(response, dict) and "schema" in response:
+                    yield response, "schema", "schema"
+            if "error" in responses:
+                yield responses, "error", "errors"
+
+
+def _canonical(value: Any) -> str:
+    """Serializes a block so structurally identical blocks compare equal."""
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
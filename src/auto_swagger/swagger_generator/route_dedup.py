@@ -0,0 +1,44 @@
+import hashlib
+import json
+from typing import Any, Dict, List
+
+from .prompt_encoding import compact_context
+
+
+def canonical_route_key(entry: Dict[str, Any]) -> str:
+    """Hashes the parts of a route context that determine its documentation apart from its location.
+
+    Routes mounted from the same handler factory produce contexts that only
+    differ in their filename, line numbers and route path. Those are dropped,
+    along with the empty fields the compact prompt encoding drops, so such
+    routes share a key and can be documented once. The method, parameters
+    (including the path parameter names), responses and inferred resource
+    all stay part of the key.
+    """
+    route = compact_context([entry])["routes"][0]
+    route.get("codeContext", {}).pop("filename", None)
+    for details in route.get("apiDetails", {}).values():
+        details.get("endpoint", {}).pop("path", None)
+    payload = json.dumps(route, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def group_duplicate_routes(keys: List[str], indices: List[int]) -> Dict[int, List[int]]:
+    """Groups routes with equal canonical keys.
+
+    Args:
+        keys: Canonical key of every route context
+        indices: Context indices to group
+
+    Returns:
+        Dict mapping the first index of each group, in order, to the other indices in the group
+    """
+    representatives: Dict[str, int] = {}
+    groups: Dict[int, List[int]] = {}
+    for i in indices:
+        representative = representatives.setdefault(keys[i], i)
+        if representative == i:
+            groups[i] = []
+        else:
+            groups[representative].append(i)
+    return groups
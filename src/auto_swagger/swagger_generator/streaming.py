@@ -0,0 +1,261 @@
+import json
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .existing_docs import change_span
+from .file_handler import FileHandler
+from .generator_config import PipelineConfig
+from .models import Change
+
+# Marks the end of a stage's output
+_DONE = object()
+
+# Marks the end of one file's changes
+_FILE_DONE = object()
+
+
+class IncrementalChangesParser:
+    """Parses a streamed ``{"changes": [...]}`` response one change at a time.
+
+    Text is fed in arbitrary chunks as it is decoded. Every object in the
+    ``changes`` array is decoded and returned as soon as its closing brace
+    arrives, so callers can validate and apply a route before the rest of the
+    response exists. Anything before the first ``{`` (e.g. a markdown fence)
+    is skipped, and only the text of the change being read is kept.
+    """
+
+    def __init__(self):
+        self.changes_seen = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key = ""
+        self._last_string = ""
+        self._in_changes = False
+        self._element: Optional[List[str]] = None
+        self._finished = False
+
+    def feed(self, text: str) -> List[Tuple[int, Any]]:
+        """Consumes the next chunk of the response.
+
+        Returns:
+            (position, change) for every change completed by this chunk; the
+            change is None if its object is not valid JSON
+        """
+        completed: List[Tuple[int, Any]] = []
+        for ch in text:
+            if self._finished:
+                break
+            if self._element is not None:
+                self._element.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                elif self._depth == 1:
+                    self._last_string += ch
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._last_string = ""
+            elif ch == ":" and self._depth == 1:
+                self._key = self._last_string
+            elif ch in "{[":
+                if self._depth == 1 and ch == "[" and self._key == "changes":
+                    self._in_changes = True
+                elif self._depth == 2 and ch == "{" and self._in_changes:
+                    self._element = [ch]
+                self._depth += 1
+            elif ch in "}]" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 2 and self._element is not None:
+                    completed.append((self.changes_seen, self._decode("".join(self._element))))
+                    self.changes_seen += 1
+                    self._element = None
+                elif self._depth == 1:
+                    self._in_changes = False
+                elif self._depth == 0:
+                    self._finished = True
+        return completed
+
+    @staticmethod
+    def _decode(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+
+class StreamingPipeline:
+    """Parses, generates and applies documentation as concurrent stages.
+
+    A parser thread feeds the route contexts of each changed file into a
+    bounded queue, the calling thread generates documentation for all files
+    parsed so far (up to ``group_routes`` routes) in one call, so batches
+    span files, and an applier thread collects the validated routes of each
+    file and writes the file once as soon as its last route is done. The
+    bounded queues keep memory flat on large diffs, and the first files are
+    written while later files are still being parsed and generated.
+    """
+
+    def __init__(
+        self,
+        parse_file: Callable[[str], List[Dict[str, Any]]],
+        get_handler: Callable[[], Any],
+        file_handler: FileHandler,
+        config: PipelineConfig,
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            parse_file: Returns the route contexts of one file
+            get_handler: Returns the LLM handler, called once routes are found
+                (waits for a background model load)
+            file_handler: FileHandler used to write the documentation
+            config: PipelineConfig with the queue sizes and group size
+        """
+        self.parse_file = parse_file
+        self.get_handler = get_handler
+        self.file_handler = file_handler
+        self.config = config
+        self.route_count = 0
+        self.applied: List[Change] = []
+        self.first_applied_seconds: Optional[float] = None
+
+    def run(self, file_paths: List[str]) -> List[Change]:
+        """Documents the routes in ``file_paths`` and returns the changes applied to disk."""
+        contexts: "queue.Queue[Any]" = queue.Queue(maxsize=self.config.queue_size)
+        changes: "queue.Queue[Any]" = queue.Queue(maxsize=self.config.queue_size)
+        start_time = time.time()
+
+        parser_thread = threading.Thread(target=self._parse_stage, args=(file_paths, contexts), daemon=True)
+        applier_thread = threading.Thread(target=self._apply_stage, args=(changes, start_time), daemon=True)
+        parser_thread.start()
+        applier_thread.start()
+
+        try:
+            self._generate_stage(contexts, changes)
+        finally:
+            changes.put(_DONE)
+            applier_thread.join()
+
+        print(f"\nStreaming pipeline: {len(self.applied)} changes applied for {self.route_count} routes "
+              f"in {time.time() - start_time:.2f}s")
+        if self.first_applied_seconds is not None:
+            print(f"First change applied after {self.first_applied_seconds:.2f}s")
+        return self.applied
+
+    def _parse_stage(self, file_paths: List[str], contexts: "queue.Queue[Any]") -> None:
+        try:
+            for path in file_paths:
+                docs = self.parse_file(path)
+                if docs:
+                    contexts.put(docs)
+        finally:
+            contexts.put(_DONE)
+
+    def _next_group(self, contexts: "queue.Queue[Any]") -> Tuple[List[List[Dict[str, Any]]], bool]:
+        """Takes the next files to generate together off the queue, only waiting for the first one.
+
+        Returns:
+            (route contexts per file, whether the parser is done)
+        """
+        files: List[List[Dict[str, Any]]] = []
+        routes = 0
+        while routes < self.config.group_routes:
+            try:
+                docs = contexts.get_nowait() if files else contexts.get()
+            except queue.Empty:
+                break
+            if docs is _DONE:
+                return files, True
+            files.append(docs)
+            routes += len(docs)
+        return files, False
+
+    def _generate_stage(self, contexts: "queue.Queue[Any]", changes: "queue.Queue[Any]") -> None:
+        handler = None
+        done = False
+        while not done:
+            files, done = self._next_group(contexts)
+            if not files:
+                continue
+            docs = [entry for file_docs in files for entry in file_docs]
+            filenames = [file_docs[0]['codeContext']['filename'] for file_docs in files]
+            self.route_count += len(docs)
+            print(f"\nGenerating documentation for {len(docs)} routes in {', '.join(filenames)}")
+            if handler is None:
+                handler = self.get_handler()
+
+            remaining = Counter(entry['codeContext']['filename'] for entry in docs)
+            try:
+                if hasattr(handler, "iter_documentation"):
+                    for index, change_data in handler.iter_documentation(docs):
+                        filename = docs[index]['codeContext']['filename']
+                        changes.put((docs[index], change_data))
+                        remaining[filename] -= 1
+                        if remaining[filename] == 0:
+                            # Write the file without waiting for the rest of the group
+                            changes.put((_FILE_DONE, filename))
+                else:
+                    # Handlers without streaming (the daemon client) return all changes at once
+                    for change in handler.generate_documentation(docs) or []:
+                        changes.put((None, change))
+            except Exception as e:
+                print(f"\nError generating documentation for {', '.join(filenames)}: {e}")
+            finally:
+                # Routes validated before a failure are still written
+                for filename in filenames:
+                    if remaining[filename] > 0:
+                        changes.put((_FILE_DONE, filename))
+
+    def _apply_stage(self, changes: "queue.Queue[Any]", start_time: float) -> None:
+        # File path -> changes waiting for the rest of the file
+        pending: Dict[str, List[Change]] = {}
+        while True:
+            item = changes.get()
+            if item is _DONE:
+                return
+            entry, change = item
+            if entry is not _FILE_DONE:
+                if entry is not None:
+                    # Streamed routes carry their context, changes of non-streaming handlers already have a line
+                    start_line, end_line = change_span(entry)
+                    change = Change(
+                        start_line=start_line,
+                        filepath=change['filepath'],
+                        code=change['code'],
+                        description=change['description'],
+                        end_line=end_line,
+                    )
+                pending.setdefault(change.filepath, []).append(change)
+                continue
+
+            batch = pending.pop(change, [])
+            if not batch:
+                continue
+            try:
+                applied = self.file_handler.apply_batch(batch)
+            except Exception as e:
+                # Keep draining so the generate stage never blocks on a full queue
+                print(f"✗ Error applying changes: {e}")
+                continue
+
+            for change in batch:
+                if change not in applied:
+                    print(f"✗ Failed to apply changes to {change.filepath}")
+            self.applied.extend(applied)
+            if applied and self.first_applied_seconds is None:
+                self.first_applied_seconds = time.time() - start_time
+            for change in applied:
+                print(f"✓ Applied {change.description} to {change.filepath}:{change.start_line}")
@@ -0,0 +1,196 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .jsdoc_renderer import render_jsdoc
+
+# Parser types that are guesses rather than something read from the code
+_UNCERTAIN_TYPES = {"any", "number | string"}
+
+
+@dataclass
+class RenderedRoute:
+    """A Swagger block rendered directly from a route context."""
+    path: str
+    method: str
+    code: str
+    description: str
+    confidence: float
+
+
+class TemplateRenderer:
+    """Renders route contexts from ApiDocParser straight into ``@swagger`` JSDoc blocks.
+
+    The parser already extracts the method, path, typed parameters, required
+    flags, defaults, status codes and response schemas, which covers most of
+    a Swagger block. Each rendered route gets a confidence score that drops
+    for every part the parser had to guess, so only routes that are well
+    understood skip the LLM.
+    """
+
+    def render(self, entry: Dict[str, Any]) -> Optional[RenderedRoute]:
+        """Renders a route context entry.
+
+        Returns:
+            RenderedRoute, or None if the context has no endpoint to document
+        """
+        details = self._route_details(entry)
+        endpoint = details.get("endpoint") if details else None
+        if not endpoint or not endpoint.get("methods"):
+            return None
+
+        penalties: List[float] = []
+        method = endpoint["methods"][0].lower()
+        path = re.sub(r":(\w+)", r"{\1}", endpoint["path"])
+        resource = endpoint.get("resourceType") or "Unknown"
+        if resource == "Unknown":
+            penalties.append(0.3)
+
+        operation: Dict[str, Any] = {
+            "summary": self._summary(entry, method, resource),
+            "tags": [self._pluralize(resource)] if resource != "Unknown" else [],
+        }
+
+        parameters = details.get("parameters", {})
+        operation_parameters = []
+        for location in ("path", "query"):
+            for name, info in parameters.get(location, {}).items():
+                operation_parameters.append(self._parameter(name, location, info, penalties))
+        if operation_parameters:
+            operation["parameters"] = operation_parameters
+
+        body = parameters.get("body", {})
+        if body:
+            operation["requestBody"] = self._request_body(body, penalties)
+
+        operation["responses"] = self._responses(details.get("responses", {}), penalties)
+        if not operation["tags"]:
+            del operation["tags"]
+
+        confidence = max(0.0, 1.0 - sum(penalties))
+        return RenderedRoute(
+            path=path,
+            method=method,
+            code=render_jsdoc(path, method, operation),
+            description=f"Documentation for {method.upper()} {endpoint['path']} endpoint",
+            confidence=confidence,
+        )
+
+    @staticmethod
+    def _route_details(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns the single apiDetails entry of a route context."""
+        for details in entry.get("apiDetails", {}).values():
+            return details
+        return {}
+
+    @staticmethod
+    def _pluralize(resource: str) -> str:
+        return resource if resource.endswith("s") else f"{resource}s"
+
+    @staticmethod
+    def _summary(entry: Dict[str, Any], method: str, resource: str) -> str:
+        """Builds a summary from the parser's inferred purpose."""
+        purpose = entry.get("codeContext", {}).get("general_purpose", "")
+        summary = re.sub(r"^API endpoint to\s+", "", purpose).rstrip(".").strip()
+        if not summary:
+            summary = f"{method.upper()} {resource}"
+        return summary[0].upper() + summary[1:]
+
+    def _schema_type(self, param_type: str, penalties: List[float]) -> Dict[str, Any]:
+        """Maps a parser parameter type to an OpenAPI schema, penalizing guesses."""
+        if param_type == "any":
+            penalties.append(0.15)
+            return {"type": "string"}
+        if param_type == "number | string":
+            penalties.append(0.05)
+            return {"type": "string"}
+        return {"type": param_type}
+
+    def _parameter(self, name: str, location: str, info: Dict[str, Any], penalties: List[float]) -> Dict[str, Any]:
+        schema = self._schema_type(info.get("type", "any"), penalties)
+        if info.get("format"):
+            schema["format"] = info["format"]
+        if "default" in info:
+            schema["default"] = info["default"]
+        return {
+            "in": location,
+            "name": name,
+            "required": bool(info.get("required", location == "path")),
+            "description": info.get("description", ""),
+            "schema": schema,
+        }
+
+    def _request_body(self, body: Dict[str, Dict[str, Any]], penalties: List[float]) -> Dict[str, Any]:
+        properties = {}
+        required = []
+        for name, info in body.items():
+            prop = self._schema_type(info.get("type", "any"), penalties)
+            if info.get("format"):
+                prop["format"] = info["format"]
+            if "default" in info:
+                prop["default"] = info["default"]
+            if info.get("description"):
+                prop["description"] = info["description"]
+            properties[name] = prop
+            if info.get("required"):
+                required.append(name)
+
+        schema: Dict[str, Any] = {"type": "object"}
+        if required:
+            schema["required"] = required
+        schema["properties"] = properties
+        return {
+            "required": True,
+            "content": {"application/json": {"schema": schema}},
+        }
+
+    def _responses(self, responses: Dict[str, Any], penalties: List[float]) -> Dict[int, Any]:
+        result: Dict[int, Any] = {}
+
+        success = next(iter(responses.get("success", {}).values()), None)
+        if success is None:
+            penalties.append(0.3)
+        else:
+            result[int(success["statusCode"])] = self._response(
+                success.get("description") or "Successful operation.", success.get("schema"), penalties
+            )
+
+        for status, error in sorted(responses.get("error", {}).items()):
+            description = error.get("description", "")
+            if description.startswith("Error response with status"):
+                penalties.append(0.05)
+            result[int(status)] = {"description": description or f"Error {status}"}
+        return result
+
+    def _response(self, description: str, schema: Optional[Dict[str, Any]], penalties: List[float]) -> Dict[str, Any]:
+        response: Dict[str, Any] = {"description": description}
+        if not schema or schema.get("type") == "null":
+            return response
+
+        if schema.get("type") == "object" and not schema.get("properties"):
+            # Response is a variable, its shape is unknown
+            penalties.append(0.2)
+        converted = self._convert_schema(schema, penalties)
+        response["content"] = {"application/json": {"schema": converted}}
+        return response
+
+    def _convert_schema(self, schema: Dict[str, Any], penalties: List[float]) -> Dict[str, Any]:
+        """Converts a parser schema into a valid OpenAPI schema."""
+        schema_type = schema.get("type")
+        if schema_type in _UNCERTAIN_TYPES or schema_type is None:
+            penalties.append(0.1)
+            return {}
+        if schema_type == "null":
+            return {"nullable": True}
+
+        converted: Dict[str, Any] = {"type": schema_type}
+        if schema.get("format"):
+            converted["format"] = schema["format"]
+        if schema_type == "object" and schema.get("properties"):
+            converted["properties"] = {
+                name: self._convert_schema(prop, penalties)
+                for name, prop in schema["properties"].items()
+            }
+        if schema_type == "array":
+            converted["items"] = self._convert_schema(schema.get("items", {"type": "any"}), penalties)
+        return converted
@@ -0,0 +1,169 @@
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .models import GenerationResult
+
+# Output tokens per route assumed before any run was observed, by output format
+DEFAULT_TOKENS_PER_ROUTE = {"jsdoc": 450, "spec": 250}
+
+# Tokens for the {"changes": [...]} wrapper around the routes
+RESPONSE_OVERHEAD_TOKENS = 32
+
+
+class TokenBudget:
+    """Predicts the output length and deadline of a batch from past runs.
+
+    Every complete (not truncated) response adds one sample of output tokens
+    per route, decode throughput and prefill seconds per route. The token
+    budget of a batch is a high quantile of tokens per route times the number
+    of routes plus a safety margin, so large batches are not truncated and
+    small ones do not reserve the whole ``max_new_tokens``. The deadline is
+    the time that budget takes at a low quantile of the observed throughput,
+    capped by ``generation_timeout``. Requests that time out record the
+    throughput they would have needed, which lengthens later deadlines.
+    Samples are kept per backend, model, inference profile and output format
+    (see ``budget_key``) and persisted, so later runs start from what earlier
+    runs on the same setup measured.
+    """
+
+    VERSION = 2
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        output_format: str,
+        max_new_tokens: int,
+        max_timeout: float,
+        max_samples: int = 200,
+        margin: float = 1.25,
+        key: Optional[str] = None,
+    ):
+        """
+        Initialize the predictor, loading any samples persisted at ``path``.
+
+        Args:
+            path: Location of the JSON statistics file
+            output_format: Output format of the generated routes, for the default tokens per route
+            max_new_tokens: Upper bound of the token budget
+            max_timeout: Upper bound of the deadline in seconds
+            max_samples: Number of most recent samples kept per statistic
+            margin: Safety factor applied to the predicted tokens and seconds
+            key: Setup the samples are recorded for, defaults to ``output_format``
+        """
+        self.path = Path(path)
+        self.output_format = output_format
+        self.max_new_tokens = max_new_tokens
+        self.max_timeout = max_timeout
+        self.max_samples = max_samples
+        self.margin = margin
+        self.data = self._load()
+        self.samples: Dict[str, List[float]] = self.data.setdefault(key or output_format, {})
+        self.dirty = False
+
+    def _load(self) -> Dict[str, Any]:
+        """Loads the statistics from disk, discarding unreadable or outdated files."""
+        if not self.path.exists():
+            return {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") != self.VERSION:
+                return {}
+            return data.get("setups", {})
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable token statistics {self.path}: {e}")
+            return {}
+
+    def tokens_per_route(self) -> float:
+        """Returns the predicted output tokens of one route (95th percentile of the samples)."""
+        tokens_per_route = _quantile(self.samples.get("tokens_per_route", []), 0.95)
+        if tokens_per_route is None:
+            return DEFAULT_TOKENS_PER_ROUTE.get(self.output_format, 450)
+        return max(tokens_per_route, 1.0)
+
+    def max_routes(self, scale: float = 1.0) -> int:
+        """Returns how many routes one request can hold without exceeding ``max_new_tokens`` (at least 1)."""
+        available = self.max_new_tokens / (self.margin * scale) - RESPONSE_OVERHEAD_TOKENS
+        return max(1, math.floor(available / self.tokens_per_route()))
+
+    def plan(self, routes: int, scale: float = 1.0, timeout_scale: float = 1.0) -> Tuple[int, float]:
+        """Returns the (max_new_tokens, timeout seconds) for a batch.
+
+        Args:
+            routes: Number of routes in the batch
+            scale: Factor applied to the token budget, raised after truncated responses
+            timeout_scale: Factor applied to the deadline, raised after timed out requests
+        """
+        budget = math.ceil((self.tokens_per_route() * routes + RESPONSE_OVERHEAD_TOKENS) * self.margin * scale)
+        max_new_tokens = max(1, min(budget, self.max_new_tokens))
+
+        tokens_per_second = _quantile(self.samples.get("tokens_per_second", []), 0.05)
+        prefill_per_route = _quantile(self.samples.get("prefill_seconds_per_route", []), 0.95) or 0.0
+        if not tokens_per_second:
+            return max_new_tokens, self.max_timeout
+        seconds = (prefill_per_route * routes + max_new_tokens / tokens_per_second) * self.margin * timeout_scale
+        return max_new_tokens, min(seconds, self.max_timeout)
+
+    def observe(self, routes: int, result: GenerationResult) -> None:
+        """Records the cost of a complete response for ``routes`` routes.
+
+        Truncated responses only bound the real length from below, so they are not recorded.
+        """
+        if routes <= 0 or result.truncated or result.output_tokens <= 0:
+            return
+        self._add("tokens_per_route", max(0, result.output_tokens - RESPONSE_OVERHEAD_TOKENS) / routes)
+        if result.decode_seconds > 0:
+            self._add("tokens_per_second", result.output_tokens / result.decode_seconds)
+        if result.prefill_seconds > 0:
+            self._add("prefill_seconds_per_route", result.prefill_seconds / routes)
+
+    def observe_timeout(self, routes: int, seconds: float) -> None:
+        """Records a request for ``routes`` routes that did not finish within ``seconds``.
+
+        Finishing the predicted output in ``seconds`` would have needed this
+        throughput, so the real one was lower; recording it as a throughput
+        sample gives later requests more time.
+        """
+        if routes <= 0 or seconds <= 0:
+            return
+        expected_tokens = self.tokens_per_route() * routes + RESPONSE_OVERHEAD_TOKENS
+        self._add("tokens_per_second", expected_tokens / seconds)
+
+    def _add(self, name: str, value: float) -> None:
+        values = self.samples.setdefault(name, [])
+        values.append(round(value, 4))
+        del values[:-self.max_samples]
+        self.dirty = True
+
+    def save(self) -> None:
+        """Writes the statistics to disk if new samples were recorded."""
+        if not self.dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            tmp_path.write_text(json.dumps({"version": self.VERSION, "setups": self.data}), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Warning: Could not save token statistics to {self.path}: {e}")
+
+
+def budget_key(backend: str, model: str, inference_profile: str, output_format: str) -> str:
+    """Returns the key the samples of a generation setup are stored under.
+
+    Throughput differs by orders of magnitude between e.g. an inference
+    server and a CPU-only local model, so samples are never shared between
+    setups.
+    """
+    return f"{backend}:{model}:{inference_profile}:{output_format}"
+
+
+def _quantile(values: List[float], q: float) -> Optional[float]:
+    """Returns the ``q`` quantile of ``values`` (nearest rank), or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
@@ -0,0 +1,27 @@
+from typing import Union
+from pathlib import Path
+
+from transformers import AutoTokenizer
+
+STOP_TOKEN = "<|endofjsdoc|>"
+
+
+def load_tokenizer(name_or_path: Union[str, Path], local_files_only: bool = False):
+    """Loads the tokenizer and registers the stop token and left padding used for generation.
+
+    Args:
+        name_or_path: Hugging Face model name or local bundle directory
+        local_files_only: Never contact the hub (used for offline bundles)
+    """
+    tokenizer = AutoTokenizer.from_pretrained(
+        str(name_or_path),
+        trust_remote_code=True,
+        local_files_only=local_files_only,
+    )
+
+    # Add special tokens
+    special_tokens_dict = {'additional_special_tokens': [STOP_TOKEN]}
+    tokenizer.add_special_tokens(special_tokens_dict)
+    tokenizer.pad_token = "[PAD]"
+    tokenizer.padding_side = "left"
+    return tokenizer
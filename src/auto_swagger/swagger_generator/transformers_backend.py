@@ -0,0 +1,663 @@
+import math
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+import torch
+from transformers import (
+    AutoModelForCausalLM,
+    LogitsProcessorList,
+    QuantizedCacheConfig,
+    StaticCache,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
+)
+from transformers.utils import is_optimum_quanto_available
+from peft import PeftModel
+
+from .backend import GenerationBackend
+from .constrained_decoding import ChangesGrammar, ChangesSchemaLogitsProcessor, build_token_texts
+from .generator_config import DEFAULT_ADAPTER, LLMConfig
+from .model_bundle import bundle_dtype, find_bundle
+from .models import GenerationResult
+from .tokenization import load_tokenizer
+
+INFERENCE_PROFILES = ("default", "cpu-int8")
+KV_CACHES = ("dynamic", "quantized", "offloaded")
+
+
+
+class _CancelGeneration(StoppingCriteria):
+    """Stops ``generate`` once the event is set, e.g. when a streamed response is abandoned."""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
+class _PrefillTimer(StoppingCriteria):
+    """Records when the first new token is produced, which is when prefill ended."""
+
+    def __init__(self):
+        self.first_token_time: Optional[float] = None
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        if self.first_token_time is None:
+            self.first_token_time = time.time()
+        return torch.zeros((input_ids.shape[0],), dtype=torch.bool, device=input_ids.device)
+
+
+class _CountingTextStreamer(TextIteratorStreamer):
+    """TextIteratorStreamer that also counts the generated tokens."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output_tokens = 0
+
+    def put(self, value):
+        if not (self.skip_prompt and self.next_tokens_are_prompt):
+            self.output_tokens += value.shape[-1]
+        super().put(value)
+
+
+def _split_timing(start: float, first_token: Optional[float], end: float) -> Tuple[float, float]:
+    """Splits a generation's duration into (prefill, decode) seconds."""
+    if first_token is None:
+        return end - start, 0.0
+    return first_token - start, end - first_token
+
+
+class TransformersBackend(GenerationBackend):
+    """Runs generation in-process on a ``transformers`` model with the LoRA adapter applied.
+
+    Adapters listed in ``lora_adapters`` are loaded next to ``lora_adapter_id``
+    on the same base model, so every extra adapter only adds its low-rank
+    weights. Each request selects its adapter for the duration of its
+    ``generate`` call.
+    """
+
+    def __init__(self, config: LLMConfig):
+        """
+        Load the tokenizer and model.
+
+        Args:
+            config: LLMConfig naming the model, adapter or bundle and the inference settings
+        """
+        self.config = config
+        self.device = torch.device("mps" if torch.backends.mps.is_available() else 
+                            ("cuda" if torch.cuda.is_available() else "cpu"))
+
+        if config.inference_profile not in INFERENCE_PROFILES:
+            raise ValueError(
+                f"Unknown inference profile '{config.inference_profile}', "
+                f"expected one of {', '.join(INFERENCE_PROFILES)}"
+            )
+        if config.kv_cache not in KV_CACHES:
+            raise ValueError(f"Unknown KV cache '{config.kv_cache}', expected one of {', '.join(KV_CACHES)}")
+        if config.kv_cache != "dynamic" and config.compiled_generation:
+            raise ValueError("Compiled generation uses its own static KV cache, set kv_cache to 'dynamic'")
+        if config.kv_cache == "quantized" and not is_optimum_quanto_available():
+            raise ImportError("The quantized KV cache needs optimum-quanto: pip install 'auto-swagger[kv-quant]'")
+        if config.kv_cache == "offloaded" and self.device.type != "cuda":
+            raise ValueError("The offloaded KV cache keeps GPU layers in CPU memory and needs CUDA")
+        if DEFAULT_ADAPTER in config.lora_adapters:
+            raise ValueError(f"'{DEFAULT_ADAPTER}' names lora_adapter_id and cannot be used in lora_adapters")
+        if config.lora_adapters and (config.inference_profile != "default" or config.compiled_generation):
+            # Both merge the adapter into the base weights, which leaves no base model to switch adapters on
+            raise ValueError("Serving several LoRA adapters needs the default inference profile without --compile")
+        if config.num_workers > 1 and config.compiled_generation:
+            # The warmup generates in the parent, and compiled graphs are not safe to fork
+            raise ValueError("Forked workers cannot share a compiled model, use either --workers or --compile")
+        self._configure_threads()
+        self._token_texts: Optional[List[str]] = None
+        self.static_cache: Optional[StaticCache] = None
+        self._static_cache_lock = threading.Lock()
+
+        start_time = time.time()
+        bundle_path = find_bundle(config)
+        if bundle_path is not None and config.lora_adapters:
+            print(f"Not using the merged model bundle {bundle_path}, several LoRA adapters need the base model")
+            bundle_path = None
+        if bundle_path is not None:
+            self.tokenizer, self.model = self._load_bundle(bundle_path)
+        else:
+            self.tokenizer, self.model = self._load_from_hub()
+
+        # Inference only: disable dropout and never keep activations for backward
+        self.model.eval()
+        if config.inference_profile == "cpu-int8":
+            self.model = self._quantize_for_cpu(self.model)
+        print(f"Model loaded in {time.time() - start_time:.2f} seconds")
+
+        if config.compiled_generation:
+            self.compile()
+
+    def _configure_threads(self) -> None:
+        """Applies the configured torch intra-op and inter-op thread counts.
+
+        With forked workers the parent only loads and quantizes the model, on
+        a single thread, so torch's thread pool is never started before the
+        fork. Each worker sets its own thread count.
+        """
+        if self.config.num_workers > 1:
+            torch.set_num_threads(1)
+        elif self.config.num_threads:
+            torch.set_num_threads(self.config.num_threads)
+        if self.config.num_interop_threads:
+            try:
+                torch.set_num_interop_threads(self.config.num_interop_threads)
+            except RuntimeError as e:
+                # Can only be set once per process, before any inter-op work starts
+                print(f"Warning: Could not set inter-op threads: {e}")
+        print(f"Using {torch.get_num_threads()} intra-op and {torch.get_num_interop_threads()} inter-op threads")
+
+    def _quantize_for_cpu(self, model):
+        """Applies dynamic int8 quantization to the linear layers for CPU inference.
+
+        The LoRA adapter is merged first so the quantized linear layers include
+        its weights instead of running the adapter in float32 alongside them.
+        """
+        if self.device.type != "cpu":
+            print(f"Warning: cpu-int8 profile ignored on {self.device.type}, using the default profile")
+            return model
+        if isinstance(model, PeftModel):
+            model = model.merge_and_unload()
+        print("Applying dynamic int8 quantization to linear layers...")
+        return torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+    def compile(self, warmup: bool = True) -> None:
+        """Switches generation to the compiled path.
+
+        The forward pass is compiled with ``torch.compile`` and runs against
+        one preallocated static KV cache of ``compile_max_cache_len`` tokens,
+        so every decode step has the same shapes. Prompts are left-padded to a
+        multiple of ``compile_prompt_bucket`` tokens, which limits prefill
+        recompiles to one per bucket. Prompt-lookup decoding verifies drafts
+        of varying length and is not used on this path.
+
+        Args:
+            warmup: Compile the shortest prompt buckets and the decode step right away
+        """
+        if self.config.lora_adapters:
+            raise ValueError("Compiled generation merges the adapter and cannot serve several LoRA adapters")
+        if isinstance(self.model, PeftModel):
+            # Compile the merged linear layers instead of tracing the adapter alongside them
+            self.model = self.model.merge_and_unload()
+        # One graph per prompt bucket for prefill plus one for decoding
+        torch._dynamo.config.cache_size_limit = max(torch._dynamo.config.cache_size_limit, 64)
+
+        self.static_cache = StaticCache(
+            config=self.model.config,
+            max_batch_size=1,
+            max_cache_len=self.config.compile_max_cache_len,
+            device=self.device,
+            dtype=self.model.dtype,
+        )
+        self.model.forward = torch.compile(self.model.forward, dynamic=False)
+        print(f"Compiled generation enabled (static cache of {self.config.compile_max_cache_len} tokens, "
+              f"prompt buckets of {self.config.compile_prompt_bucket} tokens)")
+        if warmup:
+            self.warmup()
+
+    def warmup(self) -> float:
+        """Runs a short generation for each of the ``compile_warmup_buckets`` shortest prompt buckets.
+
+        Compilation happens on the first call with new shapes, so this moves it
+        out of the first real requests.
+
+        Returns:
+            Seconds spent warming up
+        """
+        start_time = time.time()
+        filler_id = self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None else self.tokenizer.eos_token_id
+        for bucket in range(1, self.config.compile_warmup_buckets + 1):
+            length = bucket * self.config.compile_prompt_bucket
+            if length >= self.config.compile_max_cache_len:
+                break
+            bucket_start = time.time()
+            inputs = torch.full((1, length), filler_id, dtype=torch.long, device=self._get_device())
+            with self._static_cache_session(), torch.inference_mode():
+                self.model.generate(
+                    inputs,
+                    attention_mask=torch.ones_like(inputs),
+                    max_new_tokens=4,
+                    do_sample=False,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    min_new_tokens=4,
+                    past_key_values=self.static_cache,
+                    disable_compile=True,
+                )
+            print(f"Warmed up {length}-token prompt bucket in {time.time() - bucket_start:.2f} seconds")
+        seconds = time.time() - start_time
+        print(f"Warmup completed in {seconds:.2f} seconds")
+        return seconds
+
+    @contextmanager
+    def _static_cache_session(self):
+        """Gives one generation exclusive use of the static cache, emptied before it starts."""
+        with self._static_cache_lock:
+            self.static_cache.reset()
+            yield
+
+    def _generation_session(self, generation_kwargs: Dict[str, Any]):
+        """Returns the context a ``generate`` call with ``generation_kwargs`` must run in."""
+        if "past_key_values" in generation_kwargs:
+            return self._static_cache_session()
+        return nullcontext()
+
+    def _load_from_hub(self):
+        """Loads the base model from the hub by name and applies the LoRA adapter."""
+        tokenizer = load_tokenizer(self.config.model_name)
+        dtype = self._model_dtype()
+
+        # Load the base causal LM with memory optimizations
+        base_model = AutoModelForCausalLM.from_pretrained(
+            self.config.model_name,
+            trust_remote_code=True,
+            torch_dtype=dtype,
+            device_map="auto",         # Let the system decide on device mapping
+            low_cpu_mem_usage=True     # Optimize for low CPU memory
+        )
+        
+        # Resize embeddings to handle new tokens
+        base_model.resize_token_embeddings(len(tokenizer))
+        base_model.config.pad_token_id = tokenizer.pad_token_id
+        
+        # Apply the LoRA adapter with proper device mapping
+        model = PeftModel.from_pretrained(
+            base_model,
+            self.config.lora_adapter_id,
+            torch_dtype=dtype,
+            device_map="auto",  # Let the system decide device mapping
+        )
+        for name, adapter_id in self.config.lora_adapters.items():
+            print(f"Loading LoRA adapter '{name}' from {adapter_id}")
+            model.load_adapter(adapter_id, adapter_name=name)
+        return tokenizer, model
+
+    def _load_bundle(self, bundle_path: Path):
+        """Loads a merged model bundle created by ``bundle-model`` without touching the network.
+
+        The merged safetensors are memory-mapped, and no PEFT wrapper or
+        embedding resize is needed. The weights are loaded in the same dtype
+        as the hub path, whatever dtype the bundle stores, so both paths
+        generate alike on the same device.
+        """
+        print(f"Loading merged model bundle from {bundle_path}")
+        dtype = self._model_dtype()
+        stored = bundle_dtype(bundle_path)
+        if stored is not None and stored != dtype:
+            print(f"Casting the {stored} bundle to {dtype} for {self.device.type}")
+        tokenizer = load_tokenizer(bundle_path, local_files_only=True)
+        model = AutoModelForCausalLM.from_pretrained(
+            str(bundle_path),
+            local_files_only=True,
+            torch_dtype=dtype,
+            device_map="auto",
+            low_cpu_mem_usage=True,
+        )
+        model.config.pad_token_id = tokenizer.pad_token_id
+        return tokenizer, model
+    
+    def _get_device(self) -> torch.device:
+        """Returns the device for model execution."""
+        return self.device
+
+    def _model_dtype(self) -> torch.dtype:
+        """Returns the weight dtype for this device: float16 on CUDA and MPS, float32 on CPU."""
+        return torch.float16 if self.device.type in ["cuda", "mps"] else torch.float32
+
+    def _prepare_generation(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        context: Optional[List[Dict[str, Any]]] = None,
+        adapter: Optional[str] = None,
+    ) -> Tuple[torch.Tensor, torch.Tensor, Dict[str, Any]]:
+        """Tokenizes the chat prompt and builds the decoding arguments for ``generate``.
+
+        Returns:
+            (input ids, attention mask, extra generate kwargs)
+        """
+        messages = [
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': user_prompt}
+        ]
+
+        # Apply chat template with proper attention mask
+        inputs = self.tokenizer.apply_chat_template(
+            messages,
+            add_generation_prompt=True,
+            return_tensors="pt"
+        ).to(self._get_device())
+
+        # Create proper attention mask
+        attention_mask = torch.ones_like(inputs).to(self._get_device())
+
+        generation_kwargs = self._decoding_kwargs()
+        generation_kwargs.update(self._adapter_kwargs(adapter))
+        if self.static_cache is not None:
+            padded_length = math.ceil(inputs.shape[1] / self.config.compile_prompt_bucket) * self.config.compile_prompt_bucket
+            if padded_length < self.config.compile_max_cache_len:
+                inputs, attention_mask = self._left_pad(inputs, attention_mask, padded_length)
+                generation_kwargs["past_key_values"] = self.static_cache
+                # The forward pass is already compiled
+                generation_kwargs["disable_compile"] = True
+            else:
+                print(f"Warning: {inputs.shape[1]}-token prompt does not fit the static cache, generating eagerly")
+        if context is not None and self.config.constrained_decoding:
+            generation_kwargs["logits_processor"] = LogitsProcessorList([
+                self._schema_processor(context, inputs.shape[1])
+            ])
+        return inputs, attention_mask, generation_kwargs
+
+    def _left_pad(
+        self, inputs: torch.Tensor, attention_mask: torch.Tensor, length: int
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Left-pads a prompt to ``length`` tokens, masking out the padding."""
+        padding = length - inputs.shape[1]
+        if padding <= 0:
+            return inputs, attention_mask
+        pad_id = self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None else self.tokenizer.eos_token_id
+        pad = torch.full((inputs.shape[0], padding), pad_id, dtype=inputs.dtype, device=inputs.device)
+        return torch.cat([pad, inputs], dim=1), torch.cat([torch.zeros_like(pad), attention_mask], dim=1)
+
+    def _limit_new_tokens(self, inputs: torch.Tensor, generation_kwargs: Dict[str, Any], max_new_tokens: Optional[int]) -> int:
+        """Resolves the output token limit, keeping prompt and output within the static cache."""
+        max_new_tokens = max_new_tokens or self.config.max_new_tokens
+        if "past_key_values" in generation_kwargs:
+            max_new_tokens = min(max_new_tokens, self.config.compile_max_cache_len - inputs.shape[1])
+        return max_new_tokens
+
+    def _kv_cache_mb(self, tokens: int) -> float:
+        """Returns the size in MB of a full-precision KV cache holding ``tokens`` tokens."""
+        config = self.model.config
+        num_heads = config.num_attention_heads
+        head_dim = getattr(config, "head_dim", None) or config.hidden_size // num_heads
+        num_kv_heads = getattr(config, "num_key_value_heads", None) or num_heads
+        bytes_per_token = 2 * config.num_hidden_layers * num_kv_heads * head_dim * self.model.dtype.itemsize
+        return tokens * bytes_per_token / 2**20
+
+    def _configure_kv_cache(self, tokens: int, generation_kwargs: Dict[str, Any]) -> None:
+        """Selects the configured quantized or offloaded KV cache for a request of up to ``tokens`` tokens.
+
+        The quantized cache keeps all but the latest ``residual_length`` tokens
+        as ``kv_cache_bits``-bit integers, the offloaded cache keeps every layer
+        but the one being computed in CPU memory. Both are slower per token, so
+        with ``kv_cache_memory_limit_mb`` set only requests whose full-precision
+        cache would exceed the limit use them. Prompt-lookup decoding rolls the
+        cache back after rejected drafts, which only the default cache supports.
+        """
+        if self.config.kv_cache == "dynamic" or "past_key_values" in generation_kwargs:
+            return
+        cache_mb = self._kv_cache_mb(tokens)
+        limit_mb = self.config.kv_cache_memory_limit_mb
+        if limit_mb is not None and cache_mb <= limit_mb:
+            return
+
+        generation_kwargs.pop("prompt_lookup_num_tokens", None)
+        generation_kwargs.pop("max_matching_ngram_size", None)
+        generation_kwargs["cache_implementation"] = self.config.kv_cache
+        if self.config.kv_cache == "quantized":
+            generation_kwargs["cache_config"] = QuantizedCacheConfig(
+                backend="quanto",
+                nbits=self.config.kv_cache_bits,
+                compute_dtype=self.model.dtype,
+                device=self.device.type,
+            )
+        print(f"Using {self.config.kv_cache} KV cache ({cache_mb:.0f} MB in full precision for {tokens} tokens)")
+
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        context: Optional[List[Dict[str, Any]]] = None,
+        max_new_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        adapter: Optional[str] = None,
+    ) -> GenerationResult:
+        """Generates a response from the model with timeout support.
+
+        When ``context`` is given and constrained decoding is enabled, output is
+        restricted to the changes JSON schema for exactly those routes.
+
+        Raises:
+            TimeoutError: If generation does not finish within the timeout
+            Exception: Whatever ``generate`` raised
+        """
+        inputs, attention_mask, generation_kwargs = self._prepare_generation(system_prompt, user_prompt, context, adapter)
+        max_new_tokens = self._limit_new_tokens(inputs, generation_kwargs, max_new_tokens)
+        self._configure_kv_cache(inputs.shape[1] + max_new_tokens, generation_kwargs)
+        timeout_seconds = timeout or self.config.generation_timeout
+
+        # Create a result container and done flag for the thread
+        result_container = {"outputs": None, "error": None}
+        done_flag = threading.Event()
+        cancel = threading.Event()
+        prefill_timer = _PrefillTimer()
+        
+        def generate_with_timeout():
+            try:
+                print(f"Generating with max_new_tokens={max_new_tokens}, timeout {timeout_seconds:.0f}s")
+                
+                # Start a progress indicator
+                start_time = time.time()
+                
+                # Deterministic generation (no sampling)
+                with self._generation_session(generation_kwargs), torch.inference_mode():
+                    result_container["outputs"] = self.model.generate(
+                        inputs,
+                        attention_mask=attention_mask,
+                        max_new_tokens=max_new_tokens,
+                        do_sample=False,  # Deterministic generation
+                        num_return_sequences=1,
+                        pad_token_id=self.tokenizer.pad_token_id,
+                        eos_token_id=self.tokenizer.eos_token_id,
+                        use_cache=True,
+                        stopping_criteria=StoppingCriteriaList([_CancelGeneration(cancel), prefill_timer]),
+                        **generation_kwargs,
+                    )
+                
+                print(f"Generation completed in {time.time() - start_time:.2f} seconds")
+                
+            except Exception as e:
+                result_container["error"] = e
+                print(f"Generation failed with error: {e}")
+            finally:
+                done_flag.set()
+        
+        # Start generation in a separate thread
+        print("Starting generation in background thread...")
+        generation_thread = threading.Thread(target=generate_with_timeout)
+        generation_thread.daemon = True
+        generation_thread.start()
+        
+        # Monitor progress and check for timeout
+        start_time = time.time()
+        progress_interval = 10  # seconds
+        next_progress = start_time + progress_interval
+        
+        while not done_flag.is_set():
+            done_flag.wait(1)
+            current_time = time.time()
+            
+            # Print progress updates
+            if current_time >= next_progress:
+                elapsed = current_time - start_time
+                print(f"Still generating... ({elapsed:.0f} seconds elapsed)")
+                next_progress = current_time + progress_interval
+            
+            # Check for timeout
+            if current_time - start_time > timeout_seconds:
+                print(f"Generation timed out after {timeout_seconds:.0f} seconds")
+                # Stop the generation thread at its next token, the timeout is raised below
+                cancel.set()
+                break
+        
+        # Check results
+        if not done_flag.is_set():
+            raise TimeoutError(f"Generation timed out after {timeout_seconds:.0f} seconds")
+        if result_container["error"] is not None:
+            raise result_container["error"]
+
+        outputs = result_container["outputs"]
+        generated_text = self.tokenizer.decode(
+            outputs[0][len(inputs[0]):],
+            skip_special_tokens=True
+        )
+        end_time = time.time()
+        prefill, decode = _split_timing(start_time, prefill_timer.first_token_time, end_time)
+        output_tokens = len(outputs[0]) - len(inputs[0])
+        return GenerationResult(
+            text=generated_text,
+            input_tokens=int(attention_mask.sum()),
+            output_tokens=output_tokens,
+            seconds=end_time - start_time,
+            prefill_seconds=prefill,
+            decode_seconds=decode,
+            truncated=output_tokens >= max_new_tokens,
+        )
+
+    def stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        context: Optional[List[Dict[str, Any]]] = None,
+        max_new_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        adapter: Optional[str] = None,
+    ) -> Generator[str, None, GenerationResult]:
+        """Generates a response like generate, yielding decoded text as it is produced.
+
+        Generation runs on a background thread and is cancelled when the
+        consumer stops iterating or the timeout passes.
+
+        Returns:
+            The GenerationResult of the whole response, as the generator's return value
+
+        Raises:
+            TimeoutError: If the response is not finished within the timeout
+            Exception: Whatever ``generate`` raised
+        """
+        inputs, attention_mask, generation_kwargs = self._prepare_generation(system_prompt, user_prompt, context, adapter)
+        max_new_tokens = self._limit_new_tokens(inputs, generation_kwargs, max_new_tokens)
+        self._configure_kv_cache(inputs.shape[1] + max_new_tokens, generation_kwargs)
+        timeout_seconds = timeout or self.config.generation_timeout
+        streamer = _CountingTextStreamer(
+            self.tokenizer,
+            skip_prompt=True,
+            skip_special_tokens=True,
+            timeout=timeout_seconds,
+        )
+        cancel = threading.Event()
+        prefill_timer = _PrefillTimer()
+        errors: List[Exception] = []
+
+        def generate():
+            try:
+                with self._generation_session(generation_kwargs), torch.inference_mode():
+                    self.model.generate(
+                        inputs,
+                        attention_mask=attention_mask,
+                        max_new_tokens=max_new_tokens,
+                        do_sample=False,
+                        num_return_sequences=1,
+                        pad_token_id=self.tokenizer.pad_token_id,
+                        eos_token_id=self.tokenizer.eos_token_id,
+                        use_cache=True,
+                        streamer=streamer,
+                        stopping_criteria=StoppingCriteriaList([_CancelGeneration(cancel), prefill_timer]),
+                        **generation_kwargs,
+                    )
+            except Exception as e:
+                errors.append(e)
+                # Unblock the consumer, generate() only ends the stream on success
+                streamer.end()
+
+        start_time = time.time()
+        threading.Thread(target=generate, daemon=True).start()
+        chunks: List[str] = []
+        try:
+            for text in streamer:
+                chunks.append(text)
+                yield text
+                if time.time() - start_time > timeout_seconds:
+                    raise TimeoutError(f"Generation timed out after {timeout_seconds:.0f} seconds")
+        finally:
+            cancel.set()
+
+        if errors:
+            raise errors[0]
+        end_time = time.time()
+        print(f"Generation completed in {end_time - start_time:.2f} seconds")
+        prefill, decode = _split_timing(start_time, prefill_timer.first_token_time, end_time)
+        return GenerationResult(
+            text="".join(chunks),
+            input_tokens=int(attention_mask.sum()),
+            output_tokens=streamer.output_tokens,
+            seconds=end_time - start_time,
+            prefill_seconds=prefill,
+            decode_seconds=decode,
+            truncated=streamer.output_tokens >= max_new_tokens,
+        )
+
+    def _adapter_kwargs(self, adapter: Optional[str]) -> Dict[str, Any]:
+        """Returns the ``generate`` arguments that select the named LoRA adapter for one request.
+
+        ``lora_adapter_id`` stays the active adapter. Any other adapter is
+        passed to PEFT as ``adapter_names``, which applies it only inside that
+        ``generate`` call instead of switching the shared model.
+
+        Raises:
+            ValueError: If no adapter of that name is loaded
+        """
+        adapter = adapter or self.config.adapter
+        if adapter == DEFAULT_ADAPTER:
+            return {}
+        if adapter not in self.config.lora_adapters:
+            loaded = ", ".join([DEFAULT_ADAPTER, *self.config.lora_adapters])
+            raise ValueError(f"Unknown LoRA adapter '{adapter}', expected one of {loaded}")
+        return {"adapter_names": [adapter]}
+
+    def _decoding_kwargs(self) -> Dict[str, Any]:
+        """Returns extra ``generate`` arguments for the configured decoding strategy.
+
+        Prompt-lookup decoding drafts the next tokens by matching the latest
+        n-gram against the prompt and verifies the whole draft in one forward
+        pass. Most of the output copies paths, parameter names and status codes
+        from the API context, so many drafted tokens are accepted, and greedy
+        output is identical to plain decoding.
+        """
+        if not self.config.prompt_lookup_num_tokens or self.static_cache is not None:
+            return {}
+        return {
+            "prompt_lookup_num_tokens": self.config.prompt_lookup_num_tokens,
+            "max_matching_ngram_size": self.config.prompt_lookup_max_ngram,
+        }
+
+    def token_texts(self) -> List[str]:
+        """Returns the decoded text of every token id, building it on first use."""
+        if self._token_texts is None:
+            self._token_texts = build_token_texts(self.tokenizer)
+        return self._token_texts
+
+    def _schema_processor(self, context: List[Dict[str, Any]], prompt_length: int) -> ChangesSchemaLogitsProcessor:
+        """Builds a logits processor that constrains output to the changes schema for ``context``."""
+        grammar = ChangesGrammar(
+            [entry['codeContext']['filename'] for entry in context],
+            self.config.output_format,
+        )
+        return ChangesSchemaLogitsProcessor(
+            grammar,
+            self.token_texts(),
+            prompt_length,
+            self.tokenizer.eos_token_id,
+            special_token_ids=self.tokenizer.all_special_ids,
+        )
@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import torch
+
+from .backend import GenerationBackend
+from .models import GenerationResult
+
+# Backend inherited by forked workers; set in the parent right before forking
+_WORKER_BACKEND: Optional[GenerationBackend] = None
+
+# Seconds past the generation deadline to wait for a worker's result before giving up on it
+RESULT_GRACE_SECONDS = 30.0
+
+
+def _init_worker(num_threads: int) -> None:
+    """Gives each worker its own share of the cores."""
+    torch.set_num_threads(num_threads)
+
+
+def _generate_in_worker(
+    system_prompt: str,
+    user_prompt: str,
+    context: Optional[List[Dict[str, Any]]],
+    max_new_tokens: Optional[int],
+    timeout: Optional[float],
+    adapter: Optional[str],
+) -> GenerationResult:
+    return _WORKER_BACKEND.generate(system_prompt, user_prompt, context, max_new_tokens, timeout, adapter)
+
+
+class ForkedWorkerBackend(GenerationBackend):
+    """Data-parallel CPU generation on forked workers sharing one loaded model.
+
+    The model is loaded once in the parent, then ``num_workers`` processes are
+    forked from it. Forked workers see the parent's weights copy-on-write, and
+    inference never writes to them, so the weights are shared rather than
+    copied per worker. Each worker runs ``generate`` with its own torch thread
+    count, and LLMHandler sends up to ``num_workers`` sub-batches at once, so
+    decoding keeps all cores busy instead of one ``generate`` call's threads.
+
+    Forked children inherit torch's thread pool in whatever state the parent
+    left it, and OpenMP pools are not usable after a fork. The parent
+    therefore never generates: it loads and quantizes the model on a single
+    thread (see ``TransformersBackend._configure_threads``), and compiled
+    generation, whose warmup generates in the parent, is refused with
+    workers. The pool must be forked from the main thread, before other
+    threads that could hold locks the children inherit are started, so
+    main.py loads the model synchronously instead of on a BackgroundLoader
+    thread when workers are configured. A worker that dies mid-request is
+    replaced by the pool, but its request never returns, so results are
+    only awaited until shortly after the request's deadline.
+    """
+
+    def __init__(self, backend: GenerationBackend, num_workers: int, threads_per_worker: Optional[int] = None):
+        """
+        Fork the worker pool.
+
+        Args:
+            backend: Loaded in-process backend the workers inherit
+            num_workers: Number of worker processes
+            threads_per_worker: torch threads per worker, defaults to the cores divided evenly
+
+        Raises:
+            RuntimeError: If fork is unavailable or this is not the main thread
+        """
+        global _WORKER_BACKEND
+
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("The worker pool needs the fork start method, which this platform does not support")
+        if threading.current_thread() is not threading.main_thread():
+            raise RuntimeError("The worker pool must be forked from the main thread")
+
+        self.backend = backend
+        self.max_concurrency = num_workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+
+        # Build shared lookup tables once so workers inherit them instead of each rebuilding them
+        if hasattr(backend, "token_texts") and backend.config.constrained_decoding:
+            backend.token_texts()
+
+        _WORKER_BACKEND = backend
+        self.pool = multiprocessing.get_context("fork").Pool(
+            processes=num_workers,
+            initializer=_init_worker,
+            initargs=(self.threads_per_worker,),
+        )
+        print(f"Forked {num_workers} generation workers with {self.threads_per_worker} threads each")
+
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        context: Optional[List[Dict[str, Any]]] = None,
+        max_new_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        adapter: Optional[str] = None,
+    ) -> GenerationResult:
+        """Runs the request on the next free worker; safe to call from several threads.
+
+        Raises:
+            TimeoutError: If no result arrives within ``RESULT_GRACE_SECONDS`` of the
+                deadline, e.g. because the worker was killed
+        """
+        deadline = timeout or self.backend.config.generation_timeout
+        result = self.pool.apply_async(
+            _generate_in_worker, (system_prompt, user_prompt, context, max_new_tokens, timeout, adapter)
+        )
+        try:
+            return result.get(deadline + RESULT_GRACE_SECONDS)
+        except multiprocessing.TimeoutError:
+            raise TimeoutError(f"No result from the generation worker after {deadline + RESULT_GRACE_SECONDS:.0f} "
+                               f"seconds, the worker may have died") from None
+
+    def close(self) -> None:
+        self.pool.terminate()
+        self.pool.join()
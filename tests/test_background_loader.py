@@ -0,0 +1,29 @@
+import threading
+
+import pytest
+
+from auto_swagger.swagger_generator.background_loader import BackgroundLoader
+
+
+def test_load_runs_on_a_background_thread():
+    threads = []
+    loader = BackgroundLoader(lambda: threads.append(threading.current_thread()) or "model")
+
+    assert loader.result() == "model"
+    assert threads[0] is not threading.current_thread()
+
+
+def test_foreground_load_runs_before_returning():
+    threads = []
+    loader = BackgroundLoader(lambda: threads.append(threading.current_thread()) or "model", background=False)
+
+    assert loader.done()
+    assert threads == [threading.current_thread()]
+    assert loader.result() == "model"
+
+
+def test_load_errors_are_raised_by_result():
+    loader = BackgroundLoader(lambda: 1 / 0, background=False)
+
+    with pytest.raises(ZeroDivisionError):
+        loader.result()
@@ -0,0 +1,200 @@
+import socket
+import tempfile
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from auto_swagger.swagger_generator.daemon import DaemonClient, InferenceDaemon, generation_settings
+from auto_swagger.swagger_generator.generator_config import DaemonConfig, LLMConfig
+from auto_swagger.swagger_generator.metrics import RunMetrics
+from auto_swagger.swagger_generator.models import Change
+
+
+class FakeHandler:
+    """Stands in for LLMHandler, documenting every route with a fixed block."""
+
+    def __init__(self, config=None):
+        self.config = config or LLMConfig()
+        self.metrics = RunMetrics()
+        self.calls = []
+        self.runs = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def start_run(self):
+        self.metrics = RunMetrics()
+        self.runs += 1
+
+    def generate_documentation(self, context, adapter=None):
+        self.calls.append((context, adapter))
+        self.started.set()
+        self.release.wait(5)
+        return [
+            Change(start_line=entry["line"], filepath=entry["filename"], code="/** @swagger */", description="doc")
+            for entry in context
+        ] or None
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to about 100 characters, so keep it short
+    directory = Path(tempfile.mkdtemp(prefix="asd"))
+    yield directory / "daemon.sock"
+    for path in directory.iterdir():
+        path.unlink()
+    directory.rmdir()
+
+
+def start_daemon(handler, socket_path, **overrides):
+    config = DaemonConfig(socket_path=socket_path, idle_timeout=0, **overrides)
+    daemon = InferenceDaemon(handler, config)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    client = DaemonClient(config, settings=generation_settings(handler.config))
+    deadline = time.time() + 5
+    while not client.is_available():
+        assert time.time() < deadline, "daemon did not start"
+        time.sleep(0.01)
+    return daemon, thread, client
+
+
+def stop_daemon(daemon, thread):
+    daemon.shutdown()
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_health_and_stats(socket_path):
+    handler = FakeHandler()
+    daemon, thread, client = start_daemon(handler, socket_path)
+    try:
+        health = client.health()
+        assert health["status"] == "ready"
+        assert (health["queued"], health["active"]) == (0, 0)
+        assert health["settings"] == generation_settings(handler.config)
+
+        client.generate_documentation([{"filename": "a.js", "line": 3}, {"filename": "b.js", "line": 7}])
+        stats = client.stats()
+        assert stats["generations"] == 1
+        assert stats["routes"] == 2
+        assert stats["failed"] == stats["rejected"] == 0
+    finally:
+        stop_daemon(daemon, thread)
+    assert not socket_path.exists()
+
+
+def test_client_round_trip(socket_path):
+    handler = FakeHandler()
+    daemon, thread, client = start_daemon(handler, socket_path)
+    try:
+        changes = client.generate_documentation([{"filename": "routes/users.js", "line": 12}], adapter="terse")
+        assert changes == [Change(start_line=12, filepath="routes/users.js", code="/** @swagger */", description="doc")]
+        assert handler.calls == [([{"filename": "routes/users.js", "line": 12}], "terse")]
+        assert client.generate_documentation([]) is None
+        # Every request starts a run of its own
+        assert handler.runs == 2
+    finally:
+        stop_daemon(daemon, thread)
+
+
+def test_generation_errors_are_returned_to_the_client(socket_path):
+    handler = FakeHandler()
+    handler.generate_documentation = lambda context, adapter=None: 1 / 0
+    daemon, thread, client = start_daemon(handler, socket_path)
+    try:
+        with pytest.raises(RuntimeError, match="division by zero"):
+            client.generate_documentation([{"filename": "a.js", "line": 1}])
+        assert client.stats()["failed"] == 1
+    finally:
+        stop_daemon(daemon, thread)
+
+
+def test_requests_with_other_settings_are_rejected(socket_path):
+    handler = FakeHandler()
+    daemon, thread, _ = start_daemon(handler, socket_path)
+    try:
+        settings = generation_settings(replace(
+            handler.config,
+            output_format="spec",
+            skip_documented=False,
+            kv_cache_memory_limit_mb=512.0,
+            max_retries=5,
+        ))
+        client = DaemonClient(daemon.config, settings=settings)
+        mismatched = ["kv_cache_memory_limit_mb", "max_retries", "output_format", "skip_documented"]
+        assert client.mismatched_settings() == mismatched
+        with pytest.raises(RuntimeError, match=", ".join(mismatched)):
+            client.generate_documentation([{"filename": "a.js", "line": 1}])
+        assert handler.calls == []
+        assert client.stats()["rejected"] == 1
+    finally:
+        stop_daemon(daemon, thread)
+
+
+def test_full_queue_rejects_requests(socket_path):
+    handler = FakeHandler()
+    handler.release.clear()
+    daemon, thread, client = start_daemon(handler, socket_path, max_queue=1)
+    try:
+        pending = [
+            threading.Thread(target=client.generate_documentation, args=([{"filename": "a.js", "line": 1}],))
+            for _ in range(2)
+        ]
+        # The first request occupies the worker, the second fills the queue
+        pending[0].start()
+        assert handler.started.wait(5)
+        pending[1].start()
+        deadline = time.time() + 5
+        while daemon.jobs.qsize() < 1:
+            assert time.time() < deadline
+            time.sleep(0.01)
+
+        with pytest.raises(RuntimeError, match="queue is full"):
+            client.generate_documentation([{"filename": "a.js", "line": 1}])
+        assert client.stats()["rejected"] == 1
+
+        handler.release.set()
+        for request in pending:
+            request.join(5)
+        assert client.stats()["generations"] == 2
+    finally:
+        handler.release.set()
+        stop_daemon(daemon, thread)
+
+
+def test_idle_daemon_shuts_down(socket_path):
+    daemon = InferenceDaemon(FakeHandler(), DaemonConfig(socket_path=socket_path, idle_timeout=0.2))
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+
+    thread.join(5)
+    assert not thread.is_alive()
+    assert not socket_path.exists()
+
+
+def test_stale_socket_is_taken_over(socket_path):
+    # A socket file left behind by a daemon that died without cleaning up
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(socket_path))
+    stale.close()
+    assert socket_path.exists()
+
+    daemon, thread, client = start_daemon(FakeHandler(), socket_path)
+    try:
+        assert client.health()["status"] == "ready"
+    finally:
+        stop_daemon(daemon, thread)
+
+
+def test_running_daemon_is_not_taken_over(socket_path):
+    daemon, thread, _ = start_daemon(FakeHandler(), socket_path)
+    try:
+        second = InferenceDaemon(FakeHandler(), DaemonConfig(socket_path=socket_path))
+        with pytest.raises(RuntimeError, match="already listening"):
+            second.serve_forever()
+    finally:
+        stop_daemon(daemon, thread)
@@ -0,0 +1,57 @@
+import json
+
+from auto_swagger.swagger_generator.doc_cache import DocCache
+from auto_swagger.swagger_generator.generator_config import LLMConfig
+from auto_swagger.swagger_generator.llm_handler import LLMHandler
+
+ROUTE = {
+    "codeContext": {"filename": "routes/users.js", "line": {"beginning": 5, "end": 7}},
+    "apiDetails": {"users": {"endpoint": {"path": "/users", "methods": ["GET"]}}},
+}
+
+
+def test_hits_refresh_the_eviction_order(tmp_path):
+    path = tmp_path / "cache.json"
+    cache = DocCache(path, max_entries=2)
+    for key in ("old", "middle"):
+        cache.put(key, {"code": key})
+    cache.save()
+    assert not cache.changed
+
+    cache = DocCache(path, max_entries=2)
+    assert cache.get("old") == {"code": "old"}
+    assert cache.changed
+    cache.put("new", {"code": "new"})
+    cache.save()
+
+    assert set(DocCache(path).entries) == {"old", "new"}
+
+
+def test_misses_leave_the_cache_unchanged(tmp_path):
+    cache = DocCache(tmp_path / "cache.json")
+    assert cache.get("missing") is None
+    assert not cache.changed
+
+
+def test_runs_with_only_cache_hits_save_the_refreshed_entries(tmp_path):
+    path = tmp_path / "cache.json"
+    config = LLMConfig(
+        backend="openai",
+        api_base_url="http://127.0.0.1:9/v1",
+        cache_path=path,
+        template_rendering=False,
+        example_retrieval=False,
+        adaptive_budget=False,
+        metrics_enabled=False,
+    )
+    handler = LLMHandler(config)
+    key = DocCache.make_key(ROUTE, handler._generation_identity())
+    cached = {"filepath": "routes/users.js", "code": "/** @swagger */", "description": "List users"}
+    handler.cache.put(key, cached)
+    handler.cache.entries[key]["last_used"] = 0.0
+    handler.cache.save()
+
+    changes = handler.generate_documentation([ROUTE])
+
+    assert [change.code for change in changes] == [cached["code"]]
+    assert json.loads(path.read_text())["entries"][key]["last_used"] > 0.0
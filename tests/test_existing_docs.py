@@ -0,0 +1,143 @@
+import copy
+import json
+
+import pytest
+
+from auto_swagger.swagger_generator.existing_docs import (
+    DOC_CURRENT,
+    DOC_MISSING,
+    DOC_STALE,
+    DOC_UNMATCHED,
+    change_span,
+    existing_doc_status,
+)
+from auto_swagger.swagger_generator.generator_config import LLMConfig
+from auto_swagger.swagger_generator.llm_handler import LLMHandler
+from auto_swagger.swagger_generator.models import GenerationResult
+
+ROUTE = {
+    "codeContext": {"filename": "users.js", "line": {"beginning": 12, "end": 14}},
+    "apiDetails": {
+        "users": {
+            "endpoint": {"path": "/users/:id", "methods": ["GET"], "resourceType": "User"},
+            "parameters": {"path": {"id": {"type": "string"}}, "query": {"full": {"type": "boolean"}}},
+            "responses": {
+                "success": {"get_one": {"statusCode": 200, "description": "OK"}},
+                "error": {"404": {"description": "Not found"}},
+            },
+        }
+    },
+}
+
+BLOCK = """/**
+ * @swagger
+ * /users/{id}:
+ *   get:
+ *     parameters:
+ *       - in: query
+ *         name: full
+ *     responses:
+ *       200:
+ *         description: OK
+ *       404:
+ *         description: Not found
+ */"""
+
+
+def with_block(text, route=ROUTE):
+    entry = copy.deepcopy(route)
+    entry["codeContext"]["existingDoc"] = {"beginning": 1, "end": 11, "text": text}
+    return entry
+
+
+def test_route_without_block_is_missing():
+    assert existing_doc_status(ROUTE) == DOC_MISSING
+    assert change_span(ROUTE) == (11, None)
+
+
+def test_block_declaring_the_route_is_current():
+    assert existing_doc_status(with_block(BLOCK)) == DOC_CURRENT
+
+
+def test_block_declaring_more_than_the_route_is_current():
+    text = BLOCK.replace(" *       404:", " *       400:\n *         description: Bad\n *       404:")
+    text = text.replace(" *         name: full", " *         name: full\n *       - in: query\n *         name: page")
+    assert existing_doc_status(with_block(text)) == DOC_CURRENT
+
+
+def test_block_missing_a_status_is_stale_and_replaced_in_place():
+    entry = with_block(BLOCK.replace(" *       404:\n *         description: Not found\n", ""))
+    assert existing_doc_status(entry) == DOC_STALE
+    assert change_span(entry) == (0, 11)
+
+
+def test_security_requirement_covers_auth_failures():
+    route = copy.deepcopy(ROUTE)
+    route["apiDetails"]["users"]["responses"]["error"]["401"] = {"description": "Unauthorized"}
+    text = BLOCK.replace(" *     parameters:", " *     security:\n *       - bearerAuth: []\n *     parameters:")
+    assert existing_doc_status(with_block(text, route)) == DOC_CURRENT
+
+
+def test_ref_parameters_are_accepted():
+    text = BLOCK.replace(" *       - in: query\n *         name: full", " *       - $ref: '#/components/parameters/Full'")
+    assert existing_doc_status(with_block(text)) == DOC_CURRENT
+
+
+def test_ref_parameters_are_resolved_within_the_block():
+    text = BLOCK.replace(" *       - in: query\n *         name: full", " *       - $ref: '#/components/parameters/Page'")
+    text = text.replace(" */", " * components:\n *   parameters:\n *     Page:\n *       in: query\n *       name: page\n */")
+    assert existing_doc_status(with_block(text)) == DOC_STALE
+
+
+def test_mount_prefix_and_renamed_path_params_match():
+    assert existing_doc_status(with_block(BLOCK.replace("/users/{id}:", "/api/v1/users/{userId}:"))) == DOC_CURRENT
+
+
+def test_block_for_another_route_is_never_replaced():
+    entry = with_block(BLOCK.replace("/users/{id}:", "/orders/{id}:"))
+    assert existing_doc_status(entry) == DOC_UNMATCHED
+    assert change_span(entry) == (11, None)
+
+
+def test_invalid_yaml_is_unmatched():
+    assert existing_doc_status(with_block("/**\n * @swagger\n * /users: [\n */")) == DOC_UNMATCHED
+
+
+class DocumentingBackend:
+    """Documents every route it is asked for with a fixed block."""
+
+    max_concurrency = 1
+
+    def __init__(self):
+        self.routes = []
+
+    def stream(self, system_prompt, user_prompt, context=None, max_new_tokens=None, timeout=None, adapter=None):
+        self.routes += [entry["codeContext"]["filename"] for entry in context]
+        changes = [{"filepath": entry["codeContext"]["filename"], "code": BLOCK, "description": "doc"} for entry in context]
+        yield json.dumps({"changes": changes})
+        return GenerationResult(text="")
+
+
+@pytest.mark.parametrize("update_stale_docs, replaced", [(True, True), (False, False)])
+def test_stale_blocks_are_replaced_unless_kept(tmp_path, update_stale_docs, replaced):
+    config = LLMConfig(
+        backend="openai",
+        api_base_url="http://127.0.0.1:9/v1",
+        cache_path=tmp_path / "cache.json",
+        template_rendering=False,
+        example_retrieval=False,
+        adaptive_budget=False,
+        metrics_enabled=False,
+        update_stale_docs=update_stale_docs,
+    )
+    handler = LLMHandler(config)
+    handler.backend = DocumentingBackend()
+    stale = with_block(BLOCK.replace(" *       404:\n *         description: Not found\n", ""))
+    current = with_block(BLOCK, {**ROUTE, "codeContext": {**ROUTE["codeContext"], "filename": "current.js"}})
+
+    changes = handler.generate_documentation([stale, current])
+
+    assert handler.backend.routes == (["users.js"] if replaced else [])
+    assert [(change.filepath, change.start_line, change.end_line) for change in changes or []] == (
+        [("users.js", 0, 11)] if replaced else []
+    )
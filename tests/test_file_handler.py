@@ -0,0 +1,64 @@
+import os
+import stat
+
+from auto_swagger.swagger_generator.file_handler import FileHandler, write_atomic
+from auto_swagger.swagger_generator.models import Change
+
+
+def numbered(count):
+    return "".join(f"line {number}\n" for number in range(1, count + 1))
+
+
+def doc(filepath, start_line, code, end_line=None):
+    return Change(start_line=start_line, filepath=filepath, code=code, description="doc", end_line=end_line)
+
+
+def test_changes_use_the_original_line_numbers(tmp_path):
+    (tmp_path / "a.js").write_text(numbered(6))
+    changes = [doc("a.js", 4, "// c\n// c2"), doc("a.js", 0, "// a"), doc("a.js", 2, "// b"), doc("a.js", 2, "// b2")]
+
+    applied = FileHandler(tmp_path).apply_batch(changes)
+
+    assert applied == changes
+    assert (tmp_path / "a.js").read_text().splitlines() == [
+        "// a", "line 1", "line 2", "// b", "// b2", "line 3", "line 4", "// c", "// c2", "line 5", "line 6"
+    ]
+
+
+def test_end_line_replaces_the_old_block(tmp_path):
+    (tmp_path / "a.js").write_text("/**\n * old\n */\napp.get('/a');\n" + numbered(2))
+    changes = [doc("a.js", 0, "/**\n * new\n */", end_line=3), doc("a.js", 5, "// after")]
+
+    FileHandler(tmp_path).apply_batch(changes)
+
+    assert (tmp_path / "a.js").read_text().splitlines() == [
+        "/**", " * new", " */", "app.get('/a');", "line 1", "// after", "line 2"
+    ]
+
+
+def test_files_keep_their_mode(tmp_path):
+    path = tmp_path / "a.js"
+    path.write_text(numbered(2))
+    os.chmod(path, 0o750)
+
+    assert FileHandler(tmp_path).apply_changes(doc("a.js", 1, "// doc"))
+
+    assert stat.S_IMODE(path.stat().st_mode) == 0o750
+    assert [entry.name for entry in tmp_path.iterdir()] == ["a.js"]
+
+
+def test_failed_files_are_left_out_of_the_result(tmp_path):
+    (tmp_path / "a.js").write_text(numbered(2))
+    changes = [doc("missing.js", 0, "// doc"), doc("a.js", 0, "// doc")]
+
+    assert FileHandler(tmp_path, max_workers=2).apply_batch(changes) == changes[1:]
+
+
+def test_write_atomic_creates_and_replaces_files(tmp_path):
+    path = tmp_path / "nested" / "openapi.json"
+
+    write_atomic(path, "{}")
+    write_atomic(path, '{"paths": {}}')
+
+    assert path.read_text(encoding="utf-8") == '{"paths": {}}'
+    assert [entry.name for entry in path.parent.iterdir()] == ["openapi.json"]
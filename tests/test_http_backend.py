@@ -0,0 +1,219 @@
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from auto_swagger.swagger_generator import http_backend
+from auto_swagger.swagger_generator.generator_config import LLMConfig
+from auto_swagger.swagger_generator.http_backend import OpenAIBackend
+
+
+def completion(content="ok", finish_reason="stop"):
+    return {
+        "choices": [{"message": {"content": content}, "finish_reason": finish_reason}],
+        "usage": {"prompt_tokens": 11, "completion_tokens": 3},
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers chat completion requests with the server's scripted responses."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.requests.append(body)
+            server.connections.add(self.client_address)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            status, content_type, payload = server.responses.pop(0) if server.responses else (200, None, None)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+
+        if payload is None:
+            payload = json.dumps(completion()).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type or "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.responses = []
+    server.connections = set()
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.delay = 0.0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_backend(server, **overrides):
+    settings = {
+        "api_base_url": f"http://127.0.0.1:{server.server_address[1]}/v1",
+        "api_model": "stub",
+        "api_retry_backoff": 0.01,
+    }
+    settings.update(overrides)
+    return OpenAIBackend(LLMConfig(**settings))
+
+
+def test_concurrent_requests_share_the_connection_pool(server):
+    server.delay = 0.2
+    backend = make_backend(server, api_concurrency=4)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: backend.generate("system", "user"), range(8)))
+    backend.close()
+
+    assert [result.text for result in results] == ["ok"] * 8
+    assert server.max_in_flight > 1
+    # Eight requests over at most four kept-alive connections
+    assert len(server.connections) <= 4
+
+
+def test_transient_errors_are_retried_with_backoff(server, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(http_backend, "time", SimpleNamespace(time=time.time, sleep=sleeps.append))
+    server.responses = [(429, None, b"{}"), (503, None, b"{}")]
+    backend = make_backend(server)
+
+    result = backend.generate("system", "user")
+
+    assert result.text == "ok"
+    assert len(server.requests) == 3
+    assert sleeps == [0.01, 0.02]
+
+
+def test_errors_are_raised_once_retries_are_used_up(server, monkeypatch):
+    monkeypatch.setattr(http_backend, "time", SimpleNamespace(time=time.time, sleep=lambda seconds: None))
+    server.responses = [(500, None, b"{}")] * 2
+    backend = make_backend(server, api_max_retries=1)
+
+    with pytest.raises(requests.HTTPError):
+        backend.generate("system", "user")
+    assert len(server.requests) == 2
+
+
+def test_client_errors_are_not_retried(server):
+    server.responses = [(400, None, b"{}")]
+    backend = make_backend(server)
+
+    with pytest.raises(requests.HTTPError):
+        backend.generate("system", "user")
+    assert len(server.requests) == 1
+
+
+def test_read_timeout(server):
+    server.delay = 1.0
+    backend = make_backend(server, api_timeout=0.1, api_max_retries=0)
+
+    with pytest.raises(TimeoutError):
+        backend.generate("system", "user")
+
+
+def test_connection_errors_are_retried(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(http_backend, "time", SimpleNamespace(time=time.time, sleep=sleeps.append))
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        port = unused.getsockname()[1]
+    backend = OpenAIBackend(LLMConfig(api_base_url=f"http://127.0.0.1:{port}/v1", api_max_retries=2, api_retry_backoff=0.01))
+
+    with pytest.raises(requests.ConnectionError):
+        backend.generate("system", "user")
+    assert sleeps == [0.01, 0.02]
+
+
+def test_timeouts_are_passed_per_request(server, monkeypatch):
+    backend = make_backend(server, api_connect_timeout=2.0, api_timeout=30.0)
+    timeouts = []
+    post = backend.session.post
+
+    def recording_post(*args, **kwargs):
+        timeouts.append(kwargs["timeout"])
+        return post(*args, **kwargs)
+
+    monkeypatch.setattr(backend.session, "post", recording_post)
+    backend.generate("system", "user", timeout=5.0)
+    backend.generate("system", "user", timeout=120.0)
+
+    # The batch deadline shortens the read timeout but never extends it past api_timeout
+    assert timeouts == [(2.0, 5.0), (2.0, 30.0)]
+
+
+def test_stream_yields_deltas_and_reads_usage_chunk(server):
+    events = [
+        {"choices": [{"delta": {"role": "assistant"}}]},
+        {"choices": [{"delta": {"content": "Grüße, "}}]},
+        {"choices": [{"delta": {"content": "café"}, "finish_reason": "length"}]},
+        {"choices": [], "usage": {"prompt_tokens": 20, "completion_tokens": 7}},
+    ]
+    body = "".join(f"data: {json.dumps(event, ensure_ascii=False)}\n\n" for event in events) + "data: [DONE]\n\n"
+    # No charset, as most OpenAI-compatible servers send it
+    server.responses = [(200, "text/event-stream", body.encode("utf-8"))]
+    backend = make_backend(server)
+
+    stream = backend.stream("system", "user")
+    deltas = []
+    while True:
+        try:
+            deltas.append(next(stream))
+        except StopIteration as stop:
+            result = stop.value
+            break
+
+    assert deltas == ["Grüße, ", "café"]
+    assert result.text == "Grüße, café"
+    assert (result.input_tokens, result.output_tokens) == (20, 7)
+    assert result.truncated
+    assert server.requests[0]["stream"] is True
+    assert server.requests[0]["stream_options"] == {"include_usage": True}
+
+
+def test_response_format_constrains_the_changes(server):
+    context = [{"codeContext": {"filename": "routes/users.js"}}, {"codeContext": {"filename": "routes/orders.js"}}]
+    backend = make_backend(server)
+
+    backend.generate("system", "user", context=context, max_new_tokens=256)
+    payload = server.requests[0]
+
+    assert payload["model"] == "stub"
+    assert payload["max_tokens"] == 256
+    assert payload["stream"] is False
+    response_format = payload["response_format"]
+    assert response_format["type"] == "json_schema"
+    changes = response_format["json_schema"]["schema"]["properties"]["changes"]
+    assert [item["properties"]["filepath"] for item in changes["prefixItems"]] == [
+        {"const": "routes/users.js"},
+        {"const": "routes/orders.js"},
+    ]
+    assert changes["minItems"] == changes["maxItems"] == 2
+
+
+def test_response_format_is_left_out_without_constrained_decoding(server):
+    backend = make_backend(server, constrained_decoding=False)
+
+    backend.generate("system", "user", context=[{"codeContext": {"filename": "routes/users.js"}}])
+
+    assert "response_format" not in server.requests[0]
@@ -0,0 +1,107 @@
+import pytest
+
+from auto_swagger.swagger_generator.jsdoc_renderer import (
+    operation_to_spec,
+    parse_jsdoc_block,
+    render_jsdoc,
+    render_spec,
+    spec_to_operation,
+)
+from auto_swagger.swagger_generator.template_renderer import TemplateRenderer
+
+OPERATION = {
+    "summary": "Get a user: by id",
+    "description": "Line one\nline two",
+    "tags": ["Users"],
+    "parameters": [
+        {"in": "path", "name": "id", "required": True, "schema": {"type": "string"}},
+        {"in": "query", "name": "full", "required": False, "schema": {"type": "boolean", "default": False}},
+    ],
+    "responses": {
+        200: {
+            "description": "OK",
+            "content": {"application/json": {"schema": {"type": "object", "properties": {"id": {"type": "string"}}}}},
+        },
+        404: {"description": "Not found"},
+    },
+}
+
+
+def test_rendered_block_parses_back_to_the_operation():
+    block = render_jsdoc("/users/{id}", "GET", OPERATION)
+
+    assert block.startswith("/**\n * @swagger\n * /users/{id}:\n *   get:\n")
+    assert parse_jsdoc_block(block) == {"/users/{id}": {"get": OPERATION}}
+
+
+@pytest.mark.parametrize("value", [
+    "", "yes", "No", "null", "~", "123", "1.5e3", "-x", "# note", "a: b", "a #b", "ends:", " padded ", "it's",
+    "@user", "{braces}", "tab\there", None, True, 0, 2.5, [], {},
+])
+def test_scalars_keep_their_value_and_type(value):
+    operation = {"responses": {200: {"description": "OK"}}, "x-value": value}
+
+    assert parse_jsdoc_block(render_jsdoc("/a", "get", operation))["/a"]["get"] == operation
+
+
+def test_template_blocks_parse_as_yaml():
+    entry = {
+        "codeContext": {"filename": "routes/users.js"},
+        "apiDetails": {
+            "users": {
+                "endpoint": {"path": "/users/:id", "methods": ["PUT"], "resourceType": "User"},
+                "parameters": {
+                    "path": {"id": {"type": "string", "required": True}},
+                    "body": {"name": {"type": "string", "required": True}, "age": {"type": "number"}},
+                },
+                "responses": {
+                    "success": {"update": {"statusCode": 200, "description": "Updated"}},
+                    "error": {"404": {"description": "User not found"}},
+                },
+            }
+        },
+    }
+
+    rendered = TemplateRenderer().render(entry)
+    operation = parse_jsdoc_block(rendered.code)["/users/{id}"]["put"]
+
+    assert [param["name"] for param in operation["parameters"]] == ["id"]
+    assert set(operation["requestBody"]["content"]["application/json"]["schema"]["properties"]) == {"name", "age"}
+    assert set(operation["responses"]) == {200, 404}
+
+
+SPEC = {
+    "summary": "List orders",
+    "tags": ["Orders"],
+    "parameters": [
+        {"in": "path", "name": "userId", "required": True, "type": "string"},
+        {"in": "query", "name": "page", "type": "integer", "default": 1, "description": "Page number"},
+        {"in": "query", "name": "status", "type": "string", "enum": ["open", "closed"]},
+    ],
+    "body": {"type": "object", "properties": {"note": {"type": "string"}}},
+    "responses": {
+        "200": {"description": "Orders", "schema": {"type": "array", "items": {"type": "object"}}},
+        "404": "User not found",
+    },
+}
+
+
+def test_spec_survives_expansion_and_compaction():
+    assert operation_to_spec(spec_to_operation(SPEC)) == SPEC
+
+
+def test_rendered_spec_parses_back_to_the_spec():
+    block = render_spec("/users/{userId}/orders", "get", SPEC)
+
+    assert operation_to_spec(parse_jsdoc_block(block)["/users/{userId}/orders"]["get"]) == SPEC
+
+
+def test_operation_survives_compaction_and_expansion():
+    assert spec_to_operation(operation_to_spec(OPERATION)) == OPERATION
+
+
+def test_spec_without_responses_gets_a_default():
+    assert spec_to_operation({"summary": "Ping"}) == {
+        "summary": "Ping",
+        "responses": {200: {"description": "Successful operation."}},
+    }
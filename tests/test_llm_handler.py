@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from auto_swagger.swagger_generator.generator_config import LLMConfig
+from auto_swagger.swagger_generator.llm_handler import LLMHandler
+from auto_swagger.swagger_generator.models import GenerationResult
+
+
+def route(filename, path, method, line):
+    return {
+        "codeContext": {"filename": filename, "line": {"beginning": line, "end": line + 2}},
+        "apiDetails": {"users": {"endpoint": {"path": path, "methods": [method]}}},
+    }
+
+
+def block(path):
+    return f"/**\n * @swagger\n * {path}:\n *   get:\n *     summary: doc\n */"
+
+
+def change(filepath, path):
+    return {"filepath": filepath, "code": block(path), "description": "doc"}
+
+
+CONTEXT = [
+    route("routes/users.js", "/users", "GET", 3),
+    route("routes/users.js", "/users/:id", "DELETE", 9),
+    route("routes/orders.js", "/orders", "POST", 4),
+]
+
+
+@pytest.fixture
+def handler(tmp_path):
+    config = LLMConfig(
+        backend="openai",
+        api_base_url="http://127.0.0.1:9/v1",
+        cache_path=tmp_path / "cache.json",
+        template_rendering=False,
+        example_retrieval=False,
+        adaptive_budget=False,
+        metrics_enabled=False,
+    )
+    return LLMHandler(config)
+
+
+def test_changes_are_matched_by_filename_and_path(handler):
+    # The model swapped the two routes of users.js
+    assert handler._match_change(0, change("routes/users.js", "/users/{id}"), CONTEXT, {}) == (
+        1, change("routes/users.js", "/users/{id}")
+    )
+    assert handler._match_change(1, change("routes/users.js", "/users"), CONTEXT, {})[0] == 0
+
+
+def test_changes_without_the_path_fall_back_to_their_position(handler):
+    data = {"filepath": "routes/users.js", "code": "/** @swagger */", "description": "doc"}
+
+    assert handler._match_change(1, data, CONTEXT, {})[0] == 1
+    # Not at a position of the same file
+    assert handler._match_change(2, data, CONTEXT, {}) is None
+
+
+def test_matched_entries_are_not_matched_twice(handler):
+    matched = {0: change("routes/users.js", "/users")}
+
+    assert handler._match_change(0, change("routes/users.js", "/users"), CONTEXT, matched) is None
+
+
+@pytest.mark.parametrize("data", [
+    None,
+    {"filepath": "routes/users.js", "description": "doc"},
+    {"filepath": "routes/users.js", "code": "  ", "description": "doc"},
+    {"filepath": "routes/users.js", "code": block("/users"), "description": 1},
+    change("routes/other.js", "/users"),
+])
+def test_malformed_or_unknown_changes_are_rejected(handler, data):
+    assert handler._match_change(0, data, CONTEXT, {}) is None
+
+
+class ScriptedBackend:
+    """Answers each request with the next scripted list of changes."""
+
+    max_concurrency = 1
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def stream(self, system_prompt, user_prompt, context=None, max_new_tokens=None, timeout=None, adapter=None):
+        self.requests.append([LLMHandler._route_endpoint(entry)["path"] for entry in context])
+        yield json.dumps({"changes": self.responses.pop(0)})
+        return GenerationResult(text="")
+
+
+def test_only_pending_routes_are_sent_again(handler):
+    handler.backend = ScriptedBackend(
+        # Out of order, one malformed and orders.js missing
+        [change("routes/users.js", "/users/{id}"), {"filepath": "routes/users.js"}],
+        [change("routes/orders.js", "/orders"), change("routes/users.js", "/users")],
+    )
+
+    changes = handler.generate_documentation(CONTEXT)
+
+    assert handler.backend.requests == [["/users", "/users/:id", "/orders"], ["/users", "/orders"]]
+    assert [(item.filepath, item.start_line, item.code) for item in changes] == [
+        ("routes/orders.js", 3, block("/orders")),
+        ("routes/users.js", 2, block("/users")),
+        ("routes/users.js", 8, block("/users/{id}")),
+    ]
+    assert [progress.attempts for progress in handler.metrics.routes] == [2, 1, 2]
+
+
+def test_routes_still_invalid_after_the_last_attempt_are_left_out(handler):
+    malformed = [[{"filepath": "routes/users.js", "code": ""}]] * (handler.config.max_retries - 1)
+    handler.backend = ScriptedBackend([change("routes/users.js", "/users")], *malformed)
+
+    changes = handler.generate_documentation(CONTEXT[:2])
+
+    assert handler.backend.requests == [["/users", "/users/:id"]] + [["/users/:id"]] * (handler.config.max_retries - 1)
+    assert [item.start_line for item in changes] == [2]
+    assert [progress.done for progress in handler.metrics.routes] == [True, False]
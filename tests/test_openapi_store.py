@@ -0,0 +1,93 @@
+import json
+
+from auto_swagger.swagger_generator.openapi_store import OpenApiStore
+
+
+def route(path, summary):
+    return f"/**\n * @swagger\n * {path}:\n *   get:\n *     summary: {summary}\n */\napp.get('{path}', handler);\n"
+
+
+HAND_WRITTEN = {
+    "openapi": "3.0.0",
+    "info": {"title": "Shop", "version": "2.3.0"},
+    "servers": [{"url": "https://api.example.com"}],
+    "components": {"securitySchemes": {"bearerAuth": {"type": "http", "scheme": "bearer"}}},
+    "paths": {
+        "/legacy": {"get": {"summary": "Legacy"}},
+        "/users": {"get": {"summary": "Old"}},
+    },
+}
+
+
+def make_store(tmp_path):
+    return OpenApiStore(tmp_path / "repo", fragments_path=tmp_path / "fragments.json")
+
+
+def read_document(tmp_path):
+    return json.loads((tmp_path / "repo" / "openapi.json").read_text(encoding="utf-8"))
+
+
+def test_first_run_merges_into_an_existing_document(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "users.js").write_text(route("/users", "List users") + route("/orders", "List orders"))
+    (repo / "openapi.json").write_text(json.dumps(HAND_WRITTEN))
+
+    make_store(tmp_path).scan()
+
+    document = read_document(tmp_path)
+    assert document["info"] == HAND_WRITTEN["info"]
+    assert document["servers"] == HAND_WRITTEN["servers"]
+    assert document["components"] == HAND_WRITTEN["components"]
+    assert document["paths"]["/legacy"] == HAND_WRITTEN["paths"]["/legacy"]
+    assert document["paths"]["/users"]["get"]["summary"] == "List users"
+    assert document["paths"]["/orders"]["get"]["summary"] == "List orders"
+
+
+def test_update_keeps_hand_edits_and_removes_deleted_routes(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "users.js").write_text(route("/users", "List users") + route("/orders", "List orders"))
+    make_store(tmp_path).scan()
+
+    document = read_document(tmp_path)
+    document["servers"] = [{"url": "https://api.example.com"}]
+    (repo / "openapi.json").write_text(json.dumps(document))
+    (repo / "users.js").write_text(route("/users", "All users"))
+    make_store(tmp_path).update(["users.js"])
+
+    document = read_document(tmp_path)
+    assert document["servers"] == [{"url": "https://api.example.com"}]
+    assert document["paths"] == {"/users": {"get": {"summary": "All users"}}}
+
+
+def test_deleted_document_is_reassembled_with_the_hand_written_parts(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "users.js").write_text(route("/users", "List users"))
+    (repo / "openapi.json").write_text(json.dumps(HAND_WRITTEN))
+    make_store(tmp_path).scan()
+    expected = read_document(tmp_path)
+
+    (repo / "openapi.json").unlink()
+    make_store(tmp_path).update([])
+
+    assert read_document(tmp_path) == expected
+
+
+def test_incremental_update_matches_a_full_rebuild(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.js").write_text(route("/a", "A") + route("/b", "B"))
+    (repo / "b.js").write_text(route("/c", "C"))
+    make_store(tmp_path).scan()
+
+    # Move /b to another file and change /c
+    (repo / "a.js").write_text(route("/a", "A"))
+    (repo / "b.js").write_text(route("/c", "C2") + route("/b", "B moved"))
+    stats = make_store(tmp_path).update(["a.js", repo / "b.js"])
+
+    rebuilt = OpenApiStore(repo, tmp_path / "rebuilt.json", tmp_path / "rebuilt_fragments.json")
+    rebuilt.scan()
+    assert stats["blocks_parsed"] == 2
+    assert read_document(tmp_path) == json.loads((tmp_path / "rebuilt.json").read_text(encoding="utf-8"))
@@ -0,0 +1,114 @@
+import copy
+import json
+
+import pytest
+
+from auto_swagger.swagger_generator.prompt_encoding import SHARED_REF_PREFIX, compact_context, encode_context
+
+ERRORS = {
+    "404": {"description": "User not found", "conditions": ["User not found"]},
+    "500": {"description": "Server error", "conditions": ["Database unavailable"]},
+}
+USER = {"type": "object", "properties": {"id": {"type": "string"}, "name": {"type": "string"}}}
+
+
+def route(filename, path, method, line, body=None):
+    return {
+        "codeContext": {
+            "filename": filename,
+            "line": {"beginning": line, "end": line + 4},
+            "existingDoc": {"beginning": line - 3, "end": line - 1, "text": "/** @swagger */"},
+        },
+        "apiDetails": {
+            "users": {
+                "endpoint": {"path": path, "methods": [method], "resourceType": "User"},
+                "parameters": {"path": {"id": {"type": "string"}}, "query": {}, "body": body or {}},
+                "responses": {
+                    "success": {"ok": {"statusCode": 200, "description": "OK", "schema": copy.deepcopy(USER)}},
+                    "error": copy.deepcopy(ERRORS),
+                },
+                "middleware": [],
+            }
+        },
+    }
+
+
+CONTEXT = [
+    route("routes/users.js", "/users/:id", "GET", 10),
+    route("routes/users.js", "/users/:id", "PUT", 20, body={"name": {"type": "string", "required": True}}),
+    route("routes/admin.js", "/admin/users/:id", "GET", 5),
+]
+
+
+def resolve(value, shared):
+    """Replaces every shared reference with the block it stands for."""
+    if isinstance(value, dict):
+        if set(value) == {"$ref"} and value["$ref"].startswith(SHARED_REF_PREFIX):
+            return resolve(shared[value["$ref"][len(SHARED_REF_PREFIX):]], shared)
+        return {key: resolve(item, shared) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item, shared) for item in value]
+    return value
+
+
+def prune(value):
+    """Drops the empty fields and the error conditions that only repeat the description."""
+    if isinstance(value, dict):
+        pruned = {
+            key: prune(item) for key, item in value.items()
+            if not (key == "conditions" and item == [value.get("description")])
+        }
+        return {key: item for key, item in pruned.items() if item not in ({}, [], "", None)}
+    if isinstance(value, list):
+        return [prune(item) for item in value]
+    return value
+
+
+def test_compact_encoding_keeps_every_field_of_the_verbose_one():
+    verbose = json.loads(encode_context(CONTEXT, "verbose"))
+    compact = json.loads(encode_context(CONTEXT, "compact"))
+
+    for entry in verbose:
+        del entry["codeContext"]["line"]
+    assert resolve(compact["routes"], compact.get("shared", {})) == prune(verbose)
+
+
+def test_repeated_blocks_are_hoisted_once():
+    encoded = compact_context(CONTEXT)
+
+    assert encoded["shared"] == {
+        "schema1": USER,
+        "errors1": {"404": {"description": "User not found"}, "500": ERRORS["500"]},
+    }
+    for details in (route["apiDetails"]["users"] for route in encoded["routes"]):
+        assert details["responses"]["error"] == {"$ref": SHARED_REF_PREFIX + "errors1"}
+        assert details["responses"]["success"]["ok"]["schema"] == {"$ref": SHARED_REF_PREFIX + "schema1"}
+    # A body used by one route only stays in place
+    assert encoded["routes"][1]["apiDetails"]["users"]["parameters"]["body"] == {
+        "name": {"type": "string", "required": True}
+    }
+
+
+def test_line_numbers_and_existing_docs_stay_out_of_the_prompt():
+    for encoding in ("compact", "verbose"):
+        encoded = encode_context(CONTEXT, encoding)
+        assert "existingDoc" not in encoded
+    assert '"line"' not in encode_context(CONTEXT, "compact")
+    # The original contexts still have them for placing the blocks
+    assert CONTEXT[0]["codeContext"]["line"] == {"beginning": 10, "end": 14}
+
+
+def test_short_blocks_are_not_hoisted():
+    context = [route("a.js", "/a", "GET", 1), route("b.js", "/b", "GET", 1)]
+    for entry in context:
+        entry["apiDetails"]["users"]["responses"] = {"error": {"404": {"description": "x"}}}
+
+    encoded = compact_context(context)
+
+    assert "shared" not in encoded
+    assert encoded["routes"][1]["apiDetails"]["users"]["responses"] == {"error": {"404": {"description": "x"}}}
+
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError, match="Unknown prompt encoding"):
+        encode_context(CONTEXT, "yaml")
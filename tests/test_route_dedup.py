@@ -0,0 +1,131 @@
+import copy
+import json
+
+import pytest
+
+from auto_swagger.swagger_generator.generator_config import LLMConfig
+from auto_swagger.swagger_generator.llm_handler import LLMHandler
+from auto_swagger.swagger_generator.models import GenerationResult
+from auto_swagger.swagger_generator.route_dedup import canonical_route_key, group_duplicate_routes
+
+
+def route(filename, path, line=5, method="GET", param="id"):
+    return {
+        "codeContext": {"filename": filename, "line": {"beginning": line, "end": line + 2}},
+        "apiDetails": {
+            "items": {
+                "endpoint": {"path": path, "methods": [method], "resourceType": "Item"},
+                "parameters": {"path": {param: {"type": "string"}}},
+                "responses": {"success": {"get_one": {"statusCode": 200, "description": "OK"}}},
+            }
+        },
+    }
+
+
+def block(path):
+    return f"/**\n * @swagger\n * {path}:\n *   get:\n *     summary: Get an item\n */"
+
+
+def test_location_does_not_change_the_key():
+    key = canonical_route_key(route("routes/users.js", "/users/:id"))
+
+    assert canonical_route_key(route("routes/orders.js", "/orders/:id", line=40)) == key
+    assert canonical_route_key(route("routes/users.js", "/users/:id", method="DELETE")) != key
+    assert canonical_route_key(route("routes/users.js", "/users/:userId", param="userId")) != key
+
+
+def test_empty_fields_do_not_change_the_key():
+    entry = route("routes/users.js", "/users/:id")
+    padded = copy.deepcopy(entry)
+    padded["apiDetails"]["items"]["parameters"]["query"] = {}
+
+    assert canonical_route_key(padded) == canonical_route_key(entry)
+
+
+def test_groups_map_the_first_index_to_the_others():
+    keys = ["a", "b", "a", "c", "a", "b"]
+
+    assert group_duplicate_routes(keys, [0, 1, 2, 3, 4, 5]) == {0: [2, 4], 1: [5], 3: []}
+    assert group_duplicate_routes(keys, [2, 3, 5]) == {2: [], 3: [], 5: []}
+
+
+@pytest.fixture
+def handler(tmp_path):
+    config = LLMConfig(
+        backend="openai",
+        api_base_url="http://127.0.0.1:9/v1",
+        cache_path=tmp_path / "cache.json",
+        template_rendering=False,
+        example_retrieval=False,
+        adaptive_budget=False,
+        metrics_enabled=False,
+    )
+    return LLMHandler(config)
+
+
+def test_retarget_moves_the_block_to_the_other_route(handler):
+    source, target = route("routes/users.js", "/users/:id"), route("routes/orders.js", "/orders/:id")
+    change_data = {"filepath": "routes/users.js", "code": block("/users/{id}"), "description": "Get an item"}
+
+    retargeted = handler._retarget_change(change_data, source, target)
+
+    assert retargeted == {"filepath": "routes/orders.js", "code": block("/orders/{id}"), "description": "Get an item"}
+
+
+def test_retarget_keeps_the_code_for_the_same_path(handler):
+    source, target = route("routes/v1.js", "/users/:id"), route("routes/v2.js", "/users/:id")
+    change_data = {"filepath": "routes/v1.js", "code": "/** @swagger */", "description": "Get an item"}
+
+    assert handler._retarget_change(change_data, source, target)["filepath"] == "routes/v2.js"
+
+
+def test_retarget_fails_if_the_block_lacks_the_source_path(handler):
+    source, target = route("routes/users.js", "/users/:id"), route("routes/orders.js", "/orders/:id")
+    change_data = {"filepath": "routes/users.js", "code": block("/items/{id}"), "description": "Get an item"}
+
+    assert handler._retarget_change(change_data, source, target) is None
+
+
+class FakeBackend:
+    """Documents every route it is given with the block ``document`` returns for it."""
+
+    max_concurrency = 1
+
+    def __init__(self, document):
+        self.document = document
+        self.requests = []
+
+    def stream(self, system_prompt, user_prompt, context=None, max_new_tokens=None, timeout=None, adapter=None):
+        self.requests.append([entry["codeContext"]["filename"] for entry in context])
+        changes = [
+            {"filepath": entry["codeContext"]["filename"], "code": self.document(entry), "description": "doc"}
+            for entry in context
+        ]
+        yield json.dumps({"changes": changes})
+        return GenerationResult(text="")
+
+
+CONTEXT = [route("routes/users.js", "/users/:id"), route("routes/orders.js", "/orders/:id")]
+
+
+def test_duplicates_are_generated_once_and_retargeted(handler):
+    handler.backend = FakeBackend(lambda entry: block(LLMHandler._swagger_path(LLMHandler._route_endpoint(entry)["path"])))
+
+    changes = handler.generate_documentation(CONTEXT)
+
+    assert handler.backend.requests == [["routes/users.js"]]
+    assert {change.filepath: change.code for change in changes} == {
+        "routes/users.js": block("/users/{id}"),
+        "routes/orders.js": block("/orders/{id}"),
+    }
+    assert [progress.source for progress in handler.metrics.routes] == ["model", "dedup"]
+
+
+def test_members_that_cannot_be_retargeted_are_generated_separately(handler):
+    # The block does not declare the route's own path, so it cannot be re-targeted
+    handler.backend = FakeBackend(lambda entry: block("/items/{id}"))
+
+    changes = handler.generate_documentation(CONTEXT)
+
+    assert handler.backend.requests == [["routes/users.js"], ["routes/orders.js"]]
+    assert sorted(change.filepath for change in changes) == ["routes/orders.js", "routes/users.js"]
@@ -0,0 +1,156 @@
+import json
+import queue
+import time
+
+import pytest
+
+from auto_swagger.swagger_generator.file_handler import FileHandler
+from auto_swagger.swagger_generator.generator_config import PipelineConfig
+from auto_swagger.swagger_generator.streaming import _DONE, IncrementalChangesParser, StreamingPipeline
+
+CHANGES = {
+    "changes": [
+        {"filepath": "routes/users.js", "code": "/**\n * @swagger\n * /users/{id}: {}\n */", "description": "Get a user"},
+        {"filepath": "routes/a \"quoted\" [name].js", "code": "/** }]} \\ {[ */", "description": "Odd characters"},
+        {"filepath": "routes/orders.js", "code": "/** café */", "description": "Escaped \\u00e9"},
+    ]
+}
+RESPONSE = json.dumps(CHANGES)
+
+
+def feed_in_chunks(text, size):
+    parser = IncrementalChangesParser()
+    completed = []
+    for start in range(0, len(text), size):
+        completed += parser.feed(text[start:start + size])
+    return parser, completed
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 16, len(RESPONSE)])
+def test_any_chunking_yields_every_change(size):
+    parser, completed = feed_in_chunks(RESPONSE, size)
+    assert completed == list(enumerate(CHANGES["changes"]))
+    assert parser.changes_seen == 3
+
+
+def test_changes_complete_as_soon_as_their_object_closes():
+    parser = IncrementalChangesParser()
+    first_end = RESPONSE.index("Get a user") + len('Get a user"}')
+    assert parser.feed(RESPONSE[:first_end - 1]) == []
+    assert parser.feed(RESPONSE[first_end - 1:first_end]) == [(0, CHANGES["changes"][0])]
+
+
+def test_escapes_split_across_chunks():
+    text = '{"changes": [{"filepath": "a.js", "code": "say \\"}]\\" and \\\\", "description": "d"}]}'
+    for split in range(len(text)):
+        parser = IncrementalChangesParser()
+        completed = parser.feed(text[:split]) + parser.feed(text[split:])
+        assert completed == [(0, {"filepath": "a.js", "code": 'say "}]" and \\', "description": "d"})]
+
+
+def test_markdown_fence_and_trailing_text_are_ignored():
+    text = "Here you go:\n```json\n" + RESPONSE + "\n```\nLet me know if {you need more}."
+    _, completed = feed_in_chunks(text, 4)
+    assert [change for _, change in completed] == CHANGES["changes"]
+
+
+def test_malformed_element_is_reported_in_place():
+    text = ('{"changes": [{"filepath": "a.js", "code": }, '
+            '{"filepath": "b.js", "code": "x", "description": "d"}]}')
+    _, completed = feed_in_chunks(text, 3)
+    assert completed == [(0, None), (1, {"filepath": "b.js", "code": "x", "description": "d"})]
+
+
+def test_objects_outside_the_changes_array_are_not_changes():
+    text = '{"notes": [{"filepath": "x.js"}], "summary": "changes", "changes": [{"filepath": "a.js"}]}'
+    _, completed = feed_in_chunks(text, 1)
+    assert completed == [(0, {"filepath": "a.js"})]
+
+
+def route(filename, line):
+    return {"codeContext": {"filename": filename, "line": {"beginning": line, "end": line}}}
+
+
+class FakeHandler:
+    """Documents every route it is given, optionally failing after some routes."""
+
+    def __init__(self, fail_after=None, on_yield=None):
+        self.calls = []
+        self.fail_after = fail_after
+        self.on_yield = on_yield
+
+    def iter_documentation(self, context):
+        self.calls.append([entry["codeContext"]["filename"] for entry in context])
+        for index, entry in enumerate(context):
+            if self.fail_after is not None and index == self.fail_after:
+                raise RuntimeError("model crashed")
+            if self.on_yield is not None:
+                self.on_yield(entry)
+            filename = entry["codeContext"]["filename"]
+            yield index, {"filepath": filename, "code": f"// doc {entry['codeContext']['line']['beginning']}",
+                          "description": "doc"}
+
+
+@pytest.fixture
+def repo(tmp_path):
+    for name in ("a.js", "b.js"):
+        (tmp_path / name).write_text("".join(f"line {number}\n" for number in range(1, 6)))
+    return tmp_path
+
+
+ROUTES = {"a.js": [route("a.js", 2), route("a.js", 4)], "b.js": [route("b.js", 3)]}
+
+
+def run_pipeline(repo, handler, **config):
+    pipeline = StreamingPipeline(ROUTES.get, lambda: handler, FileHandler(repo), PipelineConfig(**config))
+    return pipeline.run(["a.js", "b.js"])
+
+
+def test_next_group_takes_parsed_files_up_to_the_route_limit():
+    contexts = queue.Queue()
+    files = [[route(f"{name}.js", line) for line in range(30)] for name in "abc"]
+    for docs in files:
+        contexts.put(docs)
+    contexts.put(_DONE)
+    pipeline = StreamingPipeline(None, None, None, PipelineConfig(group_routes=64))
+
+    assert pipeline._next_group(contexts) == (files, False)
+    assert pipeline._next_group(contexts) == ([], True)
+
+
+def test_next_group_does_not_wait_for_more_files():
+    contexts = queue.Queue()
+    contexts.put([route("a.js", 1)])
+    pipeline = StreamingPipeline(None, None, None, PipelineConfig(group_routes=64))
+
+    assert pipeline._next_group(contexts) == ([[route("a.js", 1)]], False)
+
+
+def test_pipeline_applies_every_route(repo):
+    applied = run_pipeline(repo, FakeHandler())
+
+    assert sorted((change.filepath, change.start_line) for change in applied) == [("a.js", 1), ("a.js", 3), ("b.js", 2)]
+    assert (repo / "a.js").read_text().splitlines() == [
+        "line 1", "// doc 2", "line 2", "line 3", "// doc 4", "line 4", "line 5"
+    ]
+    assert (repo / "b.js").read_text().splitlines() == ["line 1", "line 2", "// doc 3", "line 3", "line 4", "line 5"]
+
+
+def test_files_are_written_before_the_rest_of_the_group(repo):
+    def wait_for_a(entry):
+        if entry["codeContext"]["filename"] == "b.js":
+            deadline = time.time() + 5
+            while "// doc" not in (repo / "a.js").read_text():
+                assert time.time() < deadline, "a.js was not written before b.js was generated"
+                time.sleep(0.01)
+
+    run_pipeline(repo, FakeHandler(on_yield=wait_for_a))
+
+
+def test_routes_generated_before_a_failure_are_written(repo):
+    handler = FakeHandler(fail_after=1)
+    applied = run_pipeline(repo, handler, group_routes=1)
+
+    # Each file is its own group, and the first route of each is written
+    assert handler.calls == [["a.js", "a.js"], ["b.js"]]
+    assert sorted((change.filepath, change.start_line) for change in applied) == [("a.js", 1), ("b.js", 2)]
@@ -0,0 +1,173 @@
+import json
+
+import pytest
+
+from auto_swagger.swagger_generator.generator_config import LLMConfig
+from auto_swagger.swagger_generator.llm_handler import LLMHandler
+from auto_swagger.swagger_generator.models import GenerationResult
+from auto_swagger.swagger_generator.token_budget import (
+    RESPONSE_OVERHEAD_TOKENS,
+    TokenBudget,
+    _quantile,
+    budget_key,
+)
+
+
+def make_budget(tmp_path, key=None, **overrides):
+    settings = {"output_format": "jsdoc", "max_new_tokens": 4096, "max_timeout": 600.0}
+    settings.update(overrides)
+    return TokenBudget(tmp_path / "token_stats.json", key=key, **settings)
+
+
+def result(output_tokens, decode_seconds=0.0, prefill_seconds=0.0, truncated=False):
+    return GenerationResult(
+        text="", output_tokens=output_tokens, decode_seconds=decode_seconds,
+        prefill_seconds=prefill_seconds, truncated=truncated,
+    )
+
+
+def test_quantile_is_the_nearest_rank():
+    values = [float(value) for value in range(1, 21)]
+    assert _quantile(values, 0.95) == 19.0
+    assert _quantile(values, 0.05) == 1.0
+    assert _quantile(values, 0.5) == 10.0
+    assert _quantile([7.0], 0.95) == 7.0
+    assert _quantile([], 0.95) is None
+
+
+def test_budget_without_samples_uses_the_format_default(tmp_path):
+    budget = make_budget(tmp_path)
+
+    # (450 tokens * 2 routes + overhead) * 1.25 margin, deadline left at the cap
+    assert budget.plan(2) == (1165, 600.0)
+    assert make_budget(tmp_path, output_format="spec").tokens_per_route() == 250
+    assert budget.max_routes() == 7
+
+
+def test_budget_follows_the_observed_samples(tmp_path):
+    budget = make_budget(tmp_path)
+    for _ in range(10):
+        budget.observe(2, result(2 * 100 + RESPONSE_OVERHEAD_TOKENS, decode_seconds=4.0, prefill_seconds=1.0))
+
+    max_new_tokens, seconds = budget.plan(3)
+
+    assert budget.tokens_per_route() == 100.0
+    assert max_new_tokens == 415  # (100 * 3 + 32) * 1.25
+    tokens_per_second = (2 * 100 + RESPONSE_OVERHEAD_TOKENS) / 4.0
+    assert seconds == pytest.approx((0.5 * 3 + max_new_tokens / tokens_per_second) * 1.25)
+
+
+def test_budget_is_capped_by_the_limits(tmp_path):
+    budget = make_budget(tmp_path, max_new_tokens=1000, max_timeout=5.0)
+    budget.observe(1, result(500, decode_seconds=50.0))
+
+    assert budget.plan(10) == (1000, 5.0)
+    assert budget.max_routes() == 1
+
+
+def test_scales_raise_the_budget_and_the_deadline(tmp_path):
+    budget = make_budget(tmp_path)
+    budget.observe(1, result(132, decode_seconds=10.0))
+    tokens, seconds = budget.plan(1)
+
+    assert budget.plan(1, scale=2.0)[0] == 2 * tokens
+    assert budget.plan(1, timeout_scale=2.0) == (tokens, pytest.approx(2 * seconds))
+
+
+def test_truncated_and_empty_responses_are_not_recorded(tmp_path):
+    budget = make_budget(tmp_path)
+    budget.observe(2, result(4096, decode_seconds=10.0, truncated=True))
+    budget.observe(2, result(0))
+    budget.observe(0, result(100, decode_seconds=1.0))
+
+    assert budget.samples == {}
+    assert not budget.dirty
+
+
+def test_timeouts_lengthen_later_deadlines(tmp_path):
+    budget = make_budget(tmp_path)
+    budget.observe(1, result(132, decode_seconds=1.0))
+    _, before = budget.plan(4)
+
+    budget.observe_timeout(4, 30.0)
+    _, after = budget.plan(4)
+
+    assert budget.samples["tokens_per_second"][-1] == round((4 * 100 + RESPONSE_OVERHEAD_TOKENS) / 30.0, 4)
+    assert after > before
+
+
+def test_samples_are_kept_per_setup(tmp_path):
+    local = budget_key("local", "qwen", "cpu-int8", "jsdoc")
+    remote = budget_key("openai", "qwen", "default", "jsdoc")
+    budget = make_budget(tmp_path, key=local)
+    budget.observe(1, result(132, decode_seconds=10.0))
+    budget.save()
+
+    assert local == "local:qwen:cpu-int8:jsdoc"
+    assert make_budget(tmp_path, key=local).samples == budget.samples
+    assert make_budget(tmp_path, key=remote).samples == {}
+
+
+def test_statistics_of_older_versions_are_ignored(tmp_path):
+    (tmp_path / "token_stats.json").write_text(
+        json.dumps({"version": 1, "formats": {"jsdoc": {"tokens_per_route": [1000.0]}}})
+    )
+
+    assert make_budget(tmp_path).tokens_per_route() == 450
+
+
+ROUTES = [
+    {
+        "codeContext": {"filename": f"routes/{name}.js", "line": {"beginning": 5, "end": 7}},
+        "apiDetails": {name: {"endpoint": {"path": f"/{name}", "methods": ["GET"]}}},
+    }
+    for name in ("users", "orders")
+]
+
+
+class TimingOutBackend:
+    """Times out on its first request and answers every later one."""
+
+    max_concurrency = 1
+
+    def __init__(self):
+        self.requests = []
+
+    def stream(self, system_prompt, user_prompt, context=None, max_new_tokens=None, timeout=None, adapter=None):
+        self.requests.append((len(context), timeout))
+        if len(self.requests) == 1:
+            raise TimeoutError("No response within 600 seconds")
+        changes = [
+            {
+                "filepath": entry["codeContext"]["filename"],
+                "code": f"/**\n * @swagger\n * {LLMHandler._route_endpoint(entry)['path']}:\n *   get: {{}}\n */",
+                "description": "doc",
+            }
+            for entry in context
+        ]
+        yield json.dumps({"changes": changes})
+        return GenerationResult(text="", output_tokens=100 * len(context), decode_seconds=1.0)
+
+
+def test_timed_out_routes_are_retried_in_smaller_requests(tmp_path):
+    config = LLMConfig(
+        backend="openai",
+        api_base_url="http://127.0.0.1:9/v1",
+        cache_path=tmp_path / "cache.json",
+        token_stats_path=tmp_path / "token_stats.json",
+        generation_timeout=600.0,
+        template_rendering=False,
+        example_retrieval=False,
+        metrics_enabled=False,
+    )
+    handler = LLMHandler(config)
+    handler.backend = TimingOutBackend()
+
+    changes = handler.generate_documentation(ROUTES)
+
+    assert sorted(change.filepath for change in changes) == ["routes/orders.js", "routes/users.js"]
+    assert [routes for routes, _ in handler.backend.requests] == [2, 1, 1]
+    assert handler.backend.requests[0][1] == 600.0
+    assert [batch.timed_out for batch in handler.metrics.batches] == [True, False, False]
+    timeout_sample = (2 * 450 + RESPONSE_OVERHEAD_TOKENS) / 600.0
+    assert handler.token_budget.samples["tokens_per_second"][0] == round(timeout_sample, 4)